@@ -0,0 +1,58 @@
+"""Add composite (user_id, date) index on expenses
+
+Revision ID: 3f2a9c1d8e47
+Revises: 6071336e6790
+Create Date: 2026-01-12 10:04:51.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f2a9c1d8e47'
+down_revision: Union[str, Sequence[str], None] = '6071336e6790'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction on Postgres,
+    # so both statements run in an autocommit block. Other dialects ignore the flag.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_expenses_user_id_date',
+            'expenses',
+            ['user_id', sa.text('date DESC'), sa.text('id DESC')],
+            postgresql_include=['amount', 'category'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        # The composite index has user_id as its prefix, so the single-column one is redundant
+        op.drop_index(
+            'ix_expenses_user_id',
+            table_name='expenses',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_expenses_user_id',
+            'expenses',
+            ['user_id'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_expenses_user_id_date',
+            table_name='expenses',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
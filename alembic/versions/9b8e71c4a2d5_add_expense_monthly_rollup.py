@@ -0,0 +1,51 @@
+"""Add expense_monthly_rollup table
+
+Revision ID: 9b8e71c4a2d5
+Revises: 3f2a9c1d8e47
+Create Date: 2026-01-19 16:42:07.903118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b8e71c4a2d5'
+down_revision: Union[str, Sequence[str], None] = '3f2a9c1d8e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'expense_monthly_rollup',
+        sa.Column('user_id', sa.String(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('year_month', sa.String(length=7), nullable=False),
+        sa.Column('category', sa.String(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'year_month', 'category'),
+    )
+
+    # Backfill from existing expenses
+    if op.get_bind().dialect.name == 'postgresql':
+        year_month = "to_char(date, 'YYYY-MM')"
+    else:
+        year_month = "strftime('%Y-%m', date)"
+    op.execute(
+        f"""
+        INSERT INTO expense_monthly_rollup (user_id, year_month, category, total, count)
+        SELECT user_id, {year_month}, COALESCE(category, ''), SUM(amount), COUNT(*)
+        FROM expenses
+        WHERE user_id IS NOT NULL AND date IS NOT NULL
+        GROUP BY user_id, {year_month}, COALESCE(category, '')
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('expense_monthly_rollup')
@@ -0,0 +1,40 @@
+"""Add chat_messages table
+
+Revision ID: a7c3e9f20b14
+Revises: e5d2a8f41c67
+Create Date: 2026-02-12 11:26:48.517302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e9f20b14'
+down_revision: Union[str, Sequence[str], None] = 'e5d2a8f41c67'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'chat_messages',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('chat_id', sa.String(), nullable=False),
+        sa.Column('role', sa.String(), nullable=False),
+        sa.Column('content', sa.String(), nullable=False),
+        sa.Column('component', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_chat_messages_user_chat_created', 'chat_messages', ['user_id', 'chat_id', 'created_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_chat_messages_user_chat_created', table_name='chat_messages')
+    op.drop_table('chat_messages')
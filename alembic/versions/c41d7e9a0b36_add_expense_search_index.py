@@ -0,0 +1,63 @@
+"""Add full-text search index for expenses
+
+Revision ID: c41d7e9a0b36
+Revises: 9b8e71c4a2d5
+Create Date: 2026-02-02 11:27:44.615302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d7e9a0b36'
+down_revision: Union[str, Sequence[str], None] = '9b8e71c4a2d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+PG_TSVECTOR_SQL = "to_tsvector('simple', coalesce(category, '') || ' ' || coalesce(description, ''))"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        # GIN build can take a while on large tables; don't block writes meanwhile
+        with op.get_context().autocommit_block():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_expenses_search ON expenses USING gin (({PG_TSVECTOR_SQL}))")
+        return
+
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5("
+        "category, description, content='expenses', content_rowid='id')"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS expenses_fts_ai AFTER INSERT ON expenses BEGIN "
+        "INSERT INTO expenses_fts(rowid, category, description) VALUES (new.id, new.category, new.description); END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS expenses_fts_ad AFTER DELETE ON expenses BEGIN "
+        "INSERT INTO expenses_fts(expenses_fts, rowid, category, description) VALUES ('delete', old.id, old.category, old.description); END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS expenses_fts_au AFTER UPDATE OF category, description ON expenses BEGIN "
+        "INSERT INTO expenses_fts(expenses_fts, rowid, category, description) VALUES ('delete', old.id, old.category, old.description); "
+        "INSERT INTO expenses_fts(rowid, category, description) VALUES (new.id, new.category, new.description); END"
+    )
+    # Index the existing rows
+    op.execute("INSERT INTO expenses_fts(expenses_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_expenses_search")
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS expenses_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS expenses_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS expenses_fts_ai")
+    op.execute("DROP TABLE IF EXISTS expenses_fts")
@@ -0,0 +1,257 @@
+"""Dictionary-encode expense categories
+
+Revision ID: e5d2a8f41c67
+Revises: c41d7e9a0b36
+Create Date: 2026-02-09 10:12:31.284517
+
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5d2a8f41c67'
+down_revision: Union[str, Sequence[str], None] = 'c41d7e9a0b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Frozen copy of backend/services/categories.normalize, so later changes there don't alter this migration
+def _singular(word):
+    if len(word) <= 3:
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("sses", "shes", "ches", "xes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def _normalize(name):
+    words = re.sub(r"\s+", " ", (name or "").strip().lower()).split(" ")
+    if words == [""]:
+        return ""
+    words[-1] = _singular(words[-1])
+    return " ".join(words)
+
+
+SQLITE_FTS_TRIGGERS = ("expenses_fts_ai", "expenses_fts_ad", "expenses_fts_au")
+CATEGORY_NAME = "(SELECT name FROM categories WHERE id = {}.category_id)"
+
+
+def _year_month(dialect_name):
+    return "to_char(date, 'YYYY-MM')" if dialect_name == 'postgresql' else "strftime('%Y-%m', date)"
+
+
+def _drop_sqlite_fts():
+    for trigger in SQLITE_FTS_TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS expenses_fts")
+    op.execute("DROP VIEW IF EXISTS expenses_search_content")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    dialect_name = bind.dialect.name
+
+    op.create_table(
+        'categories',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.String(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+    )
+    op.create_index('ix_categories_user_id', 'categories', ['user_id'])
+    op.create_table(
+        'category_aliases',
+        sa.Column('user_id', sa.String(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('alias', sa.String(), nullable=False),
+        sa.Column('category_id', sa.Integer(), sa.ForeignKey('categories.id'), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'alias'),
+    )
+    if dialect_name == 'postgresql':
+        op.add_column('expenses', sa.Column('category_id', sa.Integer(), sa.ForeignKey('categories.id'), nullable=True))
+    else:
+        # Alembic only adds foreign keys on SQLite in batch mode, but an inline REFERENCES is allowed
+        op.execute("ALTER TABLE expenses ADD COLUMN category_id INTEGER REFERENCES categories (id)")
+
+    # Backfill: one category per (user, normalised name), displayed as first entered
+    categories = sa.table('categories', sa.column('id'), sa.column('user_id'), sa.column('name'))
+    aliases = sa.table('category_aliases', sa.column('user_id'), sa.column('alias'), sa.column('category_id'))
+    pairs = bind.execute(sa.text(
+        "SELECT user_id, category, MIN(id) AS first_id FROM expenses "
+        "WHERE user_id IS NOT NULL AND category IS NOT NULL "
+        "GROUP BY user_id, category ORDER BY first_id"
+    )).all()
+    category_ids = {}
+    updates = []
+    for user_id, name, _ in pairs:
+        alias = _normalize(name)
+        if not alias:
+            continue
+        if (user_id, alias) not in category_ids:
+            category_id = bind.execute(
+                categories.insert().values(user_id=user_id, name=re.sub(r"\s+", " ", name.strip())).returning(categories.c.id)
+            ).scalar_one()
+            bind.execute(aliases.insert().values(user_id=user_id, alias=alias, category_id=category_id))
+            category_ids[(user_id, alias)] = category_id
+        updates.append({"cid": category_ids[(user_id, alias)], "uid": user_id, "name": name})
+    if updates:
+        bind.execute(
+            sa.text("UPDATE expenses SET category_id = :cid WHERE user_id = :uid AND category = :name"),
+            updates,
+        )
+
+    # Rollup buckets are now keyed by category_id (0 = uncategorised)
+    op.drop_table('expense_monthly_rollup')
+    op.create_table(
+        'expense_monthly_rollup',
+        sa.Column('user_id', sa.String(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('year_month', sa.String(length=7), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'year_month', 'category_id'),
+    )
+    year_month = _year_month(dialect_name)
+    op.execute(
+        f"""
+        INSERT INTO expense_monthly_rollup (user_id, year_month, category_id, total, count)
+        SELECT user_id, {year_month}, COALESCE(category_id, 0), SUM(amount), COUNT(*)
+        FROM expenses
+        WHERE user_id IS NOT NULL AND date IS NOT NULL
+        GROUP BY user_id, {year_month}, COALESCE(category_id, 0)
+        """
+    )
+
+    if dialect_name == 'postgresql':
+        # Build the replacement covering index before dropping the column, which drops the old
+        # one, so the hot path is never without an index
+        with op.get_context().autocommit_block():
+            op.create_index(
+                'ix_expenses_user_id_date_new',
+                'expenses',
+                ['user_id', sa.text('date DESC'), sa.text('id DESC')],
+                postgresql_include=['amount', 'category_id'],
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+            op.drop_index('ix_expenses_search', table_name='expenses', postgresql_concurrently=True, if_exists=True)
+            op.drop_index('ix_expenses_category', table_name='expenses', postgresql_concurrently=True, if_exists=True)
+        op.drop_column('expenses', 'category')
+        op.execute("ALTER INDEX ix_expenses_user_id_date_new RENAME TO ix_expenses_user_id_date")
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_expenses_search ON expenses "
+                "USING gin ((to_tsvector('simple', coalesce(description, ''))))"
+            )
+        return
+
+    # SQLite: the FTS triggers reference the column, so drop them first and re-index afterwards
+    _drop_sqlite_fts()
+    op.drop_index('ix_expenses_category', table_name='expenses', if_exists=True)
+    op.execute("ALTER TABLE expenses DROP COLUMN category")
+    op.execute(
+        "CREATE VIEW IF NOT EXISTS expenses_search_content AS "
+        "SELECT e.id, c.name AS category, e.description FROM expenses e LEFT JOIN categories c ON c.id = e.category_id"
+    )
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5("
+        "category, description, content='expenses_search_content', content_rowid='id')"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS expenses_fts_ai AFTER INSERT ON expenses BEGIN "
+        f"INSERT INTO expenses_fts(rowid, category, description) VALUES (new.id, {CATEGORY_NAME.format('new')}, new.description); END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS expenses_fts_ad AFTER DELETE ON expenses BEGIN "
+        f"INSERT INTO expenses_fts(expenses_fts, rowid, category, description) VALUES ('delete', old.id, {CATEGORY_NAME.format('old')}, old.description); END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS expenses_fts_au AFTER UPDATE OF category_id, description ON expenses BEGIN "
+        f"INSERT INTO expenses_fts(expenses_fts, rowid, category, description) VALUES ('delete', old.id, {CATEGORY_NAME.format('old')}, old.description); "
+        f"INSERT INTO expenses_fts(rowid, category, description) VALUES (new.id, {CATEGORY_NAME.format('new')}, new.description); END"
+    )
+    op.execute("INSERT INTO expenses_fts(expenses_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    dialect_name = bind.dialect.name
+
+    op.add_column('expenses', sa.Column('category', sa.String(), nullable=True))
+    op.execute("UPDATE expenses SET category = (SELECT name FROM categories WHERE categories.id = expenses.category_id)")
+    op.create_index('ix_expenses_category', 'expenses', ['category'])
+
+    op.drop_table('expense_monthly_rollup')
+    op.create_table(
+        'expense_monthly_rollup',
+        sa.Column('user_id', sa.String(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('year_month', sa.String(length=7), nullable=False),
+        sa.Column('category', sa.String(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'year_month', 'category'),
+    )
+    year_month = _year_month(dialect_name)
+    op.execute(
+        f"""
+        INSERT INTO expense_monthly_rollup (user_id, year_month, category, total, count)
+        SELECT user_id, {year_month}, COALESCE(category, ''), SUM(amount), COUNT(*)
+        FROM expenses
+        WHERE user_id IS NOT NULL AND date IS NOT NULL
+        GROUP BY user_id, {year_month}, COALESCE(category, '')
+        """
+    )
+
+    if dialect_name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index(
+                'ix_expenses_user_id_date_old',
+                'expenses',
+                ['user_id', sa.text('date DESC'), sa.text('id DESC')],
+                postgresql_include=['amount', 'category'],
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+            op.drop_index('ix_expenses_search', table_name='expenses', postgresql_concurrently=True, if_exists=True)
+        op.drop_column('expenses', 'category_id')
+        op.execute("ALTER INDEX ix_expenses_user_id_date_old RENAME TO ix_expenses_user_id_date")
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_expenses_search ON expenses "
+                "USING gin ((to_tsvector('simple', coalesce(category, '') || ' ' || coalesce(description, ''))))"
+            )
+    else:
+        _drop_sqlite_fts()
+        # SQLite can't DROP a column that is part of a foreign key; batch mode copies the table
+        with op.batch_alter_table('expenses') as batch_op:
+            batch_op.drop_column('category_id')
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5("
+            "category, description, content='expenses', content_rowid='id')"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS expenses_fts_ai AFTER INSERT ON expenses BEGIN "
+            "INSERT INTO expenses_fts(rowid, category, description) VALUES (new.id, new.category, new.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS expenses_fts_ad AFTER DELETE ON expenses BEGIN "
+            "INSERT INTO expenses_fts(expenses_fts, rowid, category, description) VALUES ('delete', old.id, old.category, old.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS expenses_fts_au AFTER UPDATE OF category, description ON expenses BEGIN "
+            "INSERT INTO expenses_fts(expenses_fts, rowid, category, description) VALUES ('delete', old.id, old.category, old.description); "
+            "INSERT INTO expenses_fts(rowid, category, description) VALUES (new.id, new.category, new.description); END"
+        )
+        op.execute("INSERT INTO expenses_fts(expenses_fts) VALUES ('rebuild')")
+
+    op.drop_table('category_aliases')
+    op.drop_index('ix_categories_user_id', table_name='categories')
+    op.drop_table('categories')
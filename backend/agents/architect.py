@@ -1,16 +1,9 @@
 import os
 import json
-from openai import AsyncOpenAI
 from .base import BaseAgent
+from ..services.llm_gateway import llm_gateway
 
 class ArchitectAgent(BaseAgent):
-    def __init__(self):
-        self.client = AsyncOpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=os.getenv("OPENROUTER_API_KEY"),
-        )
-        self.model = os.getenv("LLM_MODEL", "google/gemini-3-flash-preview")
-
     async def generate_tool(self, requirement: str) -> dict:
         system_prompt = """You are a Senior Python Financial Architect.
 Your goal is to write a single, self-contained Python function that solves a complex financial problem.
@@ -131,9 +124,9 @@ You may receive input containing `<agent_critique>`. This indicates your previou
   "json_schema": { ... }
 }
 """
-        response = await self.client.chat.completions.create(
-            model=self.model,
-            messages=[
+        response = await llm_gateway.complete(
+            "architect",
+            [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": f"Create a tool for: {requirement}"}
             ],
@@ -1,9 +1,9 @@
 import os
 import json
 import logging
-from openai import AsyncOpenAI
 from e2b_code_interpreter import Sandbox
 from .base import BaseAgent
+from ..services.llm_gateway import llm_gateway
 
 logger = logging.getLogger(__name__)
 
@@ -12,12 +12,6 @@ class AuditorAgent(BaseAgent):
         self.api_key = os.getenv("E2B_API_KEY")
         if not self.api_key:
             logger.warning("E2B_API_KEY not found. Auditor will fail to execute code.")
-        
-        self.client = AsyncOpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=os.getenv("OPENROUTER_API_KEY"),
-        )
-        self.model = os.getenv("LLM_MODEL", "google/gemini-3-flash-preview")
 
     async def semantic_review(self, code: str, name: str) -> tuple[bool, str]:
         """
@@ -67,9 +61,9 @@ If invalid, return JSON: {{"approved": false, "reason": "LOGIC ERROR: [Explanati
 
         try:
             prompt = system_prompt.format(code=code)
-            response = await self.client.chat.completions.create(
-                model=os.getenv("LLM_MODEL", "google/gemini-3-flash-preview"),
-                messages=[
+            response = await llm_gateway.complete(
+                "auditor",
+                [
                     {"role": "system", "content": prompt},
                     {"role": "user", "content": f"Audit this tool: {name}\n\n{code}"}
                 ],
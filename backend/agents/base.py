@@ -1,6 +1,9 @@
+import contextlib
 from typing import Any, List, Dict, Optional
 from abc import ABC, abstractmethod
 
+from ..services.llm_gateway import llm_gateway
+
 class BaseAgent(ABC):
     @abstractmethod
     async def process_message(self, message: str, context: Optional[Dict[str, Any]] = None, status_callback: Optional[Any] = None) -> str:
@@ -12,3 +15,19 @@ class BaseAgent(ABC):
         :return: string response
         """
         pass
+
+    async def _answer(self, stage: str, messages: List[Dict], status_callback: Optional[Any] = None, stream: bool = False) -> str:
+        """
+        Completion that produces the agent's final answer. With stream=True each text delta is also
+        reported as a "delta" status event as it arrives; the assembled text is returned either way.
+        """
+        if not (stream and status_callback):
+            response = await llm_gateway.complete(stage, messages)
+            return response.choices[0].message.content
+        parts = []
+        # Closed on exit so a failing callback or cancellation frees the gateway slot right away
+        async with contextlib.aclosing(llm_gateway.stream(stage, messages)) as deltas:
+            async for delta in deltas:
+                parts.append(delta)
+                await status_callback("delta", delta)
+        return "".join(parts)
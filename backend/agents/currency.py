@@ -1,21 +1,16 @@
 import httpx
 import os
 import json
-from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
 import logging
 from .base import BaseAgent
+from ..services.llm_gateway import llm_gateway
 
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-client = AsyncOpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=os.getenv("OPENROUTER_API_KEY"),
-)
-
 async def convert_currency_tool(amount: float, from_currency: str, to_currency: str):
     try:
         url = f"https://open.er-api.com/v6/latest/{from_currency.upper()}"
@@ -52,7 +47,7 @@ currency_tools = [
 ]
 
 class CurrencyAgent(BaseAgent):
-    async def process_message(self, message: str, context=None, status_callback=None) -> str:
+    async def process_message(self, message: str, context=None, status_callback=None, stream: bool = False) -> str:
         try:
             system_prompt = """You are a helpful and efficient currency conversion assistant.
 Your goal is to provide quick, accurate conversions in a friendly tone.
@@ -70,9 +65,9 @@ GUIDELINES:
                 
             msg_history.append({"role": "user", "content": message})
             
-            response = await client.chat.completions.create(
-                model=os.getenv("LLM_MODEL", "google/gemini-3-flash-preview"), 
-                messages=msg_history,
+            response = await llm_gateway.complete(
+                "currency",
+                msg_history,
                 tools=currency_tools,
                 tool_choice="auto"
             )
@@ -99,13 +94,12 @@ GUIDELINES:
                     })
                 
                 # Get final response
-                second_response = await client.chat.completions.create(
-                    model=os.getenv("LLM_MODEL", "google/gemini-3-flash-preview"),
-                    messages=msg_history
-                )
-                return second_response.choices[0].message.content
+                return await self._answer("currency", msg_history, status_callback, stream=stream)
             
-            return response.choices[0].message.content
+            answer = response.choices[0].message.content
+            if stream and status_callback and answer:
+                await status_callback("delta", answer)
+            return answer
 
         except Exception as e:
             logger.error(f"Currency Agent Logic Error: {e}", exc_info=True)
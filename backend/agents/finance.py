@@ -3,51 +3,18 @@ import json
 import os
 import logging
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from sqlalchemy import or_
-from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
-from .. import models, database
+from .. import models, database, crud
+from ..services.llm_gateway import llm_gateway
 from .base import BaseAgent
 
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-client = AsyncOpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=os.getenv("OPENROUTER_API_KEY"),
-)
-
 async def get_expenses_tool(db: AsyncSession, user_id: str, category: str = None, search: str = None, date: str = None, end_date: str = None):
-    query = select(models.Expense).filter(models.Expense.user_id == user_id)
-    if category:
-        query = query.filter(models.Expense.category.ilike(f"%{category}%"))
-    
-    if search:
-        query = query.filter(
-            or_(
-                models.Expense.category.ilike(f"%{search}%"),
-                models.Expense.description.ilike(f"%{search}%")
-            )
-        )
-    if date:
-        try:
-            start_date_obj = datetime.strptime(date, "%Y-%m-%d")
-            query = query.filter(models.Expense.date >= start_date_obj)
-        except ValueError:
-            logger.warning(f"Invalid start date format: {date}")
-            
-    if end_date:
-        try:
-            end_date_obj = datetime.strptime(end_date, "%Y-%m-%d")
-            # Set to end of day for inclusive range
-            end_date_obj = end_date_obj.replace(hour=23, minute=59, second=59)
-            query = query.filter(models.Expense.date <= end_date_obj)
-        except ValueError:
-            logger.warning(f"Invalid end_date format: {end_date}")
-            
+    query = crud.filter_expenses(user_id, db.bind.dialect.name, category=category, search=search, date=date, end_date=end_date)
     result = await db.execute(query)
     expenses = result.scalars().all()
     if not expenses:
@@ -103,7 +70,7 @@ finance_tools = [
 ]
 
 class FinanceAgent(BaseAgent):
-    async def process_message(self, message: str, user_id: str, context=None, status_callback=None) -> str:
+    async def process_message(self, message: str, user_id: str, context=None, status_callback=None, stream: bool = False) -> str:
         async with database.AsyncSessionLocal() as db:
             try:
                 system_prompt = f"""You are a friendly and insightful Financial Assistant aimed at helping users manage their money better.
@@ -135,9 +102,9 @@ IMPORTANT DATA RULES:
                 if status_callback:
                     await status_callback("log", "Finance Agent: Analyzing request...")
                 
-                response = await client.chat.completions.create(
-                    model=os.getenv("LLM_MODEL", "google/gemini-3-flash-preview"), 
-                    messages=msg_history,
+                response = await llm_gateway.complete(
+                    "finance",
+                    msg_history,
                     tools=finance_tools,
                     tool_choice="auto"
                 )
@@ -157,7 +124,9 @@ IMPORTANT DATA RULES:
                         tool_result = ""
                         
                         if function_name == "get_expenses":
-                            tool_result = str(await get_expenses_tool(db, user_id=user_id, **function_args))
+                            # Reads go to the replica unless this user just wrote (e.g. add_expense above)
+                            async with database.AsyncReadSessionLocal(info={"user_id": user_id}) as read_db:
+                                tool_result = str(await get_expenses_tool(read_db, user_id=user_id, **function_args))
                         elif function_name == "add_expense":
                             tool_result = await add_expense_tool(db, user_id=user_id, **function_args)
                             if status_callback:
@@ -171,13 +140,12 @@ IMPORTANT DATA RULES:
                         })
                     
                     # Get final response
-                    second_response = await client.chat.completions.create(
-                        model=os.getenv("LLM_MODEL", "google/gemini-3-flash-preview"),
-                        messages=msg_history
-                    )
-                    return second_response.choices[0].message.content
+                    return await self._answer("finance", msg_history, status_callback, stream=stream)
                 
-                return response.choices[0].message.content
+                answer = response.choices[0].message.content
+                if stream and status_callback and answer:
+                    await status_callback("delta", answer)
+                return answer
 
             except Exception as e:
                 logger.error(f"Finance Agent Logic Error: {e}", exc_info=True)
@@ -0,0 +1,218 @@
+"""
+Local fast path for intent classification, tried before the LLM classifier.
+
+Two stages, both in-process and sub-millisecond:
+1. Rules for unambiguous phrasings ("convert 100 USD to EUR", "add an expense ...",
+   "calculate my mortgage ...").
+2. A small TF-IDF + logistic regression model (pure Python) trained at startup on
+   intent_examples.jsonl plus the intents the LLM classifier logged to INTENT_LOG_PATH.
+
+route() returns an intent only if its confidence reaches INTENT_ROUTER_THRESHOLD; otherwise
+the manager asks the LLM, and logs the LLM's answer as training data for the next start.
+Messages that refer back to the conversation ("what is that in euro?") always go to the LLM,
+which sees the history.
+
+Evaluate offline with backend/benchmarks/intent_router_eval.py.
+"""
+import json
+import logging
+import math
+import os
+import random
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INTENTS = ("finance", "currency", "composite", "new_tool")
+EXAMPLES_PATH = os.path.join(os.path.dirname(__file__), "intent_examples.jsonl")
+INTENT_LOG_PATH = os.getenv("INTENT_LOG_PATH") or None
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() in ("1", "true", "yes")
+INTENT_ROUTER_THRESHOLD = float(os.getenv("INTENT_ROUTER_THRESHOLD", "0.8"))
+# Newest logged intents used for training, which keeps startup training well under a second
+INTENT_LOG_MAX = int(os.getenv("INTENT_LOG_MAX", "2000"))
+
+CURRENCY = (
+    r"usd|eur|gbp|jpy|chf|cad|aud|nzd|cny|rmb|inr|sek|nok|dkk|pln|mxn|hkd|btc|"
+    r"dollars?|euros?|pounds?|yen|yuan|francs?|rupees?|zloty|kronor|pesos?|bitcoin"
+)
+_AMOUNT_CONVERSION = re.compile(rf"\d[\d,.]*\s*(?:{CURRENCY})\b.*\b(?:to|in|into)\s+(?:{CURRENCY})\b|\b(?:{CURRENCY})\s+to\s+(?:{CURRENCY})\b")
+# "in EUR" only asks for a conversion at the end ("my rent in USD?"), not in "spend in EUR last month"
+_TARGET_CURRENCY = re.compile(
+    rf"\b(?:to|into)\s+(?:swiss\s+|canadian\s+|us\s+)?(?:{CURRENCY})\b"
+    rf"|\bin\s+(?:swiss\s+|canadian\s+|us\s+)?(?:{CURRENCY})\s*[?.!]*\s*$"
+)
+_PERSONAL = re.compile(r"\b(?:my|i|i've|me)\b.*\b(?:spen[dt]|spending|costs?|expenses?|rent|paid|bills?|total)\b|\b(?:my)\s+\w+\s+(?:costs?|spending|expenses?)\b")
+_ADD_EXPENSE = re.compile(r"^\s*(?:add|log|record|track)\b.*(?:\d|expense)|\bi (?:spent|paid) \d")
+_SPENDING_QUESTION = re.compile(r"\bhow much (?:did|have) i (?:spend|spent|pay|paid)\b|\b(?:show|list) (?:me )?(?:all )?my (?:\w+ )?(?:expenses|spending)\b")
+_NEW_TOOL = re.compile(r"\b(?:mortgage|amorti[sz]ation|compound interest|npv|irr|break-even|retirement|pension|capital gains|income tax|net salary|loan payment|future value|debt snowball)\b")
+# "that", "it", "this" etc. refer back to earlier messages the local router cannot see
+_ANAPHORA = re.compile(r"\b(?:that|it|those|these|same|again|above|previous)\b|\bthis\b(?! (?:week|month|year|quarter|morning|evening)\b)")
+
+_WORD = re.compile(r"[a-z]+|\d+(?:[.,]\d+)?")
+_CURRENCY_WORD = re.compile(rf"^(?:{CURRENCY})$")
+
+class RoutedIntent(NamedTuple):
+    intent: str
+    confidence: float
+    source: str # "rule" or "model"
+
+def tokens(text: str) -> List[str]:
+    words = []
+    for word in _WORD.findall(text.lower()):
+        if word[0].isdigit():
+            words.append("<num>")
+        elif _CURRENCY_WORD.match(word):
+            words.append("<ccy>")
+        else:
+            words.append(word)
+    return words
+
+def features(text: str) -> Counter:
+    words = tokens(text)
+    return Counter(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+
+def rule_intent(message: str) -> Optional[RoutedIntent]:
+    text = message.lower()
+    personal = _PERSONAL.search(text) is not None
+    target_currency = _TARGET_CURRENCY.search(text) is not None
+    # Checked before the tool keywords: "I paid 1500 mortgage today" records an expense
+    if not target_currency and (_ADD_EXPENSE.search(text) or _SPENDING_QUESTION.search(text)):
+        return RoutedIntent("finance", 0.9, "rule")
+    if _NEW_TOOL.search(text):
+        # "my mortgage costs" may be a spending question as well as a calculation; let the LLM decide
+        return RoutedIntent("new_tool", 0.0 if personal else 0.9, "rule")
+    if personal and target_currency:
+        return RoutedIntent("composite", 0.9, "rule")
+    if not personal and _AMOUNT_CONVERSION.search(text):
+        return RoutedIntent("currency", 0.95, "rule")
+    return None
+
+class IntentModel:
+    """Multinomial logistic regression over L2-normalized TF-IDF unigrams and bigrams."""
+
+    def __init__(self, epochs: int = 40, learning_rate: float = 0.5, l2: float = 1e-4, seed: int = 0):
+        self.epochs = epochs
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.seed = seed
+        self.idf: Dict[str, float] = {}
+        self.labels: List[str] = []
+        self.weights: Dict[str, Dict[str, float]] = {}
+        self.bias: Dict[str, float] = {}
+
+    def vectorize(self, text: str) -> Dict[str, float]:
+        vector = {f: (1 + math.log(count)) * self.idf[f] for f, count in features(text).items() if f in self.idf}
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {f: v / norm for f, v in vector.items()}
+
+    def fit(self, texts: List[str], labels: List[str]) -> "IntentModel":
+        document_frequency = Counter(f for text in texts for f in features(text))
+        n = len(texts)
+        self.idf = {f: math.log((1 + n) / (1 + df)) + 1 for f, df in document_frequency.items()}
+        vectors = [self.vectorize(text) for text in texts]
+        self.labels = sorted(set(labels))
+        self.weights = {label: defaultdict(float) for label in self.labels}
+        self.bias = {label: 0.0 for label in self.labels}
+
+        order = list(range(n))
+        rng = random.Random(self.seed)
+        for epoch in range(self.epochs):
+            rng.shuffle(order)
+            rate = self.learning_rate / (1 + epoch * 0.1)
+            for i in order:
+                probabilities = self._softmax(vectors[i])
+                for label in self.labels:
+                    gradient = probabilities[label] - (1.0 if labels[i] == label else 0.0)
+                    weights = self.weights[label]
+                    for f, v in vectors[i].items():
+                        weights[f] -= rate * (gradient * v + self.l2 * weights[f])
+                    self.bias[label] -= rate * gradient
+        return self
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        return self._softmax(self.vectorize(text))
+
+    def _softmax(self, vector: Dict[str, float]) -> Dict[str, float]:
+        scores = {
+            label: self.bias[label] + sum(self.weights[label].get(f, 0.0) * v for f, v in vector.items())
+            for label in self.labels
+        }
+        top = max(scores.values())
+        exps = {label: math.exp(score - top) for label, score in scores.items()}
+        total = sum(exps.values())
+        return {label: e / total for label, e in exps.items()}
+
+def load_examples(paths: Iterable[Optional[str]] = (EXAMPLES_PATH, INTENT_LOG_PATH), max_per_file: int = INTENT_LOG_MAX) -> List[Tuple[str, str]]:
+    """
+    (message, intent) pairs from JSONL files, at most the last `max_per_file` of each.
+    Missing files and malformed lines are skipped.
+    """
+    examples = []
+    for path in paths:
+        if not path or not os.path.exists(path):
+            continue
+        found = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("intent") in INTENTS and record.get("message"):
+                    found.append((record["message"], record["intent"]))
+        examples.extend(found[-max_per_file:])
+    return examples
+
+class IntentRouter:
+    def __init__(self, model: Optional[IntentModel], threshold: float = INTENT_ROUTER_THRESHOLD, log_path: Optional[str] = INTENT_LOG_PATH):
+        self.model = model
+        self.threshold = threshold
+        self.log_path = log_path
+        self.counts = Counter()
+
+    @classmethod
+    def train(cls, examples: List[Tuple[str, str]], **kwargs) -> "IntentRouter":
+        model = IntentModel().fit([m for m, _ in examples], [i for _, i in examples]) if examples else None
+        return cls(model, **kwargs)
+
+    def classify(self, message: str) -> Optional[RoutedIntent]:
+        """Best local guess with its confidence, or None for messages that need the history."""
+        if _ANAPHORA.search(message.lower()):
+            return None
+        routed = rule_intent(message)
+        if routed is None and self.model is not None:
+            probabilities = self.model.predict_proba(message)
+            intent = max(probabilities, key=probabilities.get)
+            routed = RoutedIntent(intent, probabilities[intent], "model")
+        return routed
+
+    def route(self, message: str) -> Optional[RoutedIntent]:
+        """The local intent if it is confident enough to skip the LLM, else None."""
+        routed = self.classify(message)
+        if routed is None or routed.confidence < self.threshold:
+            self.counts["llm"] += 1
+            return None
+        self.counts[routed.source] += 1
+        return routed
+
+    def log_intent(self, message: str, intent: str):
+        """Appends an LLM-classified message to the training log (call off the event loop)."""
+        if not self.log_path or intent not in INTENTS:
+            return
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"message": message, "intent": intent}) + "\n")
+
+    def stats(self) -> dict:
+        total = sum(self.counts.values())
+        local = self.counts["rule"] + self.counts["model"]
+        return {
+            "rule": self.counts["rule"],
+            "model": self.counts["model"],
+            "llm": self.counts["llm"],
+            "local_rate": local / total if total else 0.0,
+            "threshold": self.threshold,
+        }
+
+intent_router = IntentRouter.train(load_examples())
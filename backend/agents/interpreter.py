@@ -1,22 +1,16 @@
 from .base import BaseAgent
 import os
 import json
-from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
 load_dotenv()
 
-client = AsyncOpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=os.getenv("OPENROUTER_API_KEY"),
-)
-
 class InterpreterAgent(BaseAgent):
     def __init__(self):
         super().__init__()
         self.name = "Interpreter Agent"
 
-    async def process_message(self, message: str, context: dict = None, status_callback=None) -> str:
+    async def process_message(self, message: str, context: dict = None, status_callback=None, stream: bool = False) -> str:
         
         system_prompt = """You are the **Interpreter Agent**.
 Your SOLE purpose is to take raw data (JSON, text, or tool outputs) provided by the user and transform it into a beautiful, human-readable **Financial Report** in Markdown.
@@ -52,11 +46,7 @@ Pure, clean Markdown. No code blocks for the text itself (unless showing a speci
             await status_callback("log", "Interpreter Agent: analyzing data...")
 
         try:
-            response = await client.chat.completions.create(
-                model=os.getenv("LLM_MODEL", "google/gemini-3-flash-preview"),
-                messages=messages
-            )
-            return response.choices[0].message.content
+            return await self._answer("interpreter", messages, status_callback, stream=stream)
         except Exception as e:
             if status_callback:
                 await status_callback("error", f"Interpreter Agent failed: {e}")
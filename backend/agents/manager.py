@@ -1,6 +1,7 @@
+import asyncio
 import json
 import os
-from openai import AsyncOpenAI
+from typing import NamedTuple
 from dotenv import load_dotenv
 
 from .base import BaseAgent
@@ -13,6 +14,11 @@ from .interpreter import InterpreterAgent
 from backend import crud, models
 from backend.database import AsyncSessionLocal
 from backend.services.chat_service import chat_service
+from backend.services.context_builder import context_builder
+from backend.services.llm_cache import llm_cache
+from backend.services.stage_timing import StageTimer
+from backend.services.tool_index import tool_index
+from .intent_router import INTENTS, INTENT_ROUTER_ENABLED, intent_router
 
 logger = logging.getLogger(__name__)
 
@@ -20,10 +26,76 @@ load_dotenv(".env.local")
 load_dotenv()
 
 
-client = AsyncOpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=os.getenv("OPENROUTER_API_KEY"),
-)
+GATEKEEPER_MODE = os.getenv("GATEKEEPER_MODE", "merged").lower()
+# Stream the final answer to the client as "delta" status events while it is generated
+CHAT_STREAMING = os.getenv("CHAT_STREAMING", "true").lower() in ("1", "true", "yes")
+
+INTENT_CATEGORIES = """- 'finance': Questions about expenses, adding expenses, or financial history (e.g., "How much did I spend?", "Add expense").
+- 'currency': simple currency conversion questions with specific numeric amounts (e.g., "Convert 100 USD to EUR", "What is 50 GBP in Yen?").
+- 'composite': Requests that involve personal financial data (spendings, costs, history) AND a conversion. This includes queries like "Convert my food costs to EUR", "Total spending on Coffee in RMB", or "How much is my rent in USD?".
+- 'new_tool': Requests for calculations or forecasts that are NOT simple expense tracking or currency conversion. Examples: "Calculate mortgage", "Forecast savings", "Estimate tax", "Amortization schedule", "Compound interest".
+
+CRITICAL: If the user refers to their own "spending", "total", "costs", "expenses", or "history" without providing a specific amount, it MUST be 'composite' or 'finance', NEVER 'currency'.
+If the request requires a formula or mathematical model (like taxes, loans, interest) that is not simple + - * /, it is 'new_tool'.
+"""
+
+INTENT_PROMPT = f"""Classify the user's intent into one of the following categories:
+{INTENT_CATEGORIES}Return ONLY the category name.
+"""
+
+SAFETY_RULES = """Your job is to REJECT requests that are:
+1. Malicious (asking to write viruses, hack systems, steal data).
+2. Completely unrelated to finance, math, economics, or productivity (e.g. "Write a poem about cats", "Who won the superbowl").
+
+Financial requests (loans, interest, taxes, savings, planning) -> APPROVE
+Mathematical requests (formulas, projections) -> APPROVE
+Unclear but potentially productive requests -> APPROVE
+"""
+
+SAFETY_PROMPT = f"""You are a Safety Filter for a Financial AI.
+{SAFETY_RULES}
+Return EXACTLY 'SAFE' or 'UNSAFE'."""
+
+GATEKEEPER_PROMPT = f"""You are the Safety Filter and intent classifier of a Financial AI.
+{SAFETY_RULES}
+Intent categories:
+{INTENT_CATEGORIES}Return ONLY JSON: {{"safe": bool, "intent": category, "confidence": 0-1}}"""
+
+class GatekeeperVerdict(NamedTuple):
+    safe: bool
+    intent: str
+    confidence: float
+
+def parse_gatekeeper_verdict(content: str) -> GatekeeperVerdict:
+    """Reads the gatekeeper's JSON answer; missing or invalid fields fall back to safe/finance."""
+    data = json.loads(content)
+    safe = data.get("safe", True)
+    if isinstance(safe, str):
+        safe = safe.strip().lower() not in ("false", "unsafe", "no")
+    intent = str(data.get("intent", "")).strip().lower()
+    if intent not in INTENTS:
+        intent = "finance"
+    try:
+        confidence = min(max(float(data.get("confidence", 0.0)), 0.0), 1.0)
+    except (TypeError, ValueError):
+        confidence = 0.0
+    return GatekeeperVerdict(bool(safe), intent, confidence)
+
+def tool_to_data(tool: models.Tool) -> dict:
+    """A stored Tool in the shape the Architect returns (schema and dependencies decoded)."""
+    def decode(value, default):
+        try:
+            return json.loads(value) if value else default
+        except ValueError:
+            return default
+    return {
+        "name": tool.name,
+        "title": tool.title,
+        "description": tool.description,
+        "python_code": tool.python_code,
+        "json_schema": decode(tool.json_schema, {}),
+        "dependencies": decode(tool.dependencies, []),
+    }
 
 class ManagerAgent(BaseAgent):
     def __init__(self):
@@ -34,32 +106,19 @@ class ManagerAgent(BaseAgent):
         self.interpreter_agent = InterpreterAgent()
 
     async def _classify_intent(self, message: str, history: list = [], status_callback=None) -> str:
-        system_prompt = """Classify the user's intent into one of the following categories:
-- 'finance': Questions about expenses, adding expenses, or financial history (e.g., "How much did I spend?", "Add expense").
-- 'currency': simple currency conversion questions with specific numeric amounts (e.g., "Convert 100 USD to EUR", "What is 50 GBP in Yen?").
-- 'composite': Requests that involve personal financial data (spendings, costs, history) AND a conversion. This includes queries like "Convert my food costs to EUR", "Total spending on Coffee in RMB", or "How much is my rent in USD?".
-- 'new_tool': Requests for calculations or forecasts that are NOT simple expense tracking or currency conversion. Examples: "Calculate mortgage", "Forecast savings", "Estimate tax", "Amortization schedule", "Compound interest".
-
-CRITICAL: If the user refers to their own "spending", "total", "costs", "expenses", or "history" without providing a specific amount, it MUST be 'composite' or 'finance', NEVER 'currency'.
-If the request requires a formula or mathematical model (like taxes, loans, interest) that is not simple + - * /, it is 'new_tool'.
-Return ONLY the category name.
-"""
-        messages = [{"role": "system", "content": system_prompt}]
+        messages = [{"role": "system", "content": INTENT_PROMPT}]
         
         # Add history context to help with "that" references (e.g., "What is that in Euro?")
         for msg in history:
-            # Skip system/tool messages if they exist in history (keep it simple for classifier)
-            if msg.get("role") in ["user", "assistant"]:
+            # Skip tool messages if they exist in history (keep it simple for classifier).
+            # A system message here is the context builder's summary of earlier messages.
+            if msg.get("role") in ["user", "assistant", "system"]:
                 messages.append({"role": msg["role"], "content": msg["content"]})
         
         messages.append({"role": "user", "content": message})
 
         try:
-            response = await client.chat.completions.create(
-                model=os.getenv("LLM_MODEL", "google/gemini-3-flash-preview"),
-                messages=messages
-            )
-            intent = response.choices[0].message.content.strip().lower()
+            intent = (await llm_cache.complete("classify", messages)).strip().lower()
             if "composite" in intent: return "composite"
             if "finance" in intent: return "finance"
             if "currency" in intent: return "currency"
@@ -75,26 +134,11 @@ Return ONLY the category name.
         2. Safe (not asking for malware, hacks, or illegal acts).
         Returns True if safe, False otherwise.
         """
-        system_prompt = """You are a Safety Filter for a Financial AI.
-Your job is to REJECT requests that are:
-1. Malicious (asking to write viruses, hack systems, steal data).
-2. Completely unrelated to finance, math, economics, or productivity (e.g. "Write a poem about cats", "Who won the superbowl").
-
-Financial requests (loans, interest, taxes, savings, planning) -> APPROVE
-Mathematical requests (formulas, projections) -> APPROVE
-Unclear but potentially productive requests -> APPROVE
-
-Return EXACTLY 'SAFE' or 'UNSAFE'."""
-        
         try:
-            response = await client.chat.completions.create(
-                model=os.getenv("LLM_MODEL", "google/gemini-3-flash-preview"),
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": message}
-                ]
-            )
-            content = response.choices[0].message.content.strip().upper()
+            content = (await llm_cache.complete("safety", [
+                {"role": "system", "content": SAFETY_PROMPT},
+                {"role": "user", "content": message}
+            ])).strip().upper()
             is_safe = "SAFE" in content
             if status_callback:
                 await status_callback("log", f"Safety Check Result: {content}")
@@ -105,6 +149,104 @@ Return EXACTLY 'SAFE' or 'UNSAFE'."""
             # Fail open to ensure user experience isn't blocked by transient API errors
             return True
 
+    async def _gatekeeper(self, message: str, history: list = [], status_callback=None) -> GatekeeperVerdict:
+        """
+        Safety check and intent classification in one completion, so the message (and the
+        history) is only sent once. Fails open like the separate calls.
+        """
+        messages = [{"role": "system", "content": GATEKEEPER_PROMPT}]
+        for msg in history:
+            if msg.get("role") in ["user", "assistant", "system"]:
+                messages.append({"role": msg["role"], "content": msg["content"]})
+        messages.append({"role": "user", "content": message})
+
+        try:
+            content = await llm_cache.complete("gatekeeper", messages, response_format={"type": "json_object"})
+            verdict = parse_gatekeeper_verdict(content)
+        except Exception as e:
+            logger.error(f"Gatekeeper failed: {e}")
+            verdict = GatekeeperVerdict(True, "finance", 0.0)
+        if status_callback:
+            await status_callback("log", f"Gatekeeper Result: safe={verdict.safe}, intent={verdict.intent} ({verdict.confidence:.2f})")
+        logger.info(f"Gatekeeper: {message} -> {verdict}")
+        return verdict
+
+    async def _build_tool(self, message: str, user_id: str = None, chat_id: str = "default", status_callback=None):
+        """
+        Generates a tool with the Architect -> Auditor loop and saves it.
+        Returns (tool_data, None), or (None, response) with the already persisted failure message.
+        """
+        # 1. Generate
+        # 1b. Generation Loop (Architect -> Auditor feedback)
+        max_retries = 3
+        attempt = 0
+        feedback = ""
+        is_valid = False
+        critique_reason = ""
+
+        while attempt <= max_retries:
+            if feedback:
+                prompt_with_feedback = f"{message}\n\n<agent_critique>\n{feedback}\n</agent_critique>"
+                logger.info(f"Retrying Architect with feedback (Attempt {attempt})")
+                if status_callback:
+                     await status_callback("log", f"Auditor rejected tool. Retrying Architect with feedback...")
+            else:
+                prompt_with_feedback = message
+
+            tool_data = await self.architect_agent.generate_tool(prompt_with_feedback)
+
+            if "error" in tool_data:
+                logger.error(f"Architect error: {tool_data['error']}")
+                if attempt == max_retries:
+                     response = f"I tried to build a tool for that but failed: {tool_data['error']}"
+                     if user_id: await chat_service.add_message(user_id, chat_id, "assistant", response)
+                     return None, response
+                attempt += 1
+                continue
+
+            # 2. Audit
+            logger.info(f"Auditing tool: {tool_data.get('name')}")
+            if status_callback:
+                await status_callback("log", f"Auditing tool (Logic/Safety Check)...")
+
+            is_valid, critique_reason = await self.auditor_agent.validate_tool(tool_data)
+
+            if is_valid:
+                break # Success!
+
+            # Failed - Construct feedback
+            feedback = f"Your previous tool code was rejected by the Auditor.\nCritique: {critique_reason}\nFix: Address the critique and ensure mathematical correctness."
+            attempt += 1
+
+        if not is_valid:
+             response = f"I generated a tool to help with that, but it repeatedly failed my quality assurance audit.\n\nReason: {critique_reason}\n\nPlease try a slightly different request."
+             if user_id: await chat_service.add_message(user_id, chat_id, "assistant", response)
+             return None, response
+
+        # 3. Save to DB
+        async with AsyncSessionLocal() as db:
+            # Check if exists?
+            existing = await crud.get_tool_by_name(db, tool_data["name"])
+            if not existing:
+                if status_callback:
+                    await status_callback("log", "Saving new tool to database...")
+                # Serialize schema for DB
+                db_tool_data = tool_data.copy()
+                if isinstance(db_tool_data.get("json_schema"), dict):
+                    db_tool_data["json_schema"] = json.dumps(db_tool_data["json_schema"])
+
+                if user_id:
+                    db_tool_data["creator_id"] = user_id
+                db_tool_data["status"] = "temporary"
+
+
+                await crud.create_tool(db, db_tool_data)
+                logger.info("Tool saved to database.")
+            else:
+                logger.info("Tool already exists, using existing version.")
+
+        return tool_data, None
+
     async def process_message(self, message: str, user_id: str = None, chat_id: str = "default", context=None, status_callback=None) -> str:
         if status_callback:
             await status_callback("log", "Starting Manager Agent processing...")
@@ -113,48 +255,109 @@ Return EXACTLY 'SAFE' or 'UNSAFE'."""
         if user_id:
              await chat_service.add_message(user_id, chat_id, "user", message)
 
-        # Retrieve Context from Firestore
-        history = []
-        if user_id:
+        # The safety check, the history fetch and intent classification all start right away, so
+        # routing costs about one LLM round-trip instead of two. Classification is discarded if
+        # the message turns out to be unsafe. In "merged" GATEKEEPER_MODE, safety and intent come
+        # from a single gatekeeper completion instead of two.
+        timer = StageTimer()
+
+        async def load_history():
+            # Retrieve Context from the chat store
+            if not user_id:
+                return []
             try:
                 # Get last 10 messages for context
                 full_history = await chat_service.get_recent_messages(user_id, chat_id, limit=10)
-                
+
                 # Exclude the current message if it was already saved to avoid duplication in context
-                history = full_history[:-1] if full_history and full_history[-1]['content'] == message else full_history
+                return full_history[:-1] if full_history and full_history[-1]['content'] == message else full_history
             except Exception as e:
                 logger.error(f"Failed to retrieve history: {e}")
-        
+                return []
+
+        # SHORTCUT: Detection of Automated Analysis Requests
+        # If the message starts with our known preamble, skip classification and go straight to analysis.
+        is_analysis_request = message.strip().startswith("Here is the financial data") or "Please analyze this data" in message
+
+        async def classify():
+            history = await history_task
+            intent = await timer.run("classify", self._classify_intent(message, history=context_builder.build(user_id, chat_id, history, "classifier"), status_callback=status_callback))
+            if intent_router.log_path:
+                # Training data for the local router
+                await asyncio.to_thread(intent_router.log_intent, message, intent)
+            return intent
+
+        async def gatekeeper():
+            history = await history_task
+            verdict = await timer.run("gatekeeper", self._gatekeeper(message, history=context_builder.build(user_id, chat_id, history, "classifier"), status_callback=status_callback))
+            if verdict.safe and intent_router.log_path:
+                await asyncio.to_thread(intent_router.log_intent, message, verdict.intent)
+            return verdict
+
+        # Obvious intents are recognized locally, skipping the classifier LLM call
+        local_intent = intent_router.route(message) if INTENT_ROUTER_ENABLED and not is_analysis_request else None
+        needs_classification = not is_analysis_request and local_intent is None
+
         # GLOBAL SAFETY CHECK
         if status_callback:
             await status_callback("log", "Running Safety Check...")
-        is_safe = await self._safety_check(message, status_callback)
+        history_task = asyncio.create_task(timer.run("history", load_history()))
+        safety_task = classify_task = None
+        if needs_classification and GATEKEEPER_MODE == "merged":
+            if status_callback:
+                await status_callback("log", "Classifying Intent...")
+            classify_task = asyncio.create_task(gatekeeper())
+        else:
+            safety_task = asyncio.create_task(timer.run("safety", self._safety_check(message, status_callback)))
+            if needs_classification:
+                if status_callback:
+                    await status_callback("log", "Classifying Intent...")
+                classify_task = asyncio.create_task(classify())
+
+        verdict = None
+        if safety_task:
+            is_safe = await safety_task
+        else:
+            verdict = await classify_task
+            is_safe = verdict.safe
         if not is_safe:
+            for task in (classify_task, history_task):
+                if task:
+                    task.cancel()
             logger.warning(f"Safety check rejected: {message}")
             return "I cannot fulfill this request. I am a Financial Assistant, and this query seems unrelated to finance or potentially unsafe."
 
-        # SHORTCUT: Detection of Automated Analysis Requests
-        # If the message starts with our known preamble, skip classification and go straight to analysis.
-        if message.strip().startswith("Here is the financial data") or "Please analyze this data" in message:
-             logger.info("Detected automated analysis request. Routing to Interpreter Agent.")
+        if is_analysis_request:
+             history_task.cancel()
+             timer.mark("routing")
+             logger.info(f"Detected automated analysis request. Routing to Interpreter Agent. ({timer.summary()})")
              if status_callback:
                  await status_callback("log", "Routing to Interpreter Agent...")
              
-             response = await self.interpreter_agent.process_message(message, status_callback=status_callback)
+             response = await self.interpreter_agent.process_message(message, status_callback=status_callback, stream=CHAT_STREAMING)
              if user_id: await chat_service.add_message(user_id, chat_id, "assistant", response)
              return response
 
+        if local_intent:
+            intent = local_intent.intent
+            if status_callback:
+                await status_callback("log", f"Intent recognized locally ({local_intent.source}, confidence {local_intent.confidence:.2f})")
+        elif verdict:
+            intent = verdict.intent
+        else:
+            intent = await classify_task
+        history = await history_task
+        timer.mark("routing")
+        logger.info(f"Routing timings: {timer.summary()}")
         if status_callback:
-            await status_callback("log", "Classifying Intent...")
-        
-        intent = await self._classify_intent(message, history=history, status_callback=status_callback)
+            await status_callback("log", f"Routing took {timer.timings['routing']:.0f}ms ({timer.summary()})")
         logger.info(f"Intent detected: {intent}")
 
         if intent == "finance":
             if status_callback:
                 await status_callback("log", "Routing to Finance Agent")
             # Pass history as context
-            response = await self.finance_agent.process_message(message, user_id=user_id, context=history, status_callback=status_callback)
+            response = await self.finance_agent.process_message(message, user_id=user_id, context=context_builder.build(user_id, chat_id, history, "finance"), status_callback=status_callback, stream=CHAT_STREAMING)
             if user_id: 
                 logger.info(f"Saving Finance Agent response to history for user {user_id}, chat {chat_id}")
                 await chat_service.add_message(user_id, chat_id, "assistant", response)
@@ -164,7 +367,7 @@ Return EXACTLY 'SAFE' or 'UNSAFE'."""
         elif intent == "currency":
             if status_callback:
                 await status_callback("log", "Routing to Currency Agent")
-            response = await self.currency_agent.process_message(message, context=history, status_callback=status_callback)
+            response = await self.currency_agent.process_message(message, context=context_builder.build(user_id, chat_id, history, "currency"), status_callback=status_callback, stream=CHAT_STREAMING)
             if user_id: await chat_service.add_message(user_id, chat_id, "assistant", response)
             return response
         
@@ -172,89 +375,42 @@ Return EXACTLY 'SAFE' or 'UNSAFE'."""
             if status_callback:
                 await status_callback("log", "Processing Composite Request (Finance + Currency)")
             # Finance needs history too?
-            finance_response = await self.finance_agent.process_message(message, user_id=user_id, context=history, status_callback=status_callback)
+            finance_response = await self.finance_agent.process_message(message, user_id=user_id, context=context_builder.build(user_id, chat_id, history, "finance"), status_callback=status_callback)
             
             currency_prompt = f"The user wants: '{message}'. \nHere is the financial data found: {finance_response}\n\nPlease perform the conversion requested."
             
             # Context for currency now includes finance data AND history
-            combined_context = {"history": history, "finance_data": finance_response}
-            response = await self.currency_agent.process_message(currency_prompt, context=combined_context, status_callback=status_callback)
+            combined_context = {"history": context_builder.build(user_id, chat_id, history, "currency"), "finance_data": finance_response}
+            # Only the conversion is the answer; the finance step above is not streamed
+            response = await self.currency_agent.process_message(currency_prompt, context=combined_context, status_callback=status_callback, stream=CHAT_STREAMING)
             if user_id: await chat_service.add_message(user_id, chat_id, "assistant", response)
             return response
 
         elif intent == "new_tool":
-            logger.info("New tool needed. Triggering Architect...")
-            if status_callback:
-                await status_callback("log", "Intent: New Tool Creation. Triggering Architect...")
-            # 1. Generate
-            # 1b. Generation Loop (Architect -> Auditor feedback)
-            max_retries = 3
-            attempt = 0
-            feedback = ""
-            is_valid = False
-            critique_reason = ""
-            
-            while attempt <= max_retries:
-                if feedback:
-                    prompt_with_feedback = f"{message}\n\n<agent_critique>\n{feedback}\n</agent_critique>"
-                    logger.info(f"Retrying Architect with feedback (Attempt {attempt})")
-                    if status_callback:
-                         await status_callback("log", f"Auditor rejected tool. Retrying Architect with feedback...")
-                else:
-                    prompt_with_feedback = message
-
-                tool_data = await self.architect_agent.generate_tool(prompt_with_feedback)
-                
-                if "error" in tool_data:
-                    logger.error(f"Architect error: {tool_data['error']}")
-                    if attempt == max_retries:
-                         response = f"I tried to build a tool for that but failed: {tool_data['error']}"
-                         if user_id: await chat_service.add_message(user_id, chat_id, "assistant", response)
-                         return response
-                    attempt += 1
-                    continue
-
-                # 2. Audit
-                logger.info(f"Auditing tool: {tool_data.get('name')}")
+            # 0. Reuse an existing tool when one matches the request well enough
+            match = None
+            try:
+                match = await tool_index.search(message)
+            except Exception as e:
+                logger.error(f"Tool index search failed: {e}")
+
+            if match:
+                tool_data = tool_to_data(match.tool)
+                logger.info(f"Reusing tool {tool_data['name']} (score {match.score:.2f})")
                 if status_callback:
-                    await status_callback("log", f"Auditing tool (Logic/Safety Check)...")
-                
-                is_valid, critique_reason = await self.auditor_agent.validate_tool(tool_data)
-                
-                if is_valid:
-                    break # Success!
-                
-                # Failed - Construct feedback
-                feedback = f"Your previous tool code was rejected by the Auditor.\nCritique: {critique_reason}\nFix: Address the critique and ensure mathematical correctness."
-                attempt += 1
-            
-            if not is_valid:
-                 response = f"I generated a tool to help with that, but it repeatedly failed my quality assurance audit.\n\nReason: {critique_reason}\n\nPlease try a slightly different request."
-                 if user_id: await chat_service.add_message(user_id, chat_id, "assistant", response)
-                 return response
-            
-            # 3. Save to DB
-            async with AsyncSessionLocal() as db:
-                # Check if exists?
-                existing = await crud.get_tool_by_name(db, tool_data["name"])
-                if not existing:
-                    if status_callback:
-                        await status_callback("log", "Saving new tool to database...")
-                    # Serialize schema for DB
-                    db_tool_data = tool_data.copy()
-                    if isinstance(db_tool_data.get("json_schema"), dict):
-                        db_tool_data["json_schema"] = json.dumps(db_tool_data["json_schema"])
-                    
-                    if user_id:
-                        db_tool_data["creator_id"] = user_id
-                    db_tool_data["status"] = "temporary"
-
-                    
-                    await crud.create_tool(db, db_tool_data)
-                    logger.info("Tool saved to database.")
-                else:
-                    logger.info("Tool already exists, using existing version.")
-            
+                    await status_callback("log", f"Intent: Tool Request. Reusing existing tool '{tool_data.get('title') or tool_data['name']}' (match {match.score:.2f})")
+            else:
+                logger.info("New tool needed. Triggering Architect...")
+                if status_callback:
+                    await status_callback("log", "Intent: New Tool Creation. Triggering Architect...")
+                tool_data, failure = await self._build_tool(message, user_id, chat_id, status_callback)
+                if failure:
+                    return failure
+
+            # How replies refer to the tool
+            found = "I found the existing tool" if match else "I have built the tool"
+            failed = "Found an existing tool" if match else "Tool created"
+
             # 4. Execute (We use Auditor's capability or a localized exec)
             # Use LLM to extract arguments
             extraction_prompt = f"""
@@ -263,12 +419,12 @@ We have a tool "{tool_data['name']}" with schema: {json.dumps(tool_data['json_sc
 Extract the arguments for this tool from the message.
 Return ONLY JSON. If no arguments are needed, return {{}}.
 """
-            extraction = await client.chat.completions.create(
-                model=os.getenv("LLM_MODEL", "google/gemini-3-flash-preview"),
-                messages=[{"role": "user", "content": extraction_prompt}],
+            extraction = await llm_cache.complete(
+                "tool_args",
+                [{"role": "user", "content": extraction_prompt}],
                 response_format={"type": "json_object"}
             )
-            args = json.loads(extraction.choices[0].message.content)
+            args = json.loads(extraction)
             
             # --- ARGUMENT VALIDATION ---
             required_fields = tool_data.get("json_schema", {}).get("required", [])
@@ -279,7 +435,7 @@ Return ONLY JSON. If no arguments are needed, return {{}}.
                 logger.warning(f"Tool execution blocked. Missing args: {missing_fields}")
                 # Fallback response
                 readable_missing = ", ".join(missing_fields)
-                response = f"I have built the tool **{tool_data.get('title', tool_data['name'])}**, but I need more information to run it.\n\nPlease provide: **{readable_missing}**.\n\nAlternatively, you can input them manually below:"
+                response = f"{found} **{tool_data.get('title', tool_data['name'])}**, but I need more information to run it.\n\nPlease provide: **{readable_missing}**.\n\nAlternatively, you can input them manually below:"
                 response += f"\n\n[Open Tool at /tools/{tool_data['name']}](/tools/{tool_data['name']})"
                 
                 if user_id:
@@ -305,7 +461,7 @@ Return ONLY JSON. If no arguments are needed, return {{}}.
                 )
                 
                 if result.get("error"):
-                    response_msg = f"Tool created, but execution failed: {result['error']}"
+                    response_msg = f"{failed}, but execution failed: {result['error']}"
                     if user_id: await chat_service.add_message(user_id, chat_id, "assistant", response_msg)
                     return response_msg
 
@@ -321,16 +477,18 @@ Return ONLY JSON. If no arguments are needed, return {{}}.
                 if has_chart:
                     interpreter_ctx += "\nA chart was also generated."
 
-                formatted_analysis = await self.interpreter_agent.process_message(interpreter_ctx, status_callback=status_callback)
+                formatted_analysis = await self.interpreter_agent.process_message(interpreter_ctx, status_callback=status_callback, stream=CHAT_STREAMING)
 
                 # Construct Final Response
-                response = formatted_analysis
-                
+                suffix = ""
                 if has_chart:
-                    response += "\n\n(A chart was generated. Click the tool link to view it interactively.)"
+                    suffix += "\n\n(A chart was generated. Click the tool link to view it interactively.)"
 
                 # Standardize link format for frontend parsing
-                response += f"\n\n[Open Tool at /tools/{tool_data['name']}](/tools/{tool_data['name']})"
+                suffix += f"\n\n[Open Tool at /tools/{tool_data['name']}](/tools/{tool_data['name']})"
+                if CHAT_STREAMING and status_callback:
+                    await status_callback("delta", suffix)
+                response = formatted_analysis + suffix
 
                 if user_id: 
                     # If we really want to support components, we need to update how add_message works or pass extra data.
@@ -341,7 +499,7 @@ Return ONLY JSON. If no arguments are needed, return {{}}.
 
             except Exception as e:
                 logger.error(f"Tool execution failed: {e}")
-                err_msg = f"Tool created, but execution failed: {str(e)}"
+                err_msg = f"{failed}, but execution failed: {str(e)}"
                 if user_id: await chat_service.add_message(user_id, chat_id, "assistant", err_msg)
                 return err_msg
 
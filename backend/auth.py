@@ -1,4 +1,10 @@
+import asyncio
+import hashlib
 import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
 import firebase_admin
 from firebase_admin import auth, credentials
 from fastapi import Depends, HTTPException, status
@@ -35,14 +41,81 @@ except ValueError:
 
 security = HTTPBearer()
 
+class VerifiedTokenCache:
+    """
+    Decoded claims of already verified ID tokens, keyed by the token's SHA-256 and kept until the
+    token's own `exp`, so repeat requests skip the RSA signature check. Bounded LRU.
+    Revocation is not checked on either path (verify_id_token is called without check_revoked).
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        claims = self._entries.get(key)
+        if claims is None or claims.get("exp", 0) <= time.time():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return claims
+
+    def set(self, token: str, claims: dict):
+        if self.maxsize <= 0:
+            return
+        key = self._key(token)
+        self._entries[key] = claims
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+token_cache = VerifiedTokenCache(maxsize=int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000")))
+
+# Google's signing certs rotate a few times a day and are served with a max-age of several hours.
+# Refreshing them ahead of time keeps the fetch off the request path.
+CERT_REFRESH_SECONDS = float(os.getenv("AUTH_CERT_REFRESH_SECONDS", "3600"))
+
+def _refresh_certs():
+    from firebase_admin import _token_gen
+    # The SDK caches certs in its own HTTP-cache-aware session; a no-cache request replaces that
+    # entry. Reaching the session goes through SDK internals, hence the broad except in the caller.
+    verifier = auth._get_client(firebase_admin.get_app())._token_verifier
+    verifier.request(_token_gen.ID_TOKEN_CERT_URI, headers={"Cache-Control": "no-cache"})
+
+async def refresh_certs_periodically(interval: float = CERT_REFRESH_SECONDS):
+    """Background task (started in the app lifespan): fetch certs now, then every `interval` seconds."""
+    while True:
+        try:
+            await asyncio.to_thread(_refresh_certs)
+        except Exception as e:
+            logger.warning(f"Refreshing Firebase signing certificates failed: {e}")
+        await asyncio.sleep(interval)
+
 async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """
     Verifies the Firebase ID token and returns the decoded token dict (including uid, email, etc).
     """
     token = credentials.credentials
-    try:
-        decoded_token = auth.verify_id_token(token)
+    decoded_token = token_cache.get(token)
+    if decoded_token is not None:
         return decoded_token
+    try:
+        # Signature check (and a cert fetch, if the cache went stale) must not block the event loop
+        decoded_token = await asyncio.to_thread(auth.verify_id_token, token)
     except Exception as e:
         logger.error(f"CRITICAL AUTH ERROR: {e}")
         # logger.error(f"Token: {dict(credentials.credentials)[:10] if credentials else 'None'}...") # Safer logging
@@ -51,10 +124,13 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(secur
             detail=f"Invalid authentication credentials: {str(e)}",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    token_cache.set(token, decoded_token)
+    return decoded_token
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from . import crud, schemas, models
-from .database import get_db
+from .database import get_db, current_user_id
+from .services.user_cache import user_cache
 
 async def get_current_user(
     token: dict = Depends(verify_token), 
@@ -62,17 +138,24 @@ async def get_current_user(
 ) -> models.User:
     uid = token['uid']
     email = token.get('email', f"{uid}@placeholder.com")
-    
-    user = await crud.get_user(db, uid)
-    if not user:
-        # Create user with REAL email from token
-        user_create = schemas.UserCreate(id=uid, email=email)
-        user = await crud.create_user_if_not_exists(db, user_create)
-    elif user.email != email and "placeholder.com" in user.email:
-        # Update placeholder email to real email if it changed (and was placeholder)
-        # This fixes the "wrong email" issue for existing users
-        user.email = email
-        await db.commit()
-        await db.refresh(user)
-        
+
+    user = user_cache.get(uid)
+    if user is not None and user.email != email and "placeholder.com" in user.email:
+        # Let the DB path below replace the placeholder email
+        user = None
+    if user is None:
+        user = await crud.get_user(db, uid)
+        if not user:
+            # Create user with REAL email from token
+            user_create = schemas.UserCreate(id=uid, email=email)
+            user = await crud.create_user_if_not_exists(db, user_create)
+        elif user.email != email and "placeholder.com" in user.email:
+            # Update placeholder email to real email if it changed (and was placeholder)
+            # This fixes the "wrong email" issue for existing users
+            user.email = email
+            await db.commit()
+            await db.refresh(user)
+        user_cache.set(user)
+
+    current_user_id.set(user.id)
     return user
@@ -0,0 +1,112 @@
+"""
+Compares free-text categories (the old `expenses.category` column) with dictionary-encoded
+integer category ids.
+
+Usage:
+    python backend/benchmarks/category_encoding.py --rows 1000000
+
+Builds two throwaway SQLite tables holding the same expenses, one with a TEXT category and
+one with an INTEGER category_id, each indexed on its category column and on
+(user_id, category). Reports table/index sizes (dbstat) and the median time of the
+allocation-style GROUP BY, over all users and for a single user.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+USERS = [f"user_{i:04d}_firebase_uid_padding" for i in range(50)]
+CATEGORIES = ["Food & Dining", "Transportation", "Entertainment", "Shopping", "Utilities", "Health & Fitness", "Housing", "Travel"]
+
+def seed(conn: sqlite3.Connection, rows: int):
+    conn.executescript(
+        """
+        CREATE TABLE categories (id INTEGER PRIMARY KEY, user_id TEXT NOT NULL, name TEXT NOT NULL);
+        CREATE TABLE expenses_text (id INTEGER PRIMARY KEY, user_id TEXT, amount REAL, category TEXT, date TIMESTAMP);
+        CREATE TABLE expenses_id (id INTEGER PRIMARY KEY, user_id TEXT, amount REAL, category_id INTEGER, date TIMESTAMP);
+        """
+    )
+    category_ids = {}
+    for user_id in USERS:
+        for name in CATEGORIES:
+            cursor = conn.execute("INSERT INTO categories (user_id, name) VALUES (?, ?)", (user_id, name))
+            category_ids[(user_id, name)] = cursor.lastrowid
+
+    start = datetime(2015, 1, 1)
+    text_rows, id_rows = [], []
+    for i in range(rows):
+        user_id = random.choice(USERS)
+        name = random.choice(CATEGORIES)
+        amount = round(random.uniform(1, 200), 2)
+        date = start + timedelta(minutes=5 * i)
+        text_rows.append((user_id, amount, name, date))
+        id_rows.append((user_id, amount, category_ids[(user_id, name)], date))
+    conn.executemany("INSERT INTO expenses_text (user_id, amount, category, date) VALUES (?, ?, ?, ?)", text_rows)
+    conn.executemany("INSERT INTO expenses_id (user_id, amount, category_id, date) VALUES (?, ?, ?, ?)", id_rows)
+    conn.executescript(
+        """
+        CREATE INDEX ix_text_category ON expenses_text (category);
+        CREATE INDEX ix_text_user_category ON expenses_text (user_id, category, amount);
+        CREATE INDEX ix_id_category ON expenses_id (category_id);
+        CREATE INDEX ix_id_user_category ON expenses_id (user_id, category_id, amount);
+        """
+    )
+    conn.commit()
+
+def size_mb(conn: sqlite3.Connection, name: str) -> float:
+    pages = conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = ?", (name,)).fetchone()[0]
+    return (pages or 0) / 1024 / 1024
+
+def timed(conn: sqlite3.Connection, sql: str, params=(), repeat: int = 5) -> float:
+    """Median latency in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples)[len(samples) // 2]
+
+QUERIES = {
+    # Rollup rebuild shape; category ids are per user, so group on (user, category) in both
+    "group by (all users)": (
+        "SELECT user_id, category, SUM(amount) FROM expenses_text GROUP BY user_id, category",
+        # Names are looked up once per group, after aggregating on the integer
+        "SELECT t.user_id, c.name, t.total FROM (SELECT user_id, category_id, SUM(amount) AS total FROM expenses_id GROUP BY user_id, category_id) t "
+        "JOIN categories c ON c.id = t.category_id",
+    ),
+    "group by (one user)": (
+        "SELECT category, SUM(amount) FROM expenses_text WHERE user_id = ? GROUP BY category",
+        "SELECT c.name, t.total FROM (SELECT category_id, SUM(amount) AS total FROM expenses_id WHERE user_id = ? GROUP BY category_id) t "
+        "JOIN categories c ON c.id = t.category_id",
+    ),
+}
+
+def main(rows: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        print(f"Seeding {rows:,} expenses across {len(USERS)} users...")
+        seed(conn, rows)
+
+        print(f"{'object':>22} | {'text (MB)':>10} | {'int id (MB)':>11}")
+        for label, text_name, id_name in (
+            ("table", "expenses_text", "expenses_id"),
+            ("category index", "ix_text_category", "ix_id_category"),
+            ("(user, category) index", "ix_text_user_category", "ix_id_user_category"),
+        ):
+            print(f"{label:>22} | {size_mb(conn, text_name):>10.2f} | {size_mb(conn, id_name):>11.2f}")
+
+        print()
+        print(f"{'query':>22} | {'text (ms)':>10} | {'int id (ms)':>11}")
+        for label, (text_sql, id_sql) in QUERIES.items():
+            params = (USERS[0],) if "?" in text_sql else ()
+            print(f"{label:>22} | {timed(conn, text_sql, params):>10.2f} | {timed(conn, id_sql, params):>11.2f}")
+        conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+    main(args.rows)
@@ -0,0 +1,93 @@
+"""
+Compares OFFSET paging against cursor (keyset) paging on GET /expenses/.
+
+Usage:
+    python backend/benchmarks/expense_pagination.py --rows 1000000
+
+Builds a throwaway SQLite database with one heavy user and times a page fetch at
+increasing depths. Offset latency grows with depth; cursor latency should stay flat.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add the project root to sys.path to allow imports from backend
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(os.path.dirname(current_dir)))
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud, models
+
+USER_ID = "bench_user"
+PAGE_SIZE = 100
+
+async def seed(engine, rows: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+        await conn.execute(insert(models.User), [{"id": USER_ID, "email": "bench@example.com"}])
+        category_ids = (await conn.execute(
+            insert(models.Category).returning(models.Category.id),
+            [{"user_id": USER_ID, "name": name} for name in ("Food", "Transport", "Rent", "Shopping")],
+        )).scalars().all()
+        start = datetime(2015, 1, 1)
+        batch = []
+        for i in range(rows):
+            batch.append({
+                "user_id": USER_ID,
+                "amount": round(random.uniform(1, 200), 2),
+                "category_id": random.choice(category_ids),
+                "description": f"Expense {i}",
+                "date": start + timedelta(minutes=5 * i),
+            })
+            if len(batch) == 50_000:
+                await conn.execute(insert(models.Expense), batch)
+                batch = []
+        if batch:
+            await conn.execute(insert(models.Expense), batch)
+
+async def timed(coro_factory, repeat: int = 5) -> float:
+    """Median latency in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await coro_factory()
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples)[len(samples) // 2]
+
+async def main(rows: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        SessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        print(f"Seeding {rows:,} expenses...")
+        await seed(engine, rows)
+
+        depths = sorted({d for d in (0, 1_000, 10_000, 100_000, rows // 2, rows - PAGE_SIZE) if 0 <= d < rows})
+        print(f"{'depth':>10} | {'offset (ms)':>12} | {'cursor (ms)':>12}")
+        async with SessionLocal() as db:
+            for depth in depths:
+                # Build the cursor that points at the row just before `depth`
+                cursor = None
+                if depth:
+                    anchor = (await crud.get_expenses(db, USER_ID, skip=depth - 1, limit=1))[0]
+                    cursor = crud.encode_expense_cursor(anchor)
+
+                offset_ms = await timed(lambda: crud.get_expenses(db, USER_ID, skip=depth, limit=PAGE_SIZE))
+                cursor_ms = await timed(lambda: crud.get_expenses_page(db, USER_ID, cursor=cursor, limit=PAGE_SIZE))
+                print(f"{depth:>10,} | {offset_ms:>12.2f} | {cursor_ms:>12.2f}")
+
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows))
@@ -0,0 +1,111 @@
+"""
+Compares the full-text search backend against the old ilike('%term%') filter.
+
+Usage:
+    python backend/benchmarks/expense_search.py --rows 1000000
+
+Builds a throwaway SQLite database (FTS5 index maintained by triggers) and times a
+few search terms through both paths for a single user.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add the project root to sys.path to allow imports from backend
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(os.path.dirname(current_dir)))
+
+from sqlalchemy import insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import models
+from backend.services import search
+
+USER_ID = "bench_user"
+USERS = [USER_ID] + [f"user_{i}" for i in range(9)]
+MERCHANTS = ["Starbucks", "Uber", "Netflix", "Walmart", "Shell", "Amazon", "Spotify", "Rewe", "Lidl", "Airbnb"]
+WORDS = ["coffee", "ride", "groceries", "subscription", "fuel", "order", "music", "dinner", "rent", "ticket", "gift", "refund"]
+TERMS = ["coffee", "netflix subscription", "uber", "zzz_no_match"]
+
+async def seed(engine, rows: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+        await conn.execute(insert(models.User), [{"id": u, "email": f"{u}@example.com"} for u in USERS])
+        category_ids = {}
+        for u in USERS:
+            category_ids[u] = (await conn.execute(
+                insert(models.Category).returning(models.Category.id),
+                [{"user_id": u, "name": name} for name in ("Food", "Transport", "Entertainment", "Shopping")],
+            )).scalars().all()
+        start = datetime(2015, 1, 1)
+        batch = []
+        for i in range(rows):
+            user_id = random.choice(USERS)
+            batch.append({
+                "user_id": user_id,
+                "amount": round(random.uniform(1, 200), 2),
+                "category_id": random.choice(category_ids[user_id]),
+                "description": f"{random.choice(MERCHANTS)} {random.choice(WORDS)} {random.choice(WORDS)}",
+                "date": start + timedelta(minutes=5 * i),
+            })
+            if len(batch) == 50_000:
+                await conn.execute(insert(models.Expense), batch)
+                batch = []
+        if batch:
+            await conn.execute(insert(models.Expense), batch)
+
+def ilike_query(term: str):
+    return (
+        select(models.Expense)
+        .where(
+            models.Expense.user_id == USER_ID,
+            or_(models.Expense.category.ilike(f"%{term}%"), models.Expense.description.ilike(f"%{term}%")),
+        )
+        .order_by(models.Expense.date.desc())
+        .limit(20)
+    )
+
+async def timed(coro_factory, repeat: int = 5) -> float:
+    """Median latency in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await coro_factory()
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples)[len(samples) // 2]
+
+async def main(rows: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        SessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        print(f"Seeding {rows:,} expenses across {len(USERS)} users...")
+        await seed(engine, rows)
+
+        print(f"{'term':>22} | {'ilike (ms)':>11} | {'fts (ms)':>9}")
+        async with SessionLocal() as db:
+            for term in TERMS:
+                async def run_ilike():
+                    return (await db.execute(ilike_query(term))).scalars().all()
+
+                async def run_fts():
+                    return await search.search_expenses(db, USER_ID, term, limit=20)
+
+                # ilike treats the whole string as one substring; only compare single-word terms
+                ilike_ms = await timed(run_ilike) if " " not in term else float("nan")
+                fts_ms = await timed(run_fts)
+                print(f"{term:>22} | {ilike_ms:>11.2f} | {fts_ms:>9.2f}")
+
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows))
@@ -0,0 +1,128 @@
+"""
+Replays recorded chat messages through the manager's pre-routing LLM calls and compares the
+two GATEKEEPER_MODEs:
+- split:  _safety_check and _classify_intent, concurrently (two completions per message)
+- merged: one _gatekeeper completion returning {safe, intent, confidence}
+
+Usage:
+    python backend/benchmarks/gatekeeper_replay.py
+    python backend/benchmarks/gatekeeper_replay.py --data recorded.jsonl --repeat 3
+    python backend/benchmarks/gatekeeper_replay.py --offline
+
+Messages are JSONL lines of {"message", "history" (optional), "safe", "intent"}; the default set
+is gatekeeper_messages.jsonl next to this file. Reports per mode: latency (p50/p95 per message),
+completions, prompt/completion tokens as billed (response.usage) and agreement with the labels.
+Requires OPENROUTER_API_KEY and uses LLM_MODEL. --offline sends nothing and only compares the
+locally estimated prompt tokens of both modes.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+# Add the project root to sys.path to allow imports from backend
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(os.path.dirname(current_dir)))
+
+from backend.agents.manager import manager_agent
+from backend.services.context_builder import MESSAGE_OVERHEAD_TOKENS, context_builder, estimate_tokens
+from backend.services.llm_cache import llm_cache
+from backend.services.llm_gateway import llm_gateway
+
+DEFAULT_DATA = os.path.join(current_dir, "gatekeeper_messages.jsonl")
+
+class UsageRecorder:
+    """Wraps llm_gateway.complete to count completions and tokens."""
+
+    def __init__(self, complete, offline: bool):
+        self.complete_call = complete
+        self.offline = offline
+        self.reset()
+
+    def reset(self):
+        self.calls = self.prompt_tokens = self.completion_tokens = self.estimated_prompt_tokens = 0
+
+    async def complete(self, stage, messages, **kwargs):
+        self.calls += 1
+        self.estimated_prompt_tokens += sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+        if self.offline:
+            content = '{"safe": true, "intent": "finance", "confidence": 1.0}' if "response_format" in kwargs else "SAFE"
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+        response = await self.complete_call(stage, messages, **kwargs)
+        if response.usage:
+            self.prompt_tokens += response.usage.prompt_tokens
+            self.completion_tokens += response.usage.completion_tokens
+        return response
+
+async def route(mode: str, record: dict):
+    """(safe, intent) the way process_message decides them before routing."""
+    history = context_builder.build(None, "replay", record.get("history", []), "classifier")
+    if mode == "merged":
+        verdict = await manager_agent._gatekeeper(record["message"], history=history)
+        return verdict.safe, verdict.intent
+    return await asyncio.gather(
+        manager_agent._safety_check(record["message"]),
+        manager_agent._classify_intent(record["message"], history=history),
+    )
+
+async def replay(mode: str, records, recorder: UsageRecorder, repeat: int):
+    recorder.reset()
+    latencies, safe_correct, intent_correct, intent_total = [], 0, 0, 0
+    for _ in range(repeat):
+        for record in records:
+            start = time.perf_counter()
+            safe, intent = await route(mode, record)
+            latencies.append((time.perf_counter() - start) * 1000)
+            safe_correct += safe == record["safe"]
+            if record["safe"]:
+                intent_total += 1
+                intent_correct += intent == record["intent"]
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    messages = len(records) * repeat
+    return {
+        "p50_ms": pick(0.5),
+        "p95_ms": pick(0.95),
+        "calls": recorder.calls / messages,
+        "estimated_prompt_tokens": recorder.estimated_prompt_tokens / messages,
+        "prompt_tokens": recorder.prompt_tokens / messages,
+        "completion_tokens": recorder.completion_tokens / messages,
+        "safe_accuracy": safe_correct / messages,
+        "intent_accuracy": intent_correct / intent_total if intent_total else float("nan"),
+    }
+
+async def main(path: str, repeat: int, offline: bool):
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if not offline and not os.getenv("OPENROUTER_API_KEY"):
+        print("OPENROUTER_API_KEY is not set; running --offline (estimated prompt tokens only).")
+        offline = True
+
+    recorder = UsageRecorder(llm_gateway.complete, offline)
+    llm_gateway.complete = recorder.complete
+    # Measure the model, not the response cache
+    llm_cache.bypass.update(("safety", "classify", "gatekeeper"))
+
+    results = {mode: await replay(mode, records, recorder, 1 if offline else repeat) for mode in ("split", "merged")}
+
+    print(f"{len(records)} recorded messages, model {llm_gateway.model}, per message:")
+    if offline:
+        print(f"{'mode':>6} | {'completions':>11} | {'est. prompt tokens':>18}")
+        for mode, r in results.items():
+            print(f"{mode:>6} | {r['calls']:>11.1f} | {r['estimated_prompt_tokens']:>18.0f}")
+        return
+    print(f"{'mode':>6} | {'p50 (ms)':>8} | {'p95 (ms)':>8} | {'completions':>11} | {'prompt tok':>10} | {'output tok':>10} | {'safe acc':>8} | {'intent acc':>10}")
+    for mode, r in results.items():
+        print(f"{mode:>6} | {r['p50_ms']:>8.0f} | {r['p95_ms']:>8.0f} | {r['calls']:>11.1f} | {r['prompt_tokens']:>10.0f} | "
+              f"{r['completion_tokens']:>10.0f} | {r['safe_accuracy']:>8.1%} | {r['intent_accuracy']:>10.1%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DEFAULT_DATA, help="Recorded messages (JSONL)")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the set this many times")
+    parser.add_argument("--offline", action="store_true", help="Only compare estimated prompt tokens, without API calls")
+    args = parser.parse_args()
+    asyncio.run(main(args.data, args.repeat, args.offline))
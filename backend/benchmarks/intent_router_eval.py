@@ -0,0 +1,73 @@
+"""
+Offline evaluation of the local intent router (backend/agents/intent_router.py).
+
+Usage:
+    python backend/benchmarks/intent_router_eval.py
+    python backend/benchmarks/intent_router_eval.py --data intent_log.jsonl --threshold 0.7
+
+Runs k-fold cross-validation over the seed examples plus any --data files (JSONL lines of
+{"message", "intent"}, e.g. INTENT_LOG_PATH). Per threshold it reports how many messages the
+router answers locally (coverage) and how many of those it gets right; everything below the
+threshold would go to the LLM. Also reports training time and per-message routing latency.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+# Add the project root to sys.path to allow imports from backend
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(os.path.dirname(current_dir)))
+
+from backend.agents.intent_router import EXAMPLES_PATH, IntentRouter, load_examples
+
+def cross_validate(examples, folds: int, seed: int = 0):
+    """(expected intent, RoutedIntent or None, latency in µs) for every example, predicted by a
+    router that was trained without it."""
+    examples = examples[:]
+    random.Random(seed).shuffle(examples)
+    results, train_ms = [], []
+    for fold in range(folds):
+        test = examples[fold::folds]
+        train = [e for i, e in enumerate(examples) if i % folds != fold]
+        start = time.perf_counter()
+        router = IntentRouter.train(train, log_path=None)
+        train_ms.append((time.perf_counter() - start) * 1000)
+        for message, intent in test:
+            start = time.perf_counter()
+            routed = router.classify(message)
+            results.append((intent, routed, (time.perf_counter() - start) * 1_000_000))
+    return results, sorted(train_ms)[len(train_ms) // 2]
+
+def main(paths, folds: int, thresholds):
+    examples = load_examples(paths)
+    print(f"{len(examples)} labelled messages: {dict(Counter(intent for _, intent in examples))}")
+    results, train_ms = cross_validate(examples, folds)
+
+    latencies = sorted(r[2] for r in results)
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    print(f"training: {train_ms:.1f} ms per fold | routing latency: p50 {pick(0.5):.0f} µs, p95 {pick(0.95):.0f} µs")
+
+    routed = [(intent, r) for intent, r, _ in results if r is not None]
+    correct = sum(r.intent == intent for intent, r in routed)
+    print(f"local accuracy without threshold: {correct / len(results):.1%} ({len(results) - len(routed)} deferred as referring to history)")
+    for source in ("rule", "model"):
+        subset = [(intent, r) for intent, r in routed if r.source == source]
+        if subset:
+            print(f"  {source:>5}: {len(subset)} messages, {sum(r.intent == i for i, r in subset) / len(subset):.1%} correct")
+
+    print(f"{'threshold':>9} | {'coverage':>8} | {'accuracy':>8} | {'llm calls saved':>15}")
+    for threshold in thresholds:
+        answered = [(intent, r) for intent, r in routed if r.confidence >= threshold]
+        accuracy = sum(r.intent == intent for intent, r in answered) / len(answered) if answered else float("nan")
+        print(f"{threshold:>9.2f} | {len(answered) / len(results):>8.1%} | {accuracy:>8.1%} | {len(answered):>15}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", action="append", default=[], help="Extra labelled JSONL file (repeatable)")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--threshold", type=float, action="append", help="Threshold(s) to report (default: 0.5 to 0.9)")
+    args = parser.parse_args()
+    main([EXAMPLES_PATH] + args.data, args.folds, args.threshold or [0.5, 0.6, 0.7, 0.8, 0.9])
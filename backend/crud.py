@@ -1,11 +1,122 @@
+import base64
+import json
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import insert, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from . import models, schemas
+from .services import categories, rollup, data_version, search as expense_search
+from .services.user_cache import user_cache
+from .services.tool_index import tool_index
+
+logger = logging.getLogger(__name__)
 
 async def get_expenses(db: AsyncSession, user_id: str, skip: int = 0, limit: int = 100):
-    result = await db.execute(select(models.Expense).where(models.Expense.user_id == user_id).order_by(models.Expense.date.desc()).offset(skip).limit(limit))
+    result = await db.execute(select(models.Expense).where(models.Expense.user_id == user_id).order_by(models.Expense.date.desc(), models.Expense.id.desc()).offset(skip).limit(limit))
     return result.scalars().all()
 
+EXPENSE_COPY_COLUMNS = ("user_id", "amount", "category_id", "description", "date")
+
+async def bulk_create_expenses(db: AsyncSession, rows: list[dict], user_id: str):
+    """
+    Inserts a batch of validated expense dicts in one round-trip (COPY on Postgres,
+    executemany elsewhere) and applies the matching rollup deltas. Category names are
+    resolved to ids once per distinct name. Caller commits.
+    """
+    if not rows:
+        return 0
+
+    category_ids = await categories.resolve_ids(db, user_id, (row.get("category") or "" for row in rows))
+    for row in rows:
+        row["user_id"] = user_id
+        row["category_id"] = category_ids[row.pop("category", None) or ""]
+        if row.get("date") is None:
+            row["date"] = datetime.utcnow()
+
+    if db.bind.dialect.name == "postgresql":
+        conn = await db.connection()
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            models.Expense.__tablename__,
+            records=[tuple(row.get(col) for col in EXPENSE_COPY_COLUMNS) for row in rows],
+            columns=list(EXPENSE_COPY_COLUMNS),
+        )
+    else:
+        await db.execute(insert(models.Expense.__table__), rows)
+
+    # Core inserts bypass the ORM flush hook, so keep the rollup in step here
+    deltas = rollup.deltas_for(user_id, ((row["date"], row["category_id"], row["amount"]) for row in rows))
+    await db.run_sync(lambda session: rollup.apply_deltas(session.connection(), deltas))
+    data_version.mark_dirty(db, user_id)
+    return len(rows)
+
+# Keyset pagination
+# A cursor is the (date, id) of the last row of the previous page, so the next page
+# is a seek on the (user_id, date, id) ordering instead of an OFFSET scan.
+def encode_expense_cursor(expense: models.Expense) -> str:
+    payload = json.dumps({"d": expense.date.isoformat(), "id": expense.id})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def decode_expense_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(payload["d"]), int(payload["id"])
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+async def get_expenses_page(db: AsyncSession, user_id: str, cursor: Optional[str] = None, limit: int = 100):
+    """
+    Returns (expenses, next_cursor). next_cursor is None on the last page.
+    """
+    query = select(models.Expense).where(models.Expense.user_id == user_id)
+    if cursor:
+        last_date, last_id = decode_expense_cursor(cursor)
+        query = query.where(tuple_(models.Expense.date, models.Expense.id) < (last_date, last_id))
+    query = query.order_by(models.Expense.date.desc(), models.Expense.id.desc()).limit(limit)
+
+    result = await db.execute(query)
+    expenses = result.scalars().all()
+    next_cursor = encode_expense_cursor(expenses[-1]) if expenses and len(expenses) == limit else None
+    return expenses, next_cursor
+
+def filter_expenses(user_id: str, dialect_name: str, category: str = None, search: str = None, date: str = None, end_date: str = None):
+    """
+    Builds the filtered expense query shared by the Finance agent and the export endpoint.
+    `search` goes through the full-text index of `dialect_name` (see services/search.py).
+    `date` / `end_date` are inclusive YYYY-MM-DD bounds; malformed values are ignored.
+    """
+    query = select(models.Expense).filter(models.Expense.user_id == user_id)
+    if category:
+        query = query.filter(categories.category_condition(user_id, category))
+    
+    if search:
+        condition = expense_search.search_condition(dialect_name, search, user_id)
+        if condition is not None:
+            query = query.filter(condition)
+    if date:
+        try:
+            start_date_obj = datetime.strptime(date, "%Y-%m-%d")
+            query = query.filter(models.Expense.date >= start_date_obj)
+        except ValueError:
+            logger.warning(f"Invalid start date format: {date}")
+            
+    if end_date:
+        try:
+            end_date_obj = datetime.strptime(end_date, "%Y-%m-%d")
+            # Set to end of day for inclusive range
+            end_date_obj = end_date_obj.replace(hour=23, minute=59, second=59)
+            query = query.filter(models.Expense.date <= end_date_obj)
+        except ValueError:
+            logger.warning(f"Invalid end_date format: {end_date}")
+    return query
+
 async def create_expense(db: AsyncSession, expense: schemas.ExpenseCreate, user_id: str):
     db_expense = models.Expense(**expense.model_dump(), user_id=user_id)
     db.add(db_expense)
@@ -27,6 +138,7 @@ async def create_tool(db: AsyncSession, tool_data: dict):
     db_tool = models.Tool(**tool_data)
     db.add(db_tool)
     await db.commit()
+    tool_index.invalidate()
     await db.refresh(db_tool)
     return db_tool
 
@@ -40,13 +152,16 @@ async def get_user(db: AsyncSession, user_id: str):
     return result.scalars().first()
 
 async def create_user_if_not_exists(db: AsyncSession, user: schemas.UserCreate):
-    db_user = await get_user(db, user.id)
-    if not db_user:
-        db_user = models.User(**user.model_dump())
-        db.add(db_user)
-        await db.commit()
-        await db.refresh(db_user)
-    return db_user
+    """
+    Inserts the user unless the id exists (INSERT ... ON CONFLICT DO NOTHING), then loads the row.
+    Concurrent first logins therefore create the user exactly once without failing.
+    """
+    dialect_insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+    await db.execute(
+        dialect_insert(models.User).values(**user.model_dump()).on_conflict_do_nothing(index_elements=[models.User.id])
+    )
+    await db.commit()
+    return await get_user(db, user.id)
 
 async def update_user(db: AsyncSession, user_id: str, user_update: schemas.UserUpdate):
     db_user = await get_user(db, user_id)
@@ -56,11 +171,56 @@ async def update_user(db: AsyncSession, user_id: str, user_update: schemas.UserU
             setattr(db_user, key, value)
         await db.commit()
         await db.refresh(db_user)
+    user_cache.invalidate(user_id)
     return db_user
 
-async def delete_user_data(db: AsyncSession, user_id: str):
-    # Delete all expenses
-    await db.execute(models.Expense.__table__.delete().where(models.Expense.user_id == user_id))
-    # Delete other user-specific data if any (e.g. tools created by user?) 
-    # For now just expenses.
+DELETE_BATCH_SIZE = 1000
+
+async def delete_expenses_batch(db: AsyncSession, user_id: str, batch_size: int = DELETE_BATCH_SIZE) -> int:
+    """
+    Deletes up to `batch_size` of the user's expenses and subtracts them from the rollup.
+    Returns the number deleted. Caller commits.
+    """
+    rows = (await db.execute(
+        select(models.Expense.id, models.Expense.date, models.Expense.category_id, models.Expense.amount)
+        .where(models.Expense.user_id == user_id)
+        .limit(batch_size)
+    )).all()
+    if not rows:
+        return 0
+    table = models.Expense.__table__
+    await db.execute(table.delete().where(table.c.id.in_([row.id for row in rows])))
+    # Core deletes bypass the ORM flush hook
+    deltas = rollup.deltas_for(user_id, ((row.date, row.category_id, row.amount) for row in rows if row.date is not None), sign=-1)
+    await db.run_sync(lambda session: rollup.apply_deltas(session.connection(), deltas))
+    data_version.mark_dirty(db, user_id)
+    return len(rows)
+
+async def delete_tools_batch(db: AsyncSession, user_id: str, batch_size: int = DELETE_BATCH_SIZE) -> int:
+    """Deletes up to `batch_size` tools created by the user. Caller commits."""
+    ids = (await db.execute(select(models.Tool.id).where(models.Tool.creator_id == user_id).limit(batch_size))).scalars().all()
+    if ids:
+        await db.execute(models.Tool.__table__.delete().where(models.Tool.__table__.c.id.in_(ids)))
+        # Rebuilt on the next search, which may run before the caller commits; the TTL covers that
+        tool_index.invalidate()
+    return len(ids)
+
+async def delete_user_data(db: AsyncSession, user_id: str, batch_size: int = DELETE_BATCH_SIZE, on_batch=None):
+    """
+    Deletes the user's expenses (and rollup buckets), created tools and categories, committing
+    after every batch of `batch_size` rows so no single transaction holds locks for long.
+    `on_batch(stage, count)` is called after each commit.
+    """
+    for stage, delete_batch in (("expenses", delete_expenses_batch), ("tools", delete_tools_batch)):
+        while deleted := await delete_batch(db, user_id, batch_size):
+            await db.commit()
+            if on_batch:
+                on_batch(stage, deleted)
+
+    # Expenses are gone, so the rollup is already empty unless it had drifted
+    await rollup.delete_user(db, user_id)
+    # A user has few categories; they can only go once no expense references them
+    deleted = await categories.delete_user(db, user_id)
     await db.commit()
+    if on_batch:
+        on_batch("categories", deleted)
@@ -1,26 +1,169 @@
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event, make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
 
 import os
 from dotenv import load_dotenv
 
+from .services import data_version
+
 load_dotenv()
 
 # Get DB URL from env, default to SQLite for local dev if not set
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./finance.db")
 
-engine = create_async_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    # SQLite specific args, ignored for Postgres
-    connect_args={"check_same_thread": False} if "sqlite" in SQLALCHEMY_DATABASE_URL else {}
-)
+# Engine profiles. DB_ENGINE_PROFILE picks one (default: by URL scheme); every setting can
+# also be overridden on its own through the env var of the same name.
+ENGINE_PROFILES = {
+    "dev-sqlite": {
+        "DB_POOL_SIZE": 5,
+        "DB_MAX_OVERFLOW": 10,
+        "DB_POOL_TIMEOUT": 30,
+        "DB_POOL_RECYCLE": -1,
+        "DB_POOL_PRE_PING": False,
+        # WAL lets readers run alongside the single writer; NORMAL only fsyncs at checkpoints
+        "SQLITE_JOURNAL_MODE": "WAL",
+        "SQLITE_SYNCHRONOUS": "NORMAL",
+        "SQLITE_MMAP_SIZE": 256 * 1024 * 1024,
+        # Wait for the write lock instead of failing with "database is locked"
+        "SQLITE_BUSY_TIMEOUT_MS": 5000,
+    },
+    "prod-postgres": {
+        "DB_POOL_SIZE": 10,
+        "DB_MAX_OVERFLOW": 20,
+        "DB_POOL_TIMEOUT": 30,
+        # Recycle before typical proxy / load balancer idle timeouts; ping to drop dead connections
+        "DB_POOL_RECYCLE": 1800,
+        "DB_POOL_PRE_PING": True,
+        # Prepared statements cached per connection; set 0 behind pgbouncer in transaction mode
+        "DB_STATEMENT_CACHE_SIZE": 100,
+    },
+    "test": {
+        # Single shared in-memory connection; durability is irrelevant
+        "SQLITE_JOURNAL_MODE": "MEMORY",
+        "SQLITE_SYNCHRONOUS": "OFF",
+        "SQLITE_BUSY_TIMEOUT_MS": 5000,
+    },
+}
+
+def _setting(profile: dict, name: str):
+    default = profile.get(name)
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    if isinstance(default, bool):
+        return value.lower() in ("1", "true", "yes")
+    if isinstance(default, int):
+        return int(value)
+    return value
+
+def default_profile(url: str) -> str:
+    return os.getenv("DB_ENGINE_PROFILE") or ("dev-sqlite" if url.startswith("sqlite") else "prod-postgres")
+
+def _set_sqlite_pragmas(engine, profile: dict):
+    pragmas = [
+        ("journal_mode", _setting(profile, "SQLITE_JOURNAL_MODE")),
+        ("synchronous", _setting(profile, "SQLITE_SYNCHRONOUS")),
+        ("mmap_size", _setting(profile, "SQLITE_MMAP_SIZE")),
+        ("busy_timeout", _setting(profile, "SQLITE_BUSY_TIMEOUT_MS")),
+    ]
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            if value is not None:
+                cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def create_engine_for(url: str, profile_name: Optional[str] = None, **kwargs):
+    """
+    create_async_engine with the pool / driver settings of an engine profile
+    (dev-sqlite, prod-postgres or test) and, for SQLite, the profile's pragmas on every connection.
+    """
+    profile_name = profile_name or default_profile(url)
+    profile = ENGINE_PROFILES[profile_name]
+    options = {}
+    connect_args = {}
+    if url.startswith("sqlite"):
+        connect_args["check_same_thread"] = False
+        if make_url(url).database in (None, "", ":memory:"):
+            # Every new connection would be a fresh, empty in-memory database
+            options["poolclass"] = StaticPool
+    if "poolclass" not in options:
+        for option, name in (("pool_size", "DB_POOL_SIZE"), ("max_overflow", "DB_MAX_OVERFLOW"), ("pool_timeout", "DB_POOL_TIMEOUT"), ("pool_recycle", "DB_POOL_RECYCLE"), ("pool_pre_ping", "DB_POOL_PRE_PING")):
+            value = _setting(profile, name)
+            if value is not None:
+                options[option] = value
+    if url.startswith("postgresql+asyncpg"):
+        cache_size = _setting(profile, "DB_STATEMENT_CACHE_SIZE")
+        if cache_size is not None:
+            # SQLAlchemy's adapter cache and asyncpg's own statement cache
+            connect_args["prepared_statement_cache_size"] = cache_size
+            connect_args["statement_cache_size"] = cache_size
+
+    options.update(kwargs)
+    options["connect_args"] = {**connect_args, **options.get("connect_args", {})}
+    engine = create_async_engine(url, **options)
+    if url.startswith("sqlite"):
+        _set_sqlite_pragmas(engine, profile)
+    return engine
+
+engine = create_engine_for(SQLALCHEMY_DATABASE_URL)
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
+# Optional read replica for aggregates and listings. Without it, reads use the primary.
+SQLALCHEMY_READ_DATABASE_URL = os.getenv("DATABASE_READ_URL")
+# After a user commits a write, their reads stay on the primary this long (replica lag budget)
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+read_engine = create_engine_for(SQLALCHEMY_READ_DATABASE_URL) if SQLALCHEMY_READ_DATABASE_URL else engine
+
+# Set by auth.get_current_user, so read sessions know whose writes to honour
+current_user_id: ContextVar[Optional[str]] = ContextVar("current_user_id", default=None)
+
+def make_read_session_class(primary, replica):
+    """
+    Session class that sends statements to `replica`, except for a user who committed a write
+    in the last READ_YOUR_WRITES_SECONDS (read-your-writes). The user comes from
+    `session.info["user_id"]`, else from the request's `current_user_id`.
+    """
+    class ReadSession(Session):
+        def get_bind(self, mapper=None, clause=None, **kwargs):
+            user_id = self.info.get("user_id") or current_user_id.get()
+            if replica is primary or data_version.wrote_recently(user_id, READ_YOUR_WRITES_SECONDS):
+                return primary.sync_engine
+            return replica.sync_engine
+
+    return ReadSession
+
+# The primary stays the session's nominal bind (db.bind.dialect etc.); get_bind does the routing
+AsyncReadSessionLocal = sessionmaker(
+    engine, class_=AsyncSession, sync_session_class=make_read_session_class(engine, read_engine), expire_on_commit=False
+)
+
 Base = declarative_base()
 
 async def get_db():
     async with AsyncSessionLocal() as db:
         yield db
+
+async def get_read_db():
+    """
+    Session for read-only endpoints; uses the replica when DATABASE_READ_URL is set.
+    """
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+def get_session_factory():
+    """
+    Dependency for work that outlives the request (background jobs open their own sessions).
+    """
+    return AsyncSessionLocal
@@ -1,18 +1,31 @@
 from contextlib import asynccontextmanager
+import asyncio
+import csv
 import logging
 
-from fastapi import FastAPI, Depends, HTTPException
+from typing import Optional
+
+from fastapi import FastAPI, Depends, HTTPException, Query, Response, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from dotenv import load_dotenv
 
 load_dotenv(".env.local") 
 load_dotenv() 
 
-from .database import engine, Base, get_db
-from .auth import get_current_user # Initialize Firebase Admin EARLY
+from .database import engine, Base, get_db, get_read_db, get_session_factory, AsyncSessionLocal
+from .auth import get_current_user, refresh_certs_periodically # Initialize Firebase Admin EARLY
 from . import models, schemas, crud, agents
 from .routers import analytics
+from .services import rollup, expense_import, expense_export, search, user_deletion
+from .services.chat_service import chat_service
+from .services.context_builder import context_builder
+from .services.stage_timing import stage_stats
+from .agents.intent_router import intent_router
+from .services.llm_gateway import llm_gateway
+from .services.llm_cache import llm_cache
+from .services.tool_index import tool_index
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -25,11 +38,19 @@ async def lifespan(app: FastAPI):
     try:
         async with engine.begin() as conn:
             await conn.run_sync(models.Base.metadata.create_all)
+        async with AsyncSessionLocal() as db:
+            await rollup.backfill_if_empty(db)
     except Exception as e:
         logger.critical(f"DATABASE CONNECTION FAILED: {e}")
         logger.critical("Check your DATABASE_URL permissions and ensure the password is URL-encoded if it has special chars.")
         raise e
+    cert_refresh = asyncio.create_task(refresh_certs_periodically())
+    chat_service.start()
     yield
+    cert_refresh.cancel()
+    # Write out chat messages still waiting in the write-behind queue
+    await chat_service.stop()
+    await llm_gateway.aclose()
 
 app = FastAPI(title="Finance Tracker API", lifespan=lifespan)
 
@@ -48,6 +69,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 @app.get("/")
@@ -63,21 +85,92 @@ async def read_users_me(current_user: models.User = Depends(get_current_user)):
 async def update_user_me(user_update: schemas.UserUpdate, current_user: models.User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     return await crud.update_user(db, current_user.id, user_update)
 
-@app.delete("/users/me/data")
-async def clear_user_data(current_user: models.User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    await crud.delete_user_data(db, current_user.id)
-    return {"status": "success", "message": "All user data deleted"}
+@app.delete("/users/me/data", response_model=schemas.DataDeletionJob, status_code=202)
+async def clear_user_data(current_user: models.User = Depends(get_current_user), session_factory=Depends(get_session_factory)):
+    """
+    Starts deleting all of the user's data (expenses, categories, created tools and chats) in
+    the background. Poll GET /users/me/data/deletion for progress.
+    """
+    return user_deletion.start(current_user.id, session_factory)
+
+@app.get("/users/me/data/deletion", response_model=schemas.DataDeletionJob)
+async def get_user_data_deletion(current_user: models.User = Depends(get_current_user)):
+    job = user_deletion.get_job(current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No data deletion has been started")
+    return job
 
 @app.post("/expenses/", response_model=schemas.Expense)
 async def create_expense(expense: schemas.ExpenseCreate, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     return await crud.create_expense(db=db, expense=expense, user_id=current_user.id)
 
+@app.post("/expenses/import", response_model=schemas.ExpenseImportResult)
+async def import_expenses(file: UploadFile = File(...), format: Optional[str] = None, default_category: str = "Imported", db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    """
+    Bulk-imports expenses from a CSV (amount,category,description,date) or OFX/QFX bank export.
+    OFX debits become expenses in `default_category`; credits are skipped.
+    Invalid rows are reported per row and do not abort the import.
+    """
+    try:
+        fmt = expense_import.detect_format(file.filename, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Rows inserted before the error are discarded with the uncommitted session
+    try:
+        return await expense_import.import_expenses(db, current_user.id, file.file, fmt, default_category=default_category)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="The file is not valid UTF-8. Export it as UTF-8 and try again.")
+    except csv.Error as e:
+        raise HTTPException(status_code=400, detail=f"Malformed CSV: {e}")
+
+@app.get("/expenses/export")
+async def export_expenses(format: str = "csv", category: Optional[str] = None, search: Optional[str] = None, date: Optional[str] = None, end_date: Optional[str] = None, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    """
+    Streams the user's full expense history as csv, ndjson or parquet with flat memory use.
+    Accepts the same filters as the Finance agent (category, search, date / end_date as YYYY-MM-DD).
+    """
+    if format not in expense_export.MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format '{format}'. Use one of: {', '.join(expense_export.MEDIA_TYPES)}")
+    if format == "parquet" and not expense_export.parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export requires the 'pyarrow' package.")
+
+    stream = expense_export.export_expenses(db, current_user.id, format, category=category, search=search, date=date, end_date=end_date)
+    return StreamingResponse(
+        stream,
+        media_type=expense_export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="expenses.{format}"'},
+    )
+
+@app.get("/expenses/search", response_model=list[schemas.Expense])
+async def search_expenses(q: str, limit: int = Query(20, ge=1, le=100), offset: int = Query(0, ge=0), db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    """
+    Full-text search over expense categories and descriptions, best match first.
+    Every word must match; words are prefix-matched ("coff" finds "Coffee").
+    """
+    return await search.search_expenses(db, current_user.id, q, limit=limit, offset=offset)
+
 @app.get("/expenses/", response_model=list[schemas.Expense])
-async def read_expenses(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    return await crud.get_expenses(db, user_id=current_user.id, skip=skip, limit=limit)
+async def read_expenses(response: Response, skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    """
+    Lists expenses newest first.
+    Pass the X-Next-Cursor header of the previous page as `cursor` to seek to the next page
+    instead of using `skip` (which gets slower the deeper you page).
+    """
+    if cursor:
+        try:
+            expenses, next_cursor = await crud.get_expenses_page(db, user_id=current_user.id, cursor=cursor, limit=limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        expenses = await crud.get_expenses(db, user_id=current_user.id, skip=skip, limit=limit)
+        next_cursor = crud.encode_expense_cursor(expenses[-1]) if expenses and len(expenses) == limit else None
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return expenses
 
 @app.get("/tools/", response_model=list[schemas.Tool])
-async def read_tools(db: AsyncSession = Depends(get_db)):
+async def read_tools(db: AsyncSession = Depends(get_read_db)):
     return await crud.get_all_tools(db)
 
 @app.get("/tools/{name}", response_model=schemas.Tool)
@@ -100,9 +193,7 @@ async def save_tool(name: str, db: AsyncSession = Depends(get_db), current_user:
     return tool
 
 
-import asyncio
 import json
-from fastapi.responses import StreamingResponse
 
 
 from backend.services.tool_execution import execute_tool_logic
@@ -127,6 +218,19 @@ async def execute_tool_endpoint(name: str, request: schemas.ToolExecutionRequest
          
     return result
 
+@app.get("/chat/stats")
+async def get_chat_stats(current_user: models.User = Depends(get_current_user)):
+    """Per-worker chat pipeline metrics."""
+    return {
+        **chat_service.stats(),
+        "context": context_builder.stats(),
+        "stages": stage_stats.stats(),
+        "intent_router": intent_router.stats(),
+        "llm": llm_gateway.stats(),
+        "llm_cache": llm_cache.stats(),
+        "tool_index": tool_index.stats(),
+    }
+
 # Chat Endpoint
 @app.post("/chat")
 async def chat(message: str, chat_id: str = "default", current_user: models.User = Depends(get_current_user)):
@@ -0,0 +1,39 @@
+"""
+Maintenance for the expense_monthly_rollup table.
+
+    python backend/manage_rollup.py rebuild [--user UID]   # backfill / recompute from expenses
+    python backend/manage_rollup.py check [--user UID]     # exit code 1 if the rollup drifted
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+# Add the current directory to sys.path to allow imports from backend
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from backend.database import AsyncSessionLocal
+from backend.services import rollup
+
+async def main(command: str, user_id: str = None) -> int:
+    async with AsyncSessionLocal() as db:
+        if command == "rebuild":
+            count = await rollup.rebuild(db, user_id)
+            await db.commit()
+            print(f"Rebuilt {count} rollup buckets.")
+            return 0
+
+        mismatches = await rollup.check(db, user_id)
+        for key, expected, actual in mismatches:
+            print(f"MISMATCH {key}: expected total={expected[0]:.2f} count={expected[1]}, rollup total={actual[0]:.2f} count={actual[1]}")
+        print("Rollup is consistent." if not mismatches else f"{len(mismatches)} inconsistent buckets.")
+        return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the expense_monthly_rollup table.")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--user", help="Limit to a single user id")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.command, args.user)))
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, JSON, select
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import column_property
 from datetime import datetime
 from .database import Base
 
@@ -12,16 +14,89 @@ class User(Base):
     subscription_status = Column(String, default="active") # active, cancelled, past_due
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class Category(Base):
+    """
+    Per-user dictionary of expense categories. Expenses store the integer id;
+    names are resolved through `category_aliases` (see backend/services/categories.py).
+    """
+    __tablename__ = "categories"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    name = Column(String, nullable=False) # Display name, as first entered
+
+class CategoryAlias(Base):
+    """
+    Normalised spelling -> category, so 'Drinks', 'drink ' and 'Drink' share one id.
+    """
+    __tablename__ = "category_aliases"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    alias = Column(String, primary_key=True) # Normalised form
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
+
 class Expense(Base):
     __tablename__ = "expenses"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(String, ForeignKey("users.id"), index=True, nullable=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=True)
     amount = Column(Float, nullable=False)
-    category = Column(String, index=True)
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
     description = Column(String)
     date = Column(DateTime, default=datetime.utcnow)
 
+    # Loaded with every SELECT so reading .category never needs a lazy load
+    category_name = column_property(
+        select(Category.name).where(Category.id == category_id).correlate_except(Category).scalar_subquery()
+    )
+
+    __table_args__ = (
+        # Hot path: every expense query filters on user_id, then sorts or range-filters on date.
+        # id is the keyset pagination tie-breaker. On Postgres amount/category_id are INCLUDEd so
+        # aggregates over a date range are index-only scans.
+        Index(
+            "ix_expenses_user_id_date",
+            user_id, date.desc(), id.desc(),
+            postgresql_include=["amount", "category_id"],
+        ),
+    )
+
+    @hybrid_property
+    def category(self):
+        """
+        Category name. Assigning a name keeps it on the instance until the next flush, where it
+        is resolved (or created) into `category_id` for the expense's user.
+        """
+        assigned = self.__dict__.get("_assigned_category")
+        if assigned is not None:
+            return assigned
+        # Uncategorised (category_id NULL) reads back as the blank name it was stored from
+        return self.category_name or ""
+
+    @category.setter
+    def category(self, value):
+        self.__dict__["_assigned_category"] = value if value is not None else ""
+        self.__dict__["_category_needs_resolve"] = True
+        # Touch the mapped column so the flush sees the change for persistent instances too
+        self.category_id = None
+
+    @category.expression
+    def category(cls):
+        return cls.category_name
+
+class ExpenseMonthlyRollup(Base):
+    """
+    Per-user, per-month, per-category totals kept in step with `expenses`
+    (see backend/services/rollup.py) so analytics never aggregate raw rows.
+    """
+    __tablename__ = "expense_monthly_rollup"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    year_month = Column(String(7), primary_key=True) # 'YYYY-MM'
+    category_id = Column(Integer, primary_key=True) # 0 for uncategorised expenses
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+
 class Tool(Base):
     __tablename__ = "tools"
 
@@ -35,3 +110,27 @@ class Tool(Base):
     is_active = Column(Integer, default=1) # 1 for active, 0 for inactive
     status = Column(String, default="temporary") # temporary, saved, public
     creator_id = Column(String, ForeignKey("users.id"), nullable=True)
+
+class ChatMessage(Base):
+    """
+    Chat history when CHAT_STORE=sql (see backend/services/chat_store.py); mirrors the Firestore
+    documents under users/{user_id}/chats/{chat_id}/messages.
+    """
+    __tablename__ = "chat_messages"
+
+    id = Column(String, primary_key=True) # Generated by ChatService, like a Firestore document id
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    chat_id = Column(String, nullable=False)
+    role = Column(String, nullable=False)
+    content = Column(String, nullable=False, default="")
+    component = Column(JSON, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # History reads take the newest messages of one chat
+        Index("ix_chat_messages_user_chat_created", user_id, chat_id, created_at),
+    )
+
+# Registers the session hooks that resolve category names and keep expense_monthly_rollup
+# in sync with expenses, and the full-text search DDL emitted together with the expenses table
+from .services import categories, rollup, search  # noqa: E402,F401
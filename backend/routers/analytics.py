@@ -1,85 +1,162 @@
+import logging
+import os
+import time
+from collections import OrderedDict
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func, select
 from datetime import datetime, timedelta
 
-from backend.database import get_db
-from backend.models import Expense, User
+from backend.database import get_read_db
+from backend.models import Category, Expense, ExpenseMonthlyRollup, User
 from backend.auth import get_current_user
+from backend.services import rollup, data_version
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
+class AnalyticsCache:
+    """
+    In-process TTL + LRU cache of analytics responses keyed by (user_id, endpoint, params).
+    Each entry remembers the user's data version it was computed from; any committed expense
+    write bumps that version (see services/data_version.py), so stale entries are never served.
+    The TTL only bounds staleness across worker processes and the moving "last N days" window.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version: int):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version or entry[1] < time.monotonic():
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def set(self, key, version: int, value):
+        self._entries[key] = (version, time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "versioned_users": data_version.tracked_users(),
+        }
+
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "300"))
+if ANALYTICS_CACHE_TTL > data_version.DATA_VERSION_RETENTION:
+    # An entry must expire before its user's data version can be forgotten and start over
+    logger.warning(
+        f"ANALYTICS_CACHE_TTL ({ANALYTICS_CACHE_TTL}s) exceeds DATA_VERSION_RETENTION "
+        f"({data_version.DATA_VERSION_RETENTION}s); using {data_version.DATA_VERSION_RETENTION}s"
+    )
+    ANALYTICS_CACHE_TTL = data_version.DATA_VERSION_RETENTION
+
+analytics_cache = AnalyticsCache(
+    maxsize=int(os.getenv("ANALYTICS_CACHE_SIZE", "1024")),
+    ttl=ANALYTICS_CACHE_TTL,
+)
+
 @router.get("/allocation")
 async def get_allocation(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Returns expenses grouped by category.
+    Reads the monthly rollup, so the cost grows with months x categories, not expense rows.
     """
+    # Read the version before querying so a write that commits mid-query invalidates this entry
+    cache_key = (current_user.id, "allocation", ())
+    version = data_version.current(current_user.id)
+    cached = analytics_cache.get(cache_key, version)
+    if cached is not None:
+        return cached
+
+    # Uncategorised buckets (category_id 0) have no Category row and drop out of the join
     stmt = (
-        select(Expense.category, func.sum(Expense.amount).label("total"))
-        .where(Expense.user_id == current_user.id)
-        .group_by(Expense.category)
+        select(Category.name.label("category"), func.sum(ExpenseMonthlyRollup.total).label("total"))
+        .join(Category, Category.id == ExpenseMonthlyRollup.category_id)
+        .where(ExpenseMonthlyRollup.user_id == current_user.id)
+        .group_by(Category.id, Category.name)
     )
     result = await db.execute(stmt)
     # Result rows are keyed by column name/label
-    data = [{"name": row.category, "value": row.total} for row in result.all() if row.category]
+    data = [{"name": row.category, "value": row.total} for row in result.all()]
+    analytics_cache.set(cache_key, version, data)
     return data
 
 @router.get("/cashflow")
 async def get_cashflow(
     days: int = 180,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Returns total expenses grouped by month for the last N days.
+    Whole months come from the monthly rollup. The month containing the start date is only
+    partially inside the window, so it is summed from raw rows (a short range scan on the
+    (user_id, date) index).
     """
+    cache_key = (current_user.id, "cashflow", (days,))
+    version = data_version.current(current_user.id)
+    cached = analytics_cache.get(cache_key, version)
+    if cached is not None:
+        return cached
+
     start_date = datetime.utcnow() - timedelta(days=days)
-    
-    # We use a universal approach for month extraction compatible with SQLite and Postgres for basic 'YYYY-MM'
-    # For SQLite, func.strftime('%Y-%m', Expense.date)
-    # For Postgres, func.to_char(Expense.date, 'YYYY-MM')
-    # Since we might be running on either, we can check a bit or just use a python fallback if necessary?
-    # No, we really want SQL aggregation.
-    
-    # Let's assume Postgres as per roadmap, but provide a safe fallback or use a conditional compilation if we were fancy.
-    # Given the roadmap says "Postgres (Cloud SQL)", I will use Postgres syntax but...
-    # The user might be running tests on SQLite.
-    
-    # Check dialect? 
-    # Or just use `func.strftime` which works on SQLite. Postgres has `to_char`.
-    # Let's try `func.to_char` first as it's the target. If it fails on SQLite tests... well, the environment defaults to SQLite.
-    # Actually, SQLite does NOT support `to_char`.
-    
-    # Workaround: Use `extract('year', ...)` and `extract('month', ...)` which is standard SQL.
-    
-    # Use standard extract which works on both SQLite and Postgres (mostly)
-    # We fetch year/month and format in Python to avoid dialect-specific string concat functions
-    stmt = (
-        select(
-            func.extract('year', Expense.date).label('year'),
-            func.extract('month', Expense.date).label('month'),
-            func.sum(Expense.amount).label('total')
-        )
+    start_month = rollup.year_month(start_date)
+    next_month_start = (start_date.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    partial_stmt = (
+        select(func.sum(Expense.amount).label("total"))
         .where(
             Expense.user_id == current_user.id,
-            Expense.date >= start_date
+            Expense.date >= start_date,
+            Expense.date < next_month_start
         )
-        .group_by('year', 'month')
-        .order_by('year', 'month')
     )
-    
+    partial_total = (await db.execute(partial_stmt)).scalar()
+
+    stmt = (
+        select(ExpenseMonthlyRollup.year_month, func.sum(ExpenseMonthlyRollup.total).label("total"))
+        .where(
+            ExpenseMonthlyRollup.user_id == current_user.id,
+            ExpenseMonthlyRollup.year_month > start_month
+        )
+        .group_by(ExpenseMonthlyRollup.year_month)
+        .order_by(ExpenseMonthlyRollup.year_month)
+    )
     result = await db.execute(stmt)
-    
+
     data = []
+    if partial_total is not None:
+        data.append({"name": start_month, "value": partial_total})
     for row in result.all():
-        # row has year, month, total (year/month are floats or decimals often returned by extract)
-        month_str = f"{int(row.year)}-{int(row.month):02d}"
         data.append({
-            "name": month_str,
+            "name": row.year_month,
             "value": row.total
         })
         
+    analytics_cache.set(cache_key, version, data)
     return data
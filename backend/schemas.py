@@ -1,6 +1,6 @@
 from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict
 
 class ExpenseBase(BaseModel):
     amount: float
@@ -18,6 +18,18 @@ class Expense(ExpenseBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+class ExpenseImportError(BaseModel):
+    row: int
+    error: str
+
+class ExpenseImportResult(BaseModel):
+    format: str
+    imported: int = 0
+    failed: int = 0
+    skipped: int = 0 # Rows that are not expenses, e.g. OFX credits
+    errors: List[ExpenseImportError] = []
+    errors_truncated: bool = False
+
 class UserBase(BaseModel):
     email: str
 
@@ -38,6 +50,17 @@ class User(UserBase):
     
     model_config = ConfigDict(from_attributes=True)
 
+class DataDeletionJob(BaseModel):
+    id: str
+    status: str # pending, running, completed, failed
+    stage: Optional[str] = None
+    deleted: Dict[str, int] # Rows / documents removed so far, per stage
+    error: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
 # Tool Schemas
 class ToolBase(BaseModel):
     name: str
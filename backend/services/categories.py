@@ -0,0 +1,126 @@
+"""
+Dictionary-encoded expense categories.
+
+Expenses store a small integer `category_id`; the API keeps speaking names. A name is mapped
+to an id through the user's alias table, keyed by the normalised spelling, so 'Drinks',
+'drink' and ' DRINK ' all resolve to the category first created as 'Drinks'.
+
+ORM writes are resolved by a `before_flush` hook (registered first, so the rollup hook
+already sees the ids). Bulk paths call `resolve_ids`.
+"""
+import re
+from itertools import chain
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import event, select, union
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.models import Category, CategoryAlias, Expense
+
+def _singular(word: str) -> str:
+    if len(word) <= 3:
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("sses", "shes", "ches", "xes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+def normalize(name: str) -> str:
+    """
+    Alias key for a category name: case- and whitespace-insensitive, last word singularised
+    ('Coffee Shops' -> 'coffee shop', 'Groceries' -> 'grocery').
+    """
+    words = re.sub(r"\s+", " ", (name or "").strip().lower()).split(" ")
+    if words == [""]:
+        return ""
+    words[-1] = _singular(words[-1])
+    return " ".join(words)
+
+def _insert_for(dialect_name: str):
+    return postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+
+def _lookup(connection, user_id: str, alias: str):
+    return connection.execute(
+        select(CategoryAlias.category_id, Category.name)
+        .join(Category, Category.id == CategoryAlias.category_id)
+        .where(CategoryAlias.user_id == user_id, CategoryAlias.alias == alias)
+    ).first()
+
+def resolve(connection, user_id: str, name: str) -> Tuple[int, str]:
+    """
+    Returns (category_id, display name) for `name`, creating the category on first use.
+    `connection` is a sync Connection. Safe against concurrent first use of the same name.
+    """
+    alias = normalize(name)
+    row = _lookup(connection, user_id, alias)
+    if row:
+        return row.category_id, row.name
+
+    display = re.sub(r"\s+", " ", name.strip())
+    category_id = connection.execute(
+        Category.__table__.insert().values(user_id=user_id, name=display).returning(Category.__table__.c.id)
+    ).scalar_one()
+    insert = _insert_for(connection.dialect.name)
+    claimed = connection.execute(
+        insert(CategoryAlias.__table__)
+        .values(user_id=user_id, alias=alias, category_id=category_id)
+        .on_conflict_do_nothing()
+    )
+    if claimed.rowcount == 0:
+        # Another transaction created the alias first; use its category
+        connection.execute(Category.__table__.delete().where(Category.__table__.c.id == category_id))
+        row = _lookup(connection, user_id, alias)
+        return row.category_id, row.name
+    return category_id, display
+
+async def resolve_ids(db: AsyncSession, user_id: str, names: Iterable[str]) -> Dict[str, int]:
+    """Maps each distinct name to its category id (None for blank names). Caller commits."""
+    def run(session):
+        connection = session.connection()
+        return {
+            name: resolve(connection, user_id, name)[0] if normalize(name) else None
+            for name in set(names)
+        }
+    return await db.run_sync(run)
+
+def category_condition(user_id: str, term: str):
+    """
+    WHERE clause for the Finance agent's `category` filter: categories whose name contains
+    `term`, plus the exact alias match (so 'Drinks' finds 'Drink').
+    """
+    matching = union(
+        select(Category.id).where(Category.user_id == user_id, Category.name.ilike(f"%{term}%")),
+        select(CategoryAlias.category_id).where(CategoryAlias.user_id == user_id, CategoryAlias.alias == normalize(term)),
+    )
+    return Expense.category_id.in_(matching)
+
+async def delete_user(db: AsyncSession, user_id: str) -> int:
+    """
+    Drops a user's aliases and categories (after their expenses). Returns the number of
+    categories deleted. Caller commits.
+    """
+    await db.execute(CategoryAlias.__table__.delete().where(CategoryAlias.user_id == user_id))
+    result = await db.execute(Category.__table__.delete().where(Category.user_id == user_id))
+    return result.rowcount
+
+@event.listens_for(Session, "before_flush", insert=True)
+def _resolve_expense_categories(session, flush_context, instances):
+    resolved = {}
+    for obj in chain(session.new, session.dirty):
+        if not isinstance(obj, Expense) or not obj.__dict__.get("_category_needs_resolve"):
+            continue
+        obj.__dict__["_category_needs_resolve"] = False
+        name = obj.__dict__["_assigned_category"]
+        if obj.user_id is None or not normalize(name):
+            obj.category_id = None
+            continue
+
+        key = (obj.user_id, normalize(name))
+        if key not in resolved:
+            resolved[key] = resolve(session.connection(), obj.user_id, name)
+        obj.category_id, obj.__dict__["_assigned_category"] = resolved[key]
@@ -0,0 +1,137 @@
+"""
+In-process cache of the most recent messages of each chat, so get_recent_messages in a running
+conversation needs no Firestore query.
+
+Each (user_id, chat_id) holds a ring buffer of the last `depth` messages. It is seeded from
+Firestore on a miss and then kept current by add_message. Chats are evicted least recently
+used first when the estimated size of all buffers exceeds `max_bytes`, and an entry is reloaded
+after `ttl` seconds. Messages written by other workers only show up after that reload.
+"""
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+CHAT_HISTORY_DEPTH = int(os.getenv("CHAT_HISTORY_DEPTH", "20"))
+CHAT_HISTORY_MAX_BYTES = int(os.getenv("CHAT_HISTORY_MAX_BYTES", str(64 * 1024 * 1024)))
+CHAT_HISTORY_TTL = float(os.getenv("CHAT_HISTORY_TTL", "300"))
+
+# Rough per-message overhead of the dict, its keys and the deque slot
+MESSAGE_OVERHEAD_BYTES = 200
+
+def message_size(message: Dict) -> int:
+    size = MESSAGE_OVERHEAD_BYTES + len(message.get("content") or "")
+    if message.get("component"):
+        size += len(json.dumps(message["component"], default=str))
+    return size
+
+class ChatHistory:
+    def __init__(self, messages: List[Dict], depth: int, complete: bool, expires_at: float):
+        self.messages = deque(maxlen=depth)
+        self.bytes = 0
+        # True when the buffer holds the whole chat, i.e. it had fewer than `depth` messages
+        self.complete = complete
+        self.expires_at = expires_at
+        for message in messages:
+            self.append(message)
+
+    def append(self, message: Dict) -> int:
+        """Adds a message, dropping the oldest one if full; returns the change in bytes."""
+        delta = message_size(message)
+        if len(self.messages) == self.messages.maxlen:
+            delta -= message_size(self.messages[0])
+            self.complete = False
+        self.messages.append(message)
+        self.bytes += delta
+        return delta
+
+class ChatHistoryCache:
+    def __init__(self, depth: int, max_bytes: int, ttl: float):
+        self.depth = depth
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._chats: "OrderedDict[Tuple[str, str], ChatHistory]" = OrderedDict()
+        # Chats being loaded from Firestore; True once a message was appended during the load
+        self._loading: Dict[Tuple[str, str], bool] = {}
+
+    def get(self, user_id: str, chat_id: str, limit: int) -> Optional[List[Dict]]:
+        key = (user_id, chat_id)
+        history = self._chats.get(key)
+        if history is not None and history.expires_at <= time.monotonic():
+            self._remove(key)
+            history = None
+        if history is None or (limit > len(history.messages) and not history.complete):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._chats.move_to_end(key)
+        return list(history.messages)[-limit:]
+
+    def begin_load(self, user_id: str, chat_id: str):
+        self._loading[(user_id, chat_id)] = False
+
+    def load(self, user_id: str, chat_id: str, messages: List[Dict], complete: bool):
+        """
+        Stores messages read from Firestore (oldest first), unless the chat got a new message
+        while they were being read: that message may be missing from the result.
+        """
+        key = (user_id, chat_id)
+        if self._loading.pop(key, True) or self.depth <= 0:
+            return
+        self._remove(key)
+        history = ChatHistory(messages, self.depth, complete and len(messages) <= self.depth, time.monotonic() + self.ttl)
+        self._chats[key] = history
+        self.bytes += history.bytes
+        self._evict()
+
+    def cancel_load(self, user_id: str, chat_id: str):
+        self._loading.pop((user_id, chat_id), None)
+
+    def append(self, user_id: str, chat_id: str, message: Dict):
+        key = (user_id, chat_id)
+        if key in self._loading:
+            self._loading[key] = True
+        history = self._chats.get(key)
+        if history is None:
+            # Unknown chats are loaded from Firestore on their next read
+            return
+        self.bytes += history.append(message)
+        self._chats.move_to_end(key)
+        self._evict()
+
+    def invalidate_user(self, user_id: str):
+        for key in [key for key in self._chats if key[0] == user_id]:
+            self._remove(key)
+        for key in self._loading:
+            if key[0] == user_id:
+                self._loading[key] = True
+
+    def clear(self):
+        self._chats.clear()
+        self._loading.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "chats": len(self._chats),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def _remove(self, key):
+        history = self._chats.pop(key, None)
+        if history is not None:
+            self.bytes -= history.bytes
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and self._chats:
+            _, history = self._chats.popitem(last=False)
+            self.bytes -= history.bytes
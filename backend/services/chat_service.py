@@ -1,85 +1,214 @@
-import firebase_admin
-from firebase_admin import firestore
+"""
+Chat history, persisted by a ChatStore (Firestore by default, see chat_store).
+
+Writes are write-behind: add_message queues the message and returns, and a background flusher
+(started in the FastAPI lifespan) commits the queue in batches (a Firestore WriteBatch or one
+INSERT) once CHAT_FLUSH_SIZE messages are waiting or every CHAT_FLUSH_INTERVAL seconds.
+Durability guarantees:
+- A message is visible to get_recent_messages on this worker as soon as add_message returns.
+- It is stored within about CHAT_FLUSH_INTERVAL seconds. Other workers and the frontend's
+  Firestore snapshot listener only see it from then on.
+- A graceful shutdown flushes the queue. A crash or kill loses whatever was still queued
+  (at most one interval's worth of messages).
+- A failed batch stays queued and is retried on the next flush. Beyond CHAT_QUEUE_MAX
+  queued messages the oldest are dropped (counted in stats()["dropped"]).
+Without a running flusher (scripts, tests) add_message writes through as before.
+
+get_recent_messages serves running conversations from an in-process ring buffer per chat
+(see chat_history_cache) and only queries the store on a miss.
+
+`timestamp` is the time the message was produced, not the commit time, because every write
+in a batch would get the same server timestamp and lose the user/assistant order.
+"""
+import asyncio
 import logging
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import List, Dict, Optional
+from uuid import uuid4
+
+from backend.services.chat_history_cache import ChatHistoryCache, CHAT_HISTORY_DEPTH, CHAT_HISTORY_MAX_BYTES, CHAT_HISTORY_TTL
+from backend.services.chat_store import ChatStore, PendingMessage, create_store
 
 logger = logging.getLogger(__name__)
 
+CHAT_FLUSH_SIZE = int(os.getenv("CHAT_FLUSH_SIZE", "100"))
+CHAT_FLUSH_INTERVAL = float(os.getenv("CHAT_FLUSH_INTERVAL", "0.5"))
+CHAT_QUEUE_MAX = int(os.getenv("CHAT_QUEUE_MAX", "10000"))
+
 class ChatService:
 
-    def __init__(self):
-        try:
-            # App is initialized in auth.py which is imported before agents/manager
-            self.db = firestore.client()
-            logger.info(f"Firestore initialized.")
-        except Exception as e:
-            logger.error(f"Error initializing Firestore client: {e}")
-            self.db = None
+    def __init__(self, store: Optional[ChatStore] = None, flush_size: int = CHAT_FLUSH_SIZE,
+                 flush_interval: float = CHAT_FLUSH_INTERVAL, max_queue: int = CHAT_QUEUE_MAX,
+                 history: Optional[ChatHistoryCache] = None):
+        # None when Firestore is configured but could not be initialized; chats are then not saved
+        self.store = store if store is not None else create_store()
+        self.history = history or ChatHistoryCache(CHAT_HISTORY_DEPTH, CHAT_HISTORY_MAX_BYTES, CHAT_HISTORY_TTL)
+        self.flush_size = min(flush_size, self.store.max_batch_size) if self.store else flush_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue: List[PendingMessage] = []
+        self._in_flight: List[PendingMessage] = []
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.flushed = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+        self.max_depth = 0
 
 
     async def add_message(self, user_id: str, chat_id: str, role: str, content: str, component: Optional[Dict] = None):
         """
-        Adds a message to the Firestore chat history.
+        Queues a message for the chat history (see the module docstring).
         """
-        if not self.db:
-            logger.warning("Firestore is not initialized. Message not saved.")
+        if not self.store:
+            logger.warning("Chat store is not initialized. Message not saved.")
             return
 
-        try:
-            # Construct the message document
-            message_data = {
-                "role": role,
-                "content": content,
-                "timestamp": firestore.SERVER_TIMESTAMP,
-                "createdAt": datetime.utcnow().isoformat()
-            }
-            if component:
-                message_data["component"] = component
-
-            # Path: users/{user_id}/chats/{chat_id}/messages
-            # We use .add() to generate an auto-ID for the message
-            self.db.collection("users").document(user_id)\
-                .collection("chats").document(chat_id)\
-                .collection("messages").add(message_data)
-                
-            logger.info(f"Message from {role} saved to chat {chat_id}")
-        except Exception as e:
-            logger.error(f"Failed to save message to Firestore: {e}")
+        # Construct the message document
+        message_data = {
+            "role": role,
+            "content": content,
+            "timestamp": datetime.now(timezone.utc),
+            "createdAt": datetime.utcnow().isoformat()
+        }
+        if component:
+            message_data["component"] = component
+
+        # The id is generated here, so the write can be batched and deduplicated against reads
+        self._enqueue(PendingMessage(uuid4().hex, user_id, chat_id, message_data))
+        self.history.append(user_id, chat_id, _to_history(message_data))
+
+        if self._flusher is None:
+            await self.flush()
+
+    def _enqueue(self, message: PendingMessage):
+        self._queue.append(message)
+        overflow = len(self._queue) - self.max_queue
+        if overflow > 0:
+            del self._queue[:overflow]
+            self.dropped += overflow
+            logger.error(f"Chat write queue is full; dropped {overflow} unsaved message(s).")
+        self.max_depth = max(self.max_depth, len(self._queue))
+        if len(self._queue) >= self.flush_size:
+            self._wakeup.set()
+
+    async def flush(self):
+        """
+        Commits all queued messages in batches of flush_size. Stops at the first failed batch,
+        which stays queued for the next flush.
+        """
+        async with self._flush_lock:
+            while self._queue:
+                chunk = self._queue[:self.flush_size]
+                del self._queue[:len(chunk)]
+                self._in_flight = chunk
+                try:
+                    await self.store.write(chunk)
+                    self.flushed += len(chunk)
+                    logger.info(f"Saved {len(chunk)} chat message(s) to {self.store.name}")
+                except Exception as e:
+                    self.failed_flushes += 1
+                    logger.error(f"Failed to save {len(chunk)} chat message(s) to {self.store.name}: {e}")
+                    self._queue[:0] = chunk
+                    return
+                finally:
+                    self._in_flight = []
+
+    async def discard(self, user_id: str) -> int:
+        """
+        Drops the user's queued and cached messages and waits for a batch that is already being
+        written, so a flush cannot recreate chats deleted after this returns.
+        """
+        discarded = self._drop_queued(user_id)
+        # The flusher holds the lock while it writes; a failed batch is put back on the queue
+        async with self._flush_lock:
+            discarded += self._drop_queued(user_id)
+        self.history.invalidate_user(user_id)
+        return discarded
+
+    def _drop_queued(self, user_id: str) -> int:
+        kept = [m for m in self._queue if m.user_id != user_id]
+        dropped = len(self._queue) - len(kept)
+        self._queue[:] = kept
+        return dropped
+
+    def start(self):
+        """Starts the background flusher; called from the FastAPI lifespan."""
+        if self.store and self._flusher is None:
+            self._flusher = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops the flusher and writes out everything still queued."""
+        if self._flusher is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._flusher
+            self._flusher = None
+            self._stopping = False
+        if self.store:
+            await self.flush()
+        if self._queue:
+            logger.error(f"{len(self._queue)} chat message(s) could not be saved before shutdown.")
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._queue),
+            "in_flight": len(self._in_flight),
+            "max_depth": self.max_depth,
+            "flushed": self.flushed,
+            "failed_flushes": self.failed_flushes,
+            "dropped": self.dropped,
+            "history": self.history.stats(),
+        }
 
     async def get_recent_messages(self, user_id: str, chat_id: str, limit: int = 10) -> List[Dict[str, str]]:
         """
-        Retrieves the most recent messages for context.
+        Retrieves the most recent messages for context, including ones not yet flushed.
         Returns a list of dicts: [{'role': 'user', 'content': '...'}, ...]
         Ordered by timestamp ASCENDING (oldest to newest) for LLM context.
         """
-        if not self.db:
+        if not self.store:
             return []
 
+        cached = self.history.get(user_id, chat_id, limit)
+        if cached is not None:
+            return cached
+
+        # Read enough to seed the chat's ring buffer, not just this call's limit
+        query_limit = max(limit, self.history.depth)
+        self.history.begin_load(user_id, chat_id)
+        # Taken before the query: a batch that commits meanwhile shows up in both, hence the id check
+        pending = [m for m in self._in_flight + self._queue if m.user_id == user_id and m.chat_id == chat_id]
         try:
-            # Query: users/{user_id}/chats/{chat_id}/messages
-            # Order by timestamp DESC to get recent, then reverse
-            docs = self.db.collection("users").document(user_id)\
-                .collection("chats").document(chat_id)\
-                .collection("messages")\
-                .order_by("timestamp", direction=firestore.Query.DESCENDING)\
-                .limit(limit)\
-                .stream()
-
-            messages = []
-            for doc in docs:
-                data = doc.to_dict()
-                messages.append({
-                    "role": data.get("role", "user"),
-                    "content": data.get("content", ""),
-                    "component": data.get("component", None)
-                })
-            
-            # Reverse to get chronological order
-            return messages[::-1]
+            stored = await self.store.recent(user_id, chat_id, query_limit)
         except Exception as e:
             logger.error(f"Failed to retrieve chat history: {e}")
+            self.history.cancel_load(user_id, chat_id)
             return []
 
+        stored_ids = {message_id for message_id, _ in stored}
+        entries = [data for _, data in stored] + [m.data for m in pending if m.id not in stored_ids]
+        messages = [_to_history(data) for data in entries]
+        self.history.load(user_id, chat_id, messages[-self.history.depth:], complete=len(stored) < query_limit)
+        return messages[-limit:]
+
+def _to_history(data: Dict) -> Dict:
+    return {
+        "role": data.get("role", "user"),
+        "content": data.get("content", ""),
+        "component": data.get("component", None)
+    }
+
 chat_service = ChatService()
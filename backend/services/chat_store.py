@@ -0,0 +1,167 @@
+"""
+Storage backends for chat history, selected with CHAT_STORE:
+- "firestore" (default): users/{user_id}/chats/{chat_id}/messages documents, which the frontend
+  also listens to directly.
+- "sql": the chat_messages table in the app database (AsyncSessionLocal), for offline
+  development and tests, or to keep history next to the expenses without a network hop.
+
+ChatService owns queueing and caching; a store only writes batches, reads the newest messages
+of a chat and deletes a user's chats.
+"""
+import logging
+import os
+from abc import ABC, abstractmethod
+from datetime import timezone
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from firebase_admin import firestore, firestore_async
+from sqlalchemy import delete, insert, select
+
+from backend import models
+from backend.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+CHAT_STORE = os.getenv("CHAT_STORE", "firestore")
+
+# Firestore allows at most 500 writes per batch
+FIRESTORE_BATCH_SIZE = 500
+
+class PendingMessage(NamedTuple):
+    id: str
+    user_id: str
+    chat_id: str
+    data: Dict # role, content, timestamp (aware UTC datetime), createdAt, optional component
+
+class ChatStore(ABC):
+    name: str
+    # Most messages one write() call may take
+    max_batch_size: int
+
+    @abstractmethod
+    async def write(self, messages: List[PendingMessage]):
+        """Writes the messages atomically."""
+
+    @abstractmethod
+    async def recent(self, user_id: str, chat_id: str, limit: int) -> List[Tuple[str, Dict]]:
+        """The chat's newest `limit` messages as (id, data), oldest first."""
+
+    @abstractmethod
+    async def delete_user(self, user_id: str, on_batch: Callable[[int], None]):
+        """Deletes all chats of the user, calling on_batch(count) after every batch."""
+
+class FirestoreChatStore(ChatStore):
+    name = "firestore"
+    max_batch_size = FIRESTORE_BATCH_SIZE
+
+    def __init__(self, db: firestore_async.AsyncClient):
+        self.db = db
+
+    def _chats(self, user_id: str):
+        return self.db.collection("users").document(user_id).collection("chats")
+
+    async def write(self, messages: List[PendingMessage]):
+        batch = self.db.batch()
+        for message in messages:
+            ref = self._chats(message.user_id).document(message.chat_id).collection("messages").document(message.id)
+            batch.set(ref, message.data)
+        await batch.commit()
+
+    async def recent(self, user_id: str, chat_id: str, limit: int) -> List[Tuple[str, Dict]]:
+        # Order by timestamp DESC to get recent, then reverse
+        docs = self._chats(user_id).document(chat_id).collection("messages")\
+            .order_by("timestamp", direction=firestore.Query.DESCENDING)\
+            .limit(limit)\
+            .stream()
+        stored = [(doc.id, doc.to_dict()) async for doc in docs]
+        return stored[::-1]
+
+    async def delete_user(self, user_id: str, on_batch: Callable[[int], None]):
+        # list_documents also yields chats that only exist as parents of their messages
+        async for chat in self._chats(user_id).list_documents(page_size=FIRESTORE_BATCH_SIZE):
+            async for collection in chat.collections():
+                while True:
+                    docs = [doc async for doc in collection.limit(FIRESTORE_BATCH_SIZE).stream()]
+                    if not docs:
+                        break
+                    batch = self.db.batch()
+                    for doc in docs:
+                        batch.delete(doc.reference)
+                    await batch.commit()
+                    on_batch(len(docs))
+            await chat.delete()
+
+class SQLChatStore(ChatStore):
+    name = "sql"
+    max_batch_size = 1000
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+
+    async def write(self, messages: List[PendingMessage]):
+        rows = [
+            {
+                "id": m.id,
+                "user_id": m.user_id,
+                "chat_id": m.chat_id,
+                "role": m.data["role"],
+                "content": m.data["content"] or "",
+                "component": m.data.get("component"),
+                # Stored as naive UTC like every other DateTime column
+                "created_at": m.data["timestamp"].astimezone(timezone.utc).replace(tzinfo=None),
+            }
+            for m in messages
+        ]
+        async with self.session_factory() as db:
+            await db.execute(insert(models.ChatMessage), rows)
+            await db.commit()
+
+    async def recent(self, user_id: str, chat_id: str, limit: int) -> List[Tuple[str, Dict]]:
+        query = (
+            select(models.ChatMessage)
+            .where(models.ChatMessage.user_id == user_id, models.ChatMessage.chat_id == chat_id)
+            .order_by(models.ChatMessage.created_at.desc(), models.ChatMessage.id.desc())
+            .limit(limit)
+        )
+        async with self.session_factory() as db:
+            rows = (await db.execute(query)).scalars().all()
+        return [(row.id, _to_data(row)) for row in reversed(rows)]
+
+    async def delete_user(self, user_id: str, on_batch: Callable[[int], None]):
+        table = models.ChatMessage.__table__
+        async with self.session_factory() as db:
+            while True:
+                ids = (await db.execute(select(table.c.id).where(table.c.user_id == user_id).limit(self.max_batch_size))).scalars().all()
+                if not ids:
+                    break
+                await db.execute(delete(table).where(table.c.id.in_(ids)))
+                await db.commit()
+                on_batch(len(ids))
+
+def _to_data(row: models.ChatMessage) -> Dict:
+    data = {
+        "role": row.role,
+        "content": row.content,
+        "timestamp": row.created_at.replace(tzinfo=timezone.utc),
+        "createdAt": row.created_at.isoformat(),
+    }
+    if row.component:
+        data["component"] = row.component
+    return data
+
+def create_store(kind: str = CHAT_STORE) -> Optional[ChatStore]:
+    """The configured store, or None if Firestore is selected but cannot be initialized."""
+    if kind == "sql":
+        return SQLChatStore(AsyncSessionLocal)
+    if kind != "firestore":
+        raise ValueError(f"Unknown CHAT_STORE '{kind}'. Use 'firestore' or 'sql'.")
+    try:
+        # App is initialized in auth.py which is imported before agents/manager.
+        # firebase_admin caches the AsyncClient per app, so every caller shares one gRPC channel
+        # and awaiting a write or query does not block the event loop.
+        db = firestore_async.client()
+        logger.info(f"Firestore initialized.")
+        return FirestoreChatStore(db)
+    except Exception as e:
+        logger.error(f"Error initializing Firestore client: {e}")
+        return None
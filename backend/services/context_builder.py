@@ -0,0 +1,176 @@
+"""
+Builds the chat history each agent gets as context, within a per-agent token budget.
+
+Tokens are estimated locally (no tokenizer download, no network). Newest messages are kept
+verbatim, each capped at a third of the budget, so one long Interpreter report cannot crowd out
+the rest. Messages that no longer fit are folded into a rolling per-chat summary: one short line
+per message, remembered across requests. That way messages that have scrolled out of the
+fetched history window are still represented.
+
+Budgets (tokens) are set per agent with CONTEXT_BUDGET_<AGENT>, e.g. CONTEXT_BUDGET_FINANCE=1200.
+stats() reports the prompt tokens saved against sending the raw history (json.dumps of it,
+as the agents used to).
+"""
+import json
+import logging
+import os
+import re
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGETS = {
+    "classifier": 300,
+    "finance": 1200,
+    "currency": 600,
+}
+CONTEXT_SUMMARY_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "200"))
+# Summary lines remembered per chat, and chats with a summary kept in memory
+CONTEXT_SUMMARY_LINES = int(os.getenv("CONTEXT_SUMMARY_LINES", "50"))
+CONTEXT_SUMMARY_CHATS = int(os.getenv("CONTEXT_SUMMARY_CHATS", "10000"))
+
+# Role/separator overhead of a chat message in the provider's prompt format
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_LINE_CHARS = 160
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximates a BPE token count: every punctuation mark is a token, words of up to 6
+    characters are one token and longer ones cost one more per 4 characters. Usually within
+    ~15% of the real count for English prose and JSON.
+    """
+    tokens = 0
+    for piece in _TOKEN_RE.findall(text or ""):
+        if piece[0].isalnum() or piece[0] == "_":
+            tokens += 1 + (max(0, len(piece) - 6) + 3) // 4
+        else:
+            tokens += 1
+    return tokens
+
+def truncate(text: str, max_tokens: int) -> str:
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    # Cut proportionally, then back to a word boundary
+    cut = text[:max(1, len(text) * max_tokens // tokens)]
+    cut = cut.rsplit(" ", 1)[0] if " " in cut else cut
+    return cut.rstrip() + " …[truncated]"
+
+def summary_line(message: Dict) -> str:
+    content = " ".join((message.get("content") or "").split())
+    if len(content) > SUMMARY_LINE_CHARS:
+        content = content[:SUMMARY_LINE_CHARS].rsplit(" ", 1)[0] + " …"
+    return f"{message.get('role', 'user')}: {content}"
+
+class ContextBuilder:
+    def __init__(self, budgets: Dict[str, int], summary_tokens: int = CONTEXT_SUMMARY_TOKENS,
+                 summary_lines: int = CONTEXT_SUMMARY_LINES, max_chats: int = CONTEXT_SUMMARY_CHATS):
+        self.budgets = budgets
+        self.summary_tokens = summary_tokens
+        self.summary_lines = summary_lines
+        self.max_chats = max_chats
+        # (user_id, chat_id) -> deque of (message key, summary line), oldest first
+        self._summaries: "OrderedDict[Tuple[str, str], deque]" = OrderedDict()
+        self.requests = 0
+        self.raw_tokens = 0
+        self.sent_tokens = 0
+        self._per_agent: Dict[str, Dict[str, int]] = {}
+
+    def build(self, user_id: Optional[str], chat_id: str, history: List[Dict], agent: str) -> List[Dict]:
+        """
+        Returns [{"role", "content"}, ...] for `agent`: an optional system message with the
+        summary of earlier messages, then as many recent messages as fit the budget.
+        """
+        if not history:
+            return []
+        budget = self.budgets.get(agent, DEFAULT_BUDGETS["finance"])
+        summary_budget = min(self.summary_tokens, budget // 4)
+        per_message_cap = max(budget // 3, 50)
+
+        kept, used = [], 0
+        for message in reversed(history):
+            content = truncate(message.get("content") or "", per_message_cap)
+            cost = estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+            if used + cost > budget - summary_budget:
+                break
+            kept.append({"role": message.get("role", "user"), "content": content})
+            used += cost
+        kept.reverse()
+
+        summary = self._summary(user_id, chat_id, history, len(history) - len(kept), summary_budget)
+        context = ([{"role": "system", "content": f"Summary of earlier messages in this chat:\n{summary}"}] if summary else []) + kept
+
+        raw = estimate_tokens(json.dumps(history))
+        sent = estimate_tokens(json.dumps(context))
+        self._record(agent, raw, sent)
+        logger.info(f"Context for {agent}: {sent} tokens ({raw - sent} saved, {len(history) - len(kept)} message(s) summarized)")
+        return context
+
+    def _summary(self, user_id, chat_id, history: List[Dict], dropped: int, budget: int) -> str:
+        key = (user_id, chat_id)
+        lines = self._summaries.get(key)
+        if lines is None:
+            lines = self._summaries[key] = deque(maxlen=self.summary_lines)
+        self._summaries.move_to_end(key)
+        while len(self._summaries) > self.max_chats:
+            self._summaries.popitem(last=False)
+
+        # Remember a line for every message seen, so it outlives the fetched history window
+        known = {message_key for message_key, _ in lines}
+        for message in history:
+            message_key = (message.get("role"), message.get("content"))
+            if message_key not in known:
+                lines.append((message_key, summary_line(message)))
+                known.add(message_key)
+
+        # Summarize everything except the messages sent verbatim, newest lines first within budget
+        verbatim = {(m.get("role"), m.get("content")) for m in history[dropped:]}
+        selected, used = [], 0
+        for message_key, line in reversed(lines):
+            if message_key in verbatim:
+                continue
+            cost = estimate_tokens(line) + 1
+            if used + cost > budget:
+                break
+            selected.append(line)
+            used += cost
+        return "\n".join(reversed(selected))
+
+    def _record(self, agent: str, raw: int, sent: int):
+        self.requests += 1
+        self.raw_tokens += raw
+        self.sent_tokens += sent
+        totals = self._per_agent.setdefault(agent, {"requests": 0, "raw_tokens": 0, "sent_tokens": 0})
+        totals["requests"] += 1
+        totals["raw_tokens"] += raw
+        totals["sent_tokens"] += sent
+
+    def invalidate_user(self, user_id: str):
+        for key in [key for key in self._summaries if key[0] == user_id]:
+            del self._summaries[key]
+
+    def clear(self):
+        self._summaries.clear()
+        self.requests = self.raw_tokens = self.sent_tokens = 0
+        self._per_agent.clear()
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "raw_tokens": self.raw_tokens,
+            "sent_tokens": self.sent_tokens,
+            "tokens_saved": self.raw_tokens - self.sent_tokens,
+            "avg_tokens_saved": (self.raw_tokens - self.sent_tokens) / self.requests if self.requests else 0.0,
+            "agents": {
+                agent: dict(totals, tokens_saved=totals["raw_tokens"] - totals["sent_tokens"])
+                for agent, totals in self._per_agent.items()
+            },
+        }
+
+context_builder = ContextBuilder({
+    agent: int(os.getenv(f"CONTEXT_BUDGET_{agent.upper()}", str(budget)))
+    for agent, budget in DEFAULT_BUDGETS.items()
+})
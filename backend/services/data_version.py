@@ -0,0 +1,71 @@
+"""
+Per-user data-version counters.
+
+Every expense write path marks the user on its session with `mark_dirty`; the counter is bumped
+only after that transaction commits (and forgotten on rollback). Caches key their entries on the
+version they were computed from, so a committed write makes older entries unreachable.
+
+The commit time is kept too, so read sessions can pin a user to the primary right after their
+own write (see database.make_read_session_class).
+
+Counters live in process memory: other workers only see a write once their own cache TTL expires.
+A user's counter is dropped once their last write is older than DATA_VERSION_RETENTION, which
+must exceed the longest cache TTL: by then every entry computed before that write has expired,
+and entries computed after it carry a version that a fresh counter never repeats.
+"""
+import itertools
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_INFO_KEY = "dirty_user_ids"
+
+DATA_VERSION_RETENTION = float(os.getenv("DATA_VERSION_RETENTION", "900"))
+
+# Versions come from one process-wide clock, so a user's version never repeats after eviction
+_clock = itertools.count(1)
+# user_id -> (version, monotonic time of the last write), least recently written first
+_versions: "OrderedDict[str, tuple]" = OrderedDict()
+
+def current(user_id: str) -> int:
+    entry = _versions.get(user_id)
+    return entry[0] if entry else 0
+
+def bump(user_id: str):
+    now = time.monotonic()
+    _versions[user_id] = (next(_clock), now)
+    _versions.move_to_end(user_id)
+    while _versions:
+        oldest = next(iter(_versions.values()))
+        if now - oldest[1] <= DATA_VERSION_RETENTION:
+            break
+        _versions.popitem(last=False)
+
+def wrote_recently(user_id: Optional[str], seconds: float) -> bool:
+    """True if a write of `user_id` committed in this process within the last `seconds`."""
+    entry = _versions.get(user_id)
+    return entry is not None and time.monotonic() - entry[1] < seconds
+
+def tracked_users() -> int:
+    return len(_versions)
+
+def mark_dirty(session, user_id: str):
+    """
+    Records that `user_id`'s data changes in the session's current transaction.
+    Accepts a sync Session or an AsyncSession (whose `info` is shared with its sync session).
+    """
+    if user_id is not None:
+        session.info.setdefault(_INFO_KEY, set()).add(user_id)
+
+@event.listens_for(Session, "after_commit")
+def _bump_after_commit(session):
+    for user_id in session.info.pop(_INFO_KEY, ()):
+        bump(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(_INFO_KEY, None)
@@ -0,0 +1,125 @@
+import csv
+import io
+import json
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend import crud, models
+
+# Rows fetched per server-side cursor round-trip (and per Parquet row group)
+PARTITION_SIZE = 2000
+
+EXPORT_COLUMNS = ("id", "date", "amount", "category", "description")
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+async def _partitions(db: AsyncSession, query) -> AsyncIterator[list]:
+    # stream_scalars uses a server-side cursor (yield_per), so only one partition is held in memory
+    query = query.order_by(models.Expense.date, models.Expense.id).execution_options(yield_per=PARTITION_SIZE)
+    result = await db.stream_scalars(query)
+    async for partition in result.partitions(PARTITION_SIZE):
+        yield partition
+
+def _row(expense: models.Expense) -> dict:
+    return {
+        "id": expense.id,
+        "date": expense.date.isoformat() if expense.date else None,
+        "amount": expense.amount,
+        "category": expense.category,
+        "description": expense.description,
+    }
+
+async def _csv(db: AsyncSession, query) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    async for partition in _partitions(db, query):
+        writer.writerows(_row(e) for e in partition)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        # Header only (no matching rows)
+        yield buffer.getvalue().encode("utf-8")
+
+async def _ndjson(db: AsyncSession, query) -> AsyncIterator[bytes]:
+    async for partition in _partitions(db, query):
+        yield "".join(json.dumps(_row(e)) + "\n" for e in partition).encode("utf-8")
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to the caller instead of keeping them."""
+
+    def __init__(self):
+        self.closed = False
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+async def _parquet(db: AsyncSession, query) -> AsyncIterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("date", pa.timestamp("us")),
+        ("amount", pa.float64()),
+        ("category", pa.string()),
+        ("description", pa.string()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    try:
+        # One row group per partition; each is flushed to the client as soon as it is written
+        async for partition in _partitions(db, query):
+            writer.write_table(pa.table({
+                "id": [e.id for e in partition],
+                "date": [e.date for e in partition],
+                "amount": [e.amount for e in partition],
+                "category": [e.category for e in partition],
+                "description": [e.description for e in partition],
+            }, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+_WRITERS = {"csv": _csv, "ndjson": _ndjson, "parquet": _parquet}
+
+def export_expenses(db: AsyncSession, user_id: str, fmt: str, category: str = None, search: str = None, date: str = None, end_date: str = None) -> AsyncIterator[bytes]:
+    """
+    Returns an async byte stream of the user's expenses in `fmt` (csv, ndjson or parquet),
+    filtered like the Finance agent's get_expenses tool.
+    """
+    query = crud.filter_expenses(user_id, db.bind.dialect.name, category=category, search=search, date=date, end_date=end_date)
+    return _WRITERS[fmt](db, query)
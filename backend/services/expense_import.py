@@ -0,0 +1,170 @@
+import asyncio
+import codecs
+import csv
+import io
+import logging
+import re
+from datetime import datetime
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend import crud, schemas
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+
+SUPPORTED_FORMATS = ("csv", "ofx")
+
+class SkipRow:
+    """Yielded by a parser for rows that are valid but not expenses (e.g. OFX credits)."""
+
+    def __init__(self, reason: str):
+        self.reason = reason
+
+def detect_format(filename: Optional[str], requested: Optional[str] = None) -> str:
+    """
+    Returns 'csv' or 'ofx'. Raises ValueError for anything else.
+    """
+    fmt = (requested or "").lower()
+    if not fmt and filename:
+        extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+        fmt = "ofx" if extension in ("ofx", "qfx") else extension
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported import format '{fmt or filename}'. Use one of: {', '.join(SUPPORTED_FORMATS)}")
+    return fmt
+
+# CSV
+# Expected header: amount,category,description,date (case-insensitive, extra columns ignored)
+def iter_csv_rows(file: BinaryIO) -> Iterator[Tuple[int, dict]]:
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.DictReader(text)
+        if reader.fieldnames:
+            reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+        for row in reader:
+            # Line numbers are 1-based and count the header
+            yield reader.line_num, {
+                "amount": (row.get("amount") or "").strip() or None,
+                "category": (row.get("category") or "").strip(),
+                "description": (row.get("description") or "").strip() or None,
+                "date": (row.get("date") or "").strip() or None,
+            }
+    finally:
+        # Don't close the underlying upload file together with the wrapper
+        text.detach()
+
+# OFX
+# OFX 1.x is SGML (closing tags optional, often a single line), 2.x is XML. Both are handled by
+# scanning for tags in fixed-size chunks and emitting one row per <STMTTRN> block.
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+_OFX_CHUNK_SIZE = 64 * 1024
+
+def _parse_ofx_date(value: str) -> datetime:
+    # YYYYMMDD[HHMMSS[.XXX]][[gmt offset:tz name]]
+    digits = re.match(r"\d+", value.strip())
+    if not digits or len(digits.group()) < 8:
+        raise ValueError(f"Invalid OFX date '{value}'")
+    stamp = digits.group()
+    return datetime.strptime(stamp[:14].ljust(14, "0"), "%Y%m%d%H%M%S")
+
+def iter_ofx_rows(file: BinaryIO, default_category: str = "Imported") -> Iterator[Tuple[int, object]]:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    transaction = None
+    index = 0
+    while True:
+        chunk = file.read(_OFX_CHUNK_SIZE)
+        buffer += decoder.decode(chunk or b"", final=not chunk)
+        cut = len(buffer)
+        if chunk:
+            # Only consume up to the last '<' so a tag split across chunks is completed next round
+            cut = buffer.rfind("<")
+            if cut == -1:
+                # Header lines / whitespace before the first tag
+                buffer = ""
+                continue
+            if cut == 0:
+                continue
+
+        for match in _OFX_TAG.finditer(buffer, 0, cut):
+            closing, tag, value = match.group(1), match.group(2).upper(), match.group(3).strip()
+            # SGML files may omit </STMTTRN>, so a new block or the end of the list also closes one
+            if tag in ("STMTTRN", "BANKTRANLIST") and transaction is not None and (closing or tag == "STMTTRN"):
+                index += 1
+                yield index, _ofx_transaction_to_row(transaction, default_category)
+                transaction = None
+            if tag == "STMTTRN" and not closing:
+                transaction = {}
+            elif transaction is not None and not closing and value:
+                transaction[tag] = value
+
+        buffer = buffer[cut:]
+        if not chunk:
+            break
+
+def _ofx_transaction_to_row(transaction: dict, default_category: str):
+    try:
+        amount = float(transaction.get("TRNAMT", "").replace(",", "."))
+    except ValueError:
+        return {"amount": transaction.get("TRNAMT"), "category": default_category}
+    if amount >= 0:
+        # Credits (salary, refunds) are not expenses
+        return SkipRow(f"Credit transaction {transaction.get('FITID', '')}".strip())
+    try:
+        date = _parse_ofx_date(transaction["DTPOSTED"]) if "DTPOSTED" in transaction else None
+    except ValueError:
+        date = transaction.get("DTPOSTED")
+    description = " - ".join(part for part in (transaction.get("NAME"), transaction.get("MEMO")) if part) or None
+    return {
+        "amount": -amount,
+        "category": default_category,
+        "description": description[:100] if description else None,
+        "date": date,
+    }
+
+def _next_batch(rows: Iterator[Tuple[int, object]], result: schemas.ExpenseImportResult, batch_size: int) -> List[dict]:
+    """Reads and validates rows until `batch_size` are valid or the file ends."""
+    batch = []
+    for row_number, raw in rows:
+        if isinstance(raw, SkipRow):
+            result.skipped += 1
+            continue
+        try:
+            batch.append(schemas.ExpenseCreate(**raw).model_dump())
+        except ValidationError as e:
+            result.failed += 1
+            if len(result.errors) < MAX_REPORTED_ERRORS:
+                message = "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+                result.errors.append(schemas.ExpenseImportError(row=row_number, error=message))
+            else:
+                result.errors_truncated = True
+            continue
+
+        if len(batch) >= batch_size:
+            break
+    return batch
+
+async def import_expenses(db: AsyncSession, user_id: str, file: BinaryIO, fmt: str, default_category: str = "Imported", batch_size: int = BATCH_SIZE) -> schemas.ExpenseImportResult:
+    """
+    Stream-parses `file`, validates every row against schemas.ExpenseCreate and inserts valid
+    rows in batches. Memory is bounded by one batch. Valid rows are committed in a single
+    transaction; invalid rows are reported and skipped.
+    Reading and parsing run in a worker thread. A CSV that is not UTF-8 raises
+    UnicodeDecodeError and a malformed one csv.Error; nothing is committed then.
+    """
+    rows = iter_csv_rows(file) if fmt == "csv" else iter_ofx_rows(file, default_category)
+    result = schemas.ExpenseImportResult(format=fmt)
+
+    while True:
+        batch = await asyncio.to_thread(_next_batch, rows, result, batch_size)
+        if not batch:
+            break
+        result.imported += await crud.bulk_create_expenses(db, batch, user_id)
+
+    await db.commit()
+    logger.info(f"Imported {result.imported} expenses for user {user_id} ({result.failed} failed, {result.skipped} skipped)")
+    return result
@@ -0,0 +1,224 @@
+"""
+Cache of LLM answers for the deterministic routing stages: safety verdicts, intent labels and
+tool argument extraction.
+
+Entries are keyed by a hash of (model, stage, normalized messages, tools and other request
+parameters). Messages are normalized by collapsing whitespace and case, so "How much did I spend
+this month?" and "how much did i spend  this month?" share an entry. History sent as context is
+part of the messages, so a classification is only reused for the same conversation state.
+
+- Memory tier: LRU of LLM_CACHE_SIZE entries per worker.
+- Disk tier (optional): a SQLite file at LLM_CACHE_PATH, shared by the workers on a host and kept
+  across restarts. Disk hits are promoted to memory.
+- TTL per stage (LLM_CACHE_TTL_<STAGE>, seconds). Stages without a TTL are never cached; stages
+  that answer from user-specific data (LLM_CACHE_BYPASS, e.g. finance) are refused even if a
+  TTL is configured.
+
+Only key hashes and the model's answers are stored, never the messages themselves.
+Concurrent misses for the same key share one completion.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from backend.services.llm_gateway import llm_gateway
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "5000"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH") or None
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "finance,currency,interpreter,architect,auditor")
+
+DEFAULT_TTLS = {
+    "safety": 86400,
+    "classify": 3600,
+    "gatekeeper": 3600,
+    "tool_args": 86400,
+}
+
+def normalize(text: str) -> str:
+    return " ".join((text or "").split()).casefold()
+
+class LLMCache:
+    def __init__(self, ttls: Dict[str, float], maxsize: int = LLM_CACHE_SIZE, path: Optional[str] = LLM_CACHE_PATH,
+                 bypass: Iterable[str] = (), gateway=llm_gateway):
+        self.ttls = ttls
+        self.maxsize = maxsize
+        self.path = path
+        self.bypass = set(bypass)
+        self.gateway = gateway
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, int]] = {}
+
+    def cacheable(self, stage: str) -> bool:
+        return stage not in self.bypass and self.ttls.get(stage, 0) > 0
+
+    def key(self, stage: str, messages: List[Dict], model: str, **params) -> str:
+        payload = {
+            "model": model,
+            "stage": stage,
+            "messages": [(m.get("role"), normalize(m.get("content"))) for m in messages],
+            # tools, response_format, temperature, ...
+            "params": params,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    async def complete(self, stage: str, messages: List[Dict], **kwargs) -> str:
+        """
+        The answer text of llm_gateway.complete(stage, messages, **kwargs), from the cache if a
+        fresh entry exists. Uncacheable stages always go to the gateway.
+        """
+        if not self.cacheable(stage):
+            self._count(stage, "bypassed")
+            response = await self.gateway.complete(stage, messages, **kwargs)
+            return response.choices[0].message.content
+
+        kwargs.setdefault("model", self.gateway.model)
+        key = self.key(stage, messages, **kwargs)
+        value = self.get(key)
+        if value is not None:
+            self._count(stage, "hits")
+            return value
+        value = await self._get_disk(key)
+        if value is not None:
+            self._count(stage, "disk_hits")
+            return value
+
+        # If the caller that started a completion is cancelled, the next waiter starts a new one
+        # and the others share that
+        while (pending := self._pending.get(key)) is not None:
+            try:
+                value = await asyncio.shield(pending)
+                self._count(stage, "hits")
+                return value
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+
+        self._count(stage, "misses")
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            response = await self.gateway.complete(stage, messages, **kwargs)
+            value = response.choices[0].message.content
+            if value:
+                await self.set(stage, key, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Retrieved here so an unawaited failure is not reported as never retrieved
+            future.exception()
+            raise
+        finally:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, stage: str, key: str, value: str):
+        expires_at = time.time() + self.ttls[stage]
+        self._remember(key, expires_at, value)
+        if self.path:
+            await asyncio.to_thread(self._write_disk, key, stage, value, expires_at)
+
+    def _remember(self, key: str, expires_at: float, value: str):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def _get_disk(self, key: str) -> Optional[str]:
+        if not self.path:
+            return None
+        row = await asyncio.to_thread(self._read_disk, key)
+        if row is None:
+            return None
+        value, expires_at = row
+        self._remember(key, expires_at, value)
+        return value
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, stage TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+        return self._db
+
+    def _read_disk(self, key: str):
+        try:
+            with self._db_lock:
+                return self._connect().execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache read failed: {e}")
+            return None
+
+    def _write_disk(self, key: str, stage: str, value: str, expires_at: float):
+        try:
+            with self._db_lock:
+                db = self._connect()
+                db.execute("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)", (key, stage, value, expires_at))
+                db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache write failed: {e}")
+
+    def _count(self, stage: str, outcome: str):
+        counts = self._stages.setdefault(stage, {"hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0})
+        counts[outcome] += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._stages.clear()
+        if self.path:
+            with self._db_lock:
+                self._connect().execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        stages = {}
+        for stage, counts in self._stages.items():
+            lookups = counts["hits"] + counts["disk_hits"] + counts["misses"]
+            stages[stage] = dict(counts, hit_rate=(counts["hits"] + counts["disk_hits"]) / lookups if lookups else 0.0)
+        hits = sum(c["hits"] + c["disk_hits"] for c in self._stages.values())
+        lookups = hits + sum(c["misses"] for c in self._stages.values())
+        return {
+            "entries": len(self._entries),
+            "disk": self.path is not None,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "stages": stages,
+        }
+
+llm_cache = LLMCache(
+    ttls={stage: float(os.getenv(f"LLM_CACHE_TTL_{stage.upper()}", str(ttl))) for stage, ttl in DEFAULT_TTLS.items()},
+    bypass=[stage.strip() for stage in LLM_CACHE_BYPASS.split(",") if stage.strip()],
+)
@@ -0,0 +1,295 @@
+"""
+Single entry point for chat completions, shared by all agents.
+
+- One AsyncOpenAI client on a pooled keep-alive httpx client (LLM_MAX_CONNECTIONS), created on
+  first use and closed on shutdown, instead of one client per agent module.
+- At most LLM_MAX_CONCURRENCY completions in flight per worker; further calls wait for a slot,
+  so a burst of /chat traffic queues instead of opening ever more sockets.
+- A total deadline per stage (LLM_TIMEOUT_<STAGE>, e.g. LLM_TIMEOUT_SAFETY=10), covering the
+  whole completion rather than each socket read.
+- Timeouts, connection errors, 429s and 5xx are retried up to LLM_MAX_RETRIES times with
+  full-jitter exponential backoff. Other errors are raised right away.
+- stream() yields the text deltas of a streamed completion, under the same limits.
+- Every call ends with a CallRecord passed to the metrics hooks (add_hook) and aggregated per
+  stage for GET /chat/stats.
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import AsyncIterator, Callable, Dict, List, NamedTuple, Optional
+
+import httpx
+import openai
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+load_dotenv(".env.local")
+load_dotenv()
+
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://openrouter.ai/api/v1")
+LLM_MODEL = os.getenv("LLM_MODEL", "google/gemini-3-flash-preview")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "64"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE = float(os.getenv("LLM_RETRY_BASE", "0.5"))
+LLM_RETRY_MAX = float(os.getenv("LLM_RETRY_MAX", "8"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+
+# Seconds per stage; routing calls are short, tool generation is not
+DEFAULT_TIMEOUTS = {
+    "safety": 10,
+    "classify": 10,
+    "gatekeeper": 10,
+    "tool_args": 20,
+    "currency": 30,
+    "finance": 45,
+    "interpreter": 60,
+    "auditor": 60,
+    "architect": 90,
+}
+
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+class CallRecord(NamedTuple):
+    stage: str
+    model: str
+    ok: bool
+    attempts: int
+    latency_ms: float # From the first attempt to the result, including backoff
+    queued_ms: float # Time spent waiting for a concurrency slot
+    prompt_tokens: int
+    completion_tokens: int
+    error: Optional[str]
+
+class LLMGateway:
+    def __init__(self, base_url: str = LLM_BASE_URL, api_key: Optional[str] = None, model: str = LLM_MODEL,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY, max_connections: int = LLM_MAX_CONNECTIONS,
+                 keepalive_seconds: float = LLM_KEEPALIVE_SECONDS, timeouts: Optional[Dict[str, float]] = None,
+                 default_timeout: float = LLM_TIMEOUT, max_retries: int = LLM_MAX_RETRIES,
+                 retry_base: float = LLM_RETRY_BASE, retry_max: float = LLM_RETRY_MAX,
+                 client: Optional[AsyncOpenAI] = None):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.keepalive_seconds = keepalive_seconds
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self._client = client
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._hooks: List[Callable[[CallRecord], None]] = []
+        self.in_flight = 0
+        self.waiting = 0
+        self._stages: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        if self._client is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_concurrency,
+                    keepalive_expiry=self.keepalive_seconds,
+                ),
+                timeout=httpx.Timeout(self.default_timeout, connect=10.0),
+            )
+            self._client = AsyncOpenAI(
+                base_url=self.base_url,
+                api_key=self.api_key or os.getenv("OPENROUTER_API_KEY"),
+                http_client=http_client,
+                # Retries happen here, with jitter and within the stage deadline
+                max_retries=0,
+            )
+        return self._client
+
+    def timeout_for(self, stage: str) -> float:
+        return self.timeouts.get(stage, self.default_timeout)
+
+    def add_hook(self, hook: Callable[[CallRecord], None]):
+        """Registers a callable that receives the CallRecord of every completion."""
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[CallRecord], None]):
+        self._hooks.remove(hook)
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: uniform between 0 and the exponential backoff cap."""
+        return random.uniform(0, min(self.retry_max, self.retry_base * 2 ** attempt))
+
+    async def complete(self, stage: str, messages: List[Dict], **kwargs):
+        """
+        client.chat.completions.create(messages=..., **kwargs) for `stage`, with the
+        gateway's model unless `model` is given. Raises the last error once retries are spent.
+        """
+        kwargs.setdefault("model", self.model)
+        timeout = self.timeout_for(stage)
+        started = time.perf_counter()
+        queued_ms = 0.0
+        attempt = 0
+        while True:
+            attempt += 1
+            queued = time.perf_counter()
+            self.waiting += 1
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self.waiting -= 1
+            queued_ms += (time.perf_counter() - queued) * 1000
+            self.in_flight += 1
+            try:
+                response = await asyncio.wait_for(self.client.chat.completions.create(messages=messages, **kwargs), timeout)
+            except RETRYABLE_ERRORS as e:
+                error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+                if attempt > self.max_retries:
+                    self._finish(stage, kwargs["model"], False, attempt, started, queued_ms, None, error)
+                    raise
+                delay = self.backoff(attempt - 1)
+                logger.warning(f"LLM {stage} attempt {attempt} failed ({error}); retrying in {delay:.2f}s")
+            except Exception as e:
+                self._finish(stage, kwargs["model"], False, attempt, started, queued_ms, None, f"{type(e).__name__}: {e}")
+                raise
+            else:
+                self._finish(stage, kwargs["model"], True, attempt, started, queued_ms, getattr(response, "usage", None), None)
+                return response
+            finally:
+                self.in_flight -= 1
+                self._semaphore.release()
+            # Back off without holding a concurrency slot
+            await asyncio.sleep(delay)
+
+    async def stream(self, stage: str, messages: List[Dict], **kwargs) -> AsyncIterator[str]:
+        """
+        Like complete() with stream=True, yielding the text deltas as they arrive. The concurrency
+        slot is held and the stage deadline applies until the last chunk. Errors are only retried
+        before the first delta; after that they are raised to the caller.
+        """
+        kwargs.setdefault("model", self.model)
+        kwargs.setdefault("stream_options", {"include_usage": True})
+        timeout = self.timeout_for(stage)
+        started = time.perf_counter()
+        queued_ms = 0.0
+        attempt = 0
+        while True:
+            attempt += 1
+            queued = time.perf_counter()
+            self.waiting += 1
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self.waiting -= 1
+            queued_ms += (time.perf_counter() - queued) * 1000
+            self.in_flight += 1
+            streamed = False
+            usage = None
+            try:
+                deadline = time.perf_counter() + timeout
+                chunks = await asyncio.wait_for(self.client.chat.completions.create(messages=messages, stream=True, **kwargs), timeout)
+                try:
+                    iterator = chunks.__aiter__()
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(iterator.__anext__(), max(deadline - time.perf_counter(), 0))
+                        except StopAsyncIteration:
+                            break
+                        usage = getattr(chunk, "usage", None) or usage
+                        content = chunk.choices[0].delta.content if chunk.choices else None
+                        if content:
+                            streamed = True
+                            yield content
+                finally:
+                    await chunks.close()
+            except RETRYABLE_ERRORS as e:
+                error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+                if streamed or attempt > self.max_retries:
+                    self._finish(stage, kwargs["model"], False, attempt, started, queued_ms, usage, error)
+                    raise
+                delay = self.backoff(attempt - 1)
+                logger.warning(f"LLM {stage} stream attempt {attempt} failed ({error}); retrying in {delay:.2f}s")
+            except Exception as e:
+                self._finish(stage, kwargs["model"], False, attempt, started, queued_ms, usage, f"{type(e).__name__}: {e}")
+                raise
+            else:
+                self._finish(stage, kwargs["model"], True, attempt, started, queued_ms, usage, None)
+                return
+            finally:
+                self.in_flight -= 1
+                self._semaphore.release()
+            await asyncio.sleep(delay)
+
+    def _finish(self, stage: str, model: str, ok: bool, attempts: int, started: float, queued_ms: float, usage, error: Optional[str]):
+        record = CallRecord(
+            stage=stage,
+            model=model,
+            ok=ok,
+            attempts=attempts,
+            latency_ms=(time.perf_counter() - started) * 1000,
+            queued_ms=queued_ms,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            error=error,
+        )
+        totals = self._stages.setdefault(stage, {
+            "calls": 0, "errors": 0, "retries": 0, "total_ms": 0.0, "max_ms": 0.0, "queued_ms": 0.0,
+            "prompt_tokens": 0, "completion_tokens": 0,
+        })
+        totals["calls"] += 1
+        totals["errors"] += not ok
+        totals["retries"] += attempts - 1
+        totals["total_ms"] += record.latency_ms
+        totals["max_ms"] = max(totals["max_ms"], record.latency_ms)
+        totals["queued_ms"] += queued_ms
+        totals["prompt_tokens"] += record.prompt_tokens
+        totals["completion_tokens"] += record.completion_tokens
+        for hook in self._hooks:
+            try:
+                hook(record)
+            except Exception as e:
+                logger.error(f"LLM metrics hook failed: {e}")
+
+    def clear(self):
+        self._stages.clear()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "stages": {
+                stage: {
+                    "calls": int(t["calls"]),
+                    "errors": int(t["errors"]),
+                    "retries": int(t["retries"]),
+                    "avg_ms": round(t["total_ms"] / t["calls"], 2),
+                    "max_ms": round(t["max_ms"], 2),
+                    "avg_queued_ms": round(t["queued_ms"] / t["calls"], 2),
+                    "prompt_tokens": int(t["prompt_tokens"]),
+                    "completion_tokens": int(t["completion_tokens"]),
+                }
+                for stage, t in self._stages.items()
+            },
+        }
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+llm_gateway = LLMGateway(timeouts={
+    stage: float(os.getenv(f"LLM_TIMEOUT_{stage.upper()}", str(seconds)))
+    for stage, seconds in DEFAULT_TIMEOUTS.items()
+})
@@ -0,0 +1,206 @@
+"""
+Incrementally maintained monthly rollup of expenses.
+
+`expense_monthly_rollup` holds SUM(amount)/COUNT(*) per (user_id, year_month, category_id),
+with category_id 0 for uncategorised expenses.
+It is updated inside the same transaction as the expense write:
+- ORM writes (crud.create_expense, add_expense_tool, seed data) are picked up by a
+  `before_flush` hook on every Session.
+- Bulk Core statements (crud.bulk_create_expenses, services/user_deletion.py) must call
+  `apply_deltas` / `delete_user` themselves.
+
+Maintenance commands live in backend/manage_rollup.py (rebuild / check).
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event, func, inspect, literal_column, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from backend.models import Expense, ExpenseMonthlyRollup
+from backend.services import data_version
+
+logger = logging.getLogger(__name__)
+
+RollupKey = Tuple[str, str, int] # (user_id, year_month, category_id)
+
+def year_month(value: datetime) -> str:
+    return value.strftime("%Y-%m")
+
+def year_month_expr(dialect_name: str, column):
+    """SQL expression rendering `column` as 'YYYY-MM' for the given dialect."""
+    if dialect_name == "postgresql":
+        return func.to_char(column, "YYYY-MM")
+    return func.strftime("%Y-%m", column)
+
+def _insert_for(dialect_name: str):
+    return postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+
+def apply_deltas(connection, deltas: Dict[RollupKey, Tuple[float, int]]):
+    """
+    Adds (total, count) deltas to the rollup with an upsert and drops buckets that became empty.
+    `connection` is a sync Connection (inside a flush hook or `run_sync`).
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta[1] != 0 or delta[0] != 0}
+    if not deltas:
+        return
+
+    table = ExpenseMonthlyRollup.__table__
+    insert = _insert_for(connection.dialect.name)
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.year_month, table.c.category_id],
+        set_={
+            "total": table.c.total + stmt.excluded.total,
+            "count": table.c.count + stmt.excluded.count,
+        },
+    )
+    connection.execute(stmt, [
+        {"user_id": user_id, "year_month": ym, "category_id": category_id, "total": total, "count": count}
+        for (user_id, ym, category_id), (total, count) in deltas.items()
+    ])
+
+    user_ids = {key[0] for key in deltas}
+    connection.execute(table.delete().where(table.c.user_id.in_(user_ids), table.c.count <= 0))
+
+def _key(user_id, date, category_id) -> RollupKey:
+    return (user_id, year_month(date), category_id or 0)
+
+def deltas_for(user_id: str, rows, sign: int = 1) -> Dict[RollupKey, Tuple[float, int]]:
+    """
+    Rollup deltas for Core-level inserts (sign=1) or deletes (sign=-1) of one user's
+    expenses. `rows` yields (date, category_id, amount).
+    """
+    deltas = defaultdict(lambda: [0.0, 0])
+    for date, category_id, amount in rows:
+        bucket = deltas[_key(user_id, date, category_id)]
+        bucket[0] += sign * amount
+        bucket[1] += sign
+    return {key: tuple(value) for key, value in deltas.items()}
+
+@event.listens_for(Session, "before_flush")
+def _track_expense_changes(session, flush_context, instances):
+    deltas = defaultdict(lambda: [0.0, 0])
+
+    def add(user_id, date, category_id, amount, sign):
+        data_version.mark_dirty(session, user_id)
+        if user_id is None or date is None or amount is None:
+            return
+        bucket = deltas[_key(user_id, date, category_id)]
+        bucket[0] += sign * amount
+        bucket[1] += sign
+
+    for obj in session.new:
+        if isinstance(obj, Expense):
+            if obj.date is None:
+                # Resolve the column default now so the row and its bucket agree
+                obj.date = datetime.utcnow()
+            add(obj.user_id, obj.date, obj.category_id, obj.amount, 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Expense):
+            state = inspect(obj)
+            original = {attr: _original_value(state, attr) for attr in ("user_id", "date", "category_id", "amount")}
+            add(original["user_id"], original["date"], original["category_id"], original["amount"], -1)
+
+    for obj in session.dirty:
+        if isinstance(obj, Expense) and session.is_modified(obj):
+            state = inspect(obj)
+            tracked = ("user_id", "date", "category_id", "amount")
+            if not any(state.attrs[attr].history.has_changes() for attr in tracked):
+                continue
+            original = {attr: _original_value(state, attr) for attr in tracked}
+            add(original["user_id"], original["date"], original["category_id"], original["amount"], -1)
+            add(obj.user_id, obj.date, obj.category_id, obj.amount, 1)
+
+    if deltas:
+        apply_deltas(session.connection(), {key: tuple(value) for key, value in deltas.items()})
+
+def _original_value(state, attr):
+    history = state.attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return state.attrs[attr].value
+
+async def delete_user(db, user_id: str):
+    """Drops all rollup buckets of a user (caller commits)."""
+    await db.execute(ExpenseMonthlyRollup.__table__.delete().where(ExpenseMonthlyRollup.user_id == user_id))
+
+def _aggregate_query(dialect_name: str, user_id: Optional[str] = None):
+    ym = year_month_expr(dialect_name, Expense.date).label("year_month")
+    category_id = func.coalesce(Expense.category_id, literal_column("0")).label("category_id")
+    query = (
+        select(
+            Expense.user_id,
+            ym,
+            category_id,
+            func.sum(Expense.amount).label("total"),
+            func.count().label("count"),
+        )
+        .where(Expense.user_id.is_not(None), Expense.date.is_not(None))
+        .group_by(Expense.user_id, ym, category_id)
+    )
+    if user_id:
+        query = query.where(Expense.user_id == user_id)
+    return query
+
+async def rebuild(db, user_id: Optional[str] = None) -> int:
+    """
+    Recomputes rollup buckets from `expenses` (all users, or one). Returns the number of buckets written.
+    Caller commits.
+    """
+    dialect_name = db.bind.dialect.name
+    table = ExpenseMonthlyRollup.__table__
+    delete = table.delete()
+    if user_id:
+        delete = delete.where(table.c.user_id == user_id)
+    await db.execute(delete)
+
+    query = _aggregate_query(dialect_name, user_id)
+    result = await db.execute(
+        table.insert().from_select(["user_id", "year_month", "category_id", "total", "count"], query)
+    )
+    return result.rowcount
+
+async def check(db, user_id: Optional[str] = None, tolerance: float = 0.005) -> list:
+    """
+    Compares the rollup with a fresh aggregate over `expenses`.
+    Returns a list of mismatches: (key, expected (total, count), actual (total, count)).
+    """
+    dialect_name = db.bind.dialect.name
+    expected = {
+        (row.user_id, row.year_month, row.category_id): (row.total, row.count)
+        for row in (await db.execute(_aggregate_query(dialect_name, user_id))).all()
+    }
+    query = select(ExpenseMonthlyRollup)
+    if user_id:
+        query = query.where(ExpenseMonthlyRollup.user_id == user_id)
+    actual = {
+        (r.user_id, r.year_month, r.category_id): (r.total, r.count)
+        for r in (await db.execute(query)).scalars().all()
+    }
+
+    mismatches = []
+    for key in sorted(set(expected) | set(actual)):
+        exp = expected.get(key, (0.0, 0))
+        act = actual.get(key, (0.0, 0))
+        if exp[1] != act[1] or abs(exp[0] - act[0]) > tolerance:
+            mismatches.append((key, exp, act))
+    return mismatches
+
+async def backfill_if_empty(db) -> bool:
+    """
+    Builds the rollup on startup for databases created before the table existed
+    (e.g. dev SQLite files managed by create_all instead of Alembic).
+    """
+    has_rollup = (await db.execute(select(ExpenseMonthlyRollup.user_id).limit(1))).first()
+    has_expenses = (await db.execute(select(Expense.id).where(Expense.user_id.is_not(None)).limit(1))).first()
+    if has_rollup or not has_expenses:
+        return False
+    count = await rebuild(db)
+    await db.commit()
+    logger.info(f"Backfilled {count} expense rollup buckets.")
+    return True
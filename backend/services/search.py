@@ -0,0 +1,116 @@
+"""
+Full-text search over expense category/description.
+
+- SQLite: FTS5 external-content table `expenses_fts` over the `expenses_search_content` view
+  (description plus the category name), kept in sync with `expenses` by triggers.
+- Postgres: GIN expression index over to_tsvector('simple', description); category names are
+  matched through the (small, per-user) categories table.
+
+Both are maintained by the database itself, so ORM writes, bulk imports and raw SQL all stay
+indexed. Terms are prefix-matched ("coff" finds "Coffee") and every term must match either the
+description or the category name. Category names never change once created, so the indexed
+names cannot go stale.
+"""
+import re
+from typing import List
+
+from sqlalchemy import DDL, and_, column, event, func, literal_column, or_, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models import Category, Expense
+
+# SQLite FTS5
+_CATEGORY_NAME = "(SELECT name FROM categories WHERE id = {}.category_id)"
+SQLITE_FTS_DDL = [
+    "CREATE VIEW IF NOT EXISTS expenses_search_content AS "
+    "SELECT e.id, c.name AS category, e.description FROM expenses e LEFT JOIN categories c ON c.id = e.category_id",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5("
+    "category, description, content='expenses_search_content', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS expenses_fts_ai AFTER INSERT ON expenses BEGIN "
+    f"INSERT INTO expenses_fts(rowid, category, description) VALUES (new.id, {_CATEGORY_NAME.format('new')}, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS expenses_fts_ad AFTER DELETE ON expenses BEGIN "
+    f"INSERT INTO expenses_fts(expenses_fts, rowid, category, description) VALUES ('delete', old.id, {_CATEGORY_NAME.format('old')}, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS expenses_fts_au AFTER UPDATE OF category_id, description ON expenses BEGIN "
+    f"INSERT INTO expenses_fts(expenses_fts, rowid, category, description) VALUES ('delete', old.id, {_CATEGORY_NAME.format('old')}, old.description); "
+    f"INSERT INTO expenses_fts(rowid, category, description) VALUES (new.id, {_CATEGORY_NAME.format('new')}, new.description); END",
+]
+SQLITE_FTS_DROP = ["DROP TABLE IF EXISTS expenses_fts", "DROP VIEW IF EXISTS expenses_search_content"]
+
+# Postgres tsvector. The query must use exactly this expression for the planner to match the index.
+PG_TSVECTOR_SQL = "to_tsvector('simple', coalesce(description, ''))"
+PG_SEARCH_INDEX_DDL = f"CREATE INDEX IF NOT EXISTS ix_expenses_search ON expenses USING gin (({PG_TSVECTOR_SQL}))"
+
+for statement in SQLITE_FTS_DDL:
+    event.listen(Expense.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for statement in SQLITE_FTS_DROP:
+    event.listen(Expense.__table__, "before_drop", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Expense.__table__, "after_create", DDL(PG_SEARCH_INDEX_DDL).execute_if(dialect="postgresql"))
+
+_fts = table("expenses_fts", column("rowid"))
+
+def tokenize(term: str) -> List[str]:
+    """Lower-cased word tokens; everything else (quotes, operators) is dropped."""
+    return re.findall(r"\w+", (term or "").lower())
+
+def _sqlite_match(tokens: List[str]):
+    query = " ".join(f'"{token}"*' for token in tokens)
+    return literal_column("expenses_fts").op("MATCH")(query)
+
+def _pg_tsquery(tokens: List[str]):
+    return func.to_tsquery(literal_column("'simple'"), " & ".join(f"{token}:*" for token in tokens))
+
+def _pg_condition(user_id: str, tokens: List[str]):
+    # Each token must hit the description (GIN index) or one of the user's category names
+    tsvector = literal_column(PG_TSVECTOR_SQL)
+    return and_(*(
+        or_(
+            tsvector.op("@@")(_pg_tsquery([token])),
+            Expense.category_id.in_(
+                select(Category.id).where(
+                    Category.user_id == user_id,
+                    func.to_tsvector(literal_column("'simple'"), Category.name).op("@@")(_pg_tsquery([token])),
+                )
+            ),
+        )
+        for token in tokens
+    ))
+
+def search_condition(dialect_name: str, term: str, user_id: str):
+    """
+    WHERE clause restricting `expenses` to rows matching `term`, or None if the term has no words.
+    """
+    tokens = tokenize(term)
+    if not tokens:
+        return None
+    if dialect_name == "postgresql":
+        return _pg_condition(user_id, tokens)
+    return Expense.id.in_(select(_fts.c.rowid).where(_sqlite_match(tokens)))
+
+async def search_expenses(db: AsyncSession, user_id: str, term: str, limit: int = 20, offset: int = 0, query=None):
+    """
+    Returns the user's expenses matching `term`, best match first (newest first on ties).
+    `query` may be a pre-filtered select(Expense) (e.g. from crud.filter_expenses).
+    """
+    tokens = tokenize(term)
+    if not tokens:
+        return []
+
+    if query is None:
+        query = select(Expense).where(Expense.user_id == user_id)
+
+    if db.bind.dialect.name == "postgresql":
+        tsquery = func.to_tsquery(literal_column("'simple'"), " | ".join(f"{token}:*" for token in tokens))
+        query = query.where(_pg_condition(user_id, tokens)).order_by(
+            func.ts_rank(literal_column(PG_TSVECTOR_SQL), tsquery).desc()
+        )
+    else:
+        # bm25() is only valid in a query against the FTS table itself, so join it in
+        query = (
+            query.join(_fts, _fts.c.rowid == Expense.id)
+            .where(_sqlite_match(tokens))
+            .order_by(func.bm25(literal_column("expenses_fts")))
+        )
+
+    query = query.order_by(Expense.date.desc(), Expense.id.desc()).limit(limit).offset(offset)
+    result = await db.execute(query)
+    return result.scalars().all()
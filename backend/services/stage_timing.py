@@ -0,0 +1,53 @@
+"""
+Per-stage wall-clock timing of chat requests (safety check, history fetch, intent
+classification, routing), logged per request and aggregated per worker for GET /chat/stats.
+"""
+import time
+from typing import Dict
+
+class StageStats:
+    def __init__(self):
+        self._stages: Dict[str, Dict[str, float]] = {}
+
+    def record(self, stage: str, ms: float):
+        totals = self._stages.setdefault(stage, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        totals["count"] += 1
+        totals["total_ms"] += ms
+        totals["max_ms"] = max(totals["max_ms"], ms)
+
+    def clear(self):
+        self._stages.clear()
+
+    def stats(self) -> dict:
+        return {
+            stage: {"count": t["count"], "avg_ms": round(t["total_ms"] / t["count"], 2), "max_ms": round(t["max_ms"], 2)}
+            for stage, t in self._stages.items()
+        }
+
+stage_stats = StageStats()
+
+class StageTimer:
+    """Times the stages of one request. Stages may overlap; each is measured on its own."""
+
+    def __init__(self, stats: StageStats = stage_stats):
+        self.stats = stats
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+
+    async def run(self, stage: str, awaitable):
+        """Awaits `awaitable` and records how long it took (not if it raised or was cancelled)."""
+        start = time.perf_counter()
+        result = await awaitable
+        self.record(stage, (time.perf_counter() - start) * 1000)
+        return result
+
+    def mark(self, stage: str):
+        """Records the time since the timer was created, e.g. time-to-routing."""
+        self.record(stage, (time.perf_counter() - self.started) * 1000)
+
+    def record(self, stage: str, ms: float):
+        self.timings[stage] = ms
+        self.stats.record(stage, ms)
+
+    def summary(self) -> str:
+        return ", ".join(f"{stage}={ms:.0f}ms" for stage, ms in self.timings.items())
@@ -0,0 +1,191 @@
+"""
+In-memory BM25 index over the tools table (title, name, description and json_schema), so a
+new_tool request can reuse an existing tool instead of generating one.
+
+Documents are the tool's title and name (counted twice), description, and the property names,
+titles and descriptions in its json_schema. Queries and documents are lowercased, split on
+non-alphanumerics, snake_case and camelCase, stripped of stopwords and numbers, and
+plural-stemmed.
+
+Scores are normalized to 0..1 against an ideal document that contains every query term once,
+so TOOL_MATCH_THRESHOLD does not depend much on how many tools exist. Query terms that no tool
+contains lower the score, which keeps "compound interest with monthly contributions" from
+matching a loan calculator that merely shares "interest", "monthly" and "years".
+
+The index is rebuilt lazily on the next search after crud.create_tool / delete_tools_batch
+call invalidate(), and at least every TOOL_INDEX_TTL seconds to pick up tools created by other
+workers.
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+import time
+from collections import Counter
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import select
+
+from backend import models
+from backend.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+TOOL_MATCH_THRESHOLD = float(os.getenv("TOOL_MATCH_THRESHOLD", "0.7"))
+TOOL_INDEX_TTL = float(os.getenv("TOOL_INDEX_TTL", "60"))
+
+K1 = 1.2
+B = 0.75
+
+STOPWORDS = frozenset("""
+a about after all am an and any are as at be been before being but by can could did do does
+during each for from give had has have how i if in into is it its just long many me more much
+my need of on or our out over own per please should show so some than that the their them then
+there these they this those through to under until up us very was we were what when where which
+while who why will with would you your
+tool calculate calculator compute estimate find get help make run use using want work
+""".split())
+
+_WORD = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+")
+
+def stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("sses", "xes", "zes", "ches", "shes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+def terms(text: str) -> List[str]:
+    # The word pattern splits camelCase; underscores, digits and punctuation separate words
+    words = (w.lower() for w in _WORD.findall(text or ""))
+    return [stem(w) for w in words if len(w) > 1 and w not in STOPWORDS]
+
+def schema_text(json_schema) -> str:
+    """Property names, titles and descriptions of a JSON schema (dict or JSON string)."""
+    if isinstance(json_schema, str):
+        try:
+            json_schema = json.loads(json_schema)
+        except ValueError:
+            return json_schema
+    parts = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == "properties" and isinstance(value, dict):
+                    parts.extend(value.keys())
+                if key in ("title", "description") and isinstance(value, str):
+                    parts.append(value)
+                walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+
+    walk(json_schema)
+    return " ".join(parts)
+
+def document(tool) -> List[str]:
+    heading = f"{tool.title or ''} {tool.name or ''}"
+    return terms(heading) * 2 + terms(tool.description) + terms(schema_text(tool.json_schema))
+
+class ToolMatch(NamedTuple):
+    tool: models.Tool
+    score: float
+
+class ToolIndex:
+    def __init__(self, session_factory=None, threshold: float = TOOL_MATCH_THRESHOLD, ttl: float = TOOL_INDEX_TTL):
+        self.session_factory = session_factory
+        self.threshold = threshold
+        self.ttl = ttl
+        self._tools: List[models.Tool] = []
+        self._frequencies: List[Counter] = []
+        self._lengths: List[int] = []
+        self._df: Counter = Counter()
+        self._avg_length = 0.0
+        self._built_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self.rebuilds = 0
+        self.build_ms = 0.0
+        self.searches = 0
+        self.matches = 0
+
+    def invalidate(self):
+        self._built_at = None
+
+    def build(self, tools: List[models.Tool]):
+        start = time.perf_counter()
+        self._tools = list(tools)
+        self._frequencies = [Counter(document(tool)) for tool in self._tools]
+        self._lengths = [sum(f.values()) for f in self._frequencies]
+        self._df = Counter(term for f in self._frequencies for term in f)
+        self._avg_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        self._built_at = time.monotonic()
+        self.rebuilds += 1
+        self.build_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"Tool index built: {len(self._tools)} tools in {self.build_ms:.1f}ms")
+
+    async def refresh(self):
+        """Reloads the active tools if the index was invalidated or is older than the TTL."""
+        if self._built_at is not None and time.monotonic() - self._built_at < self.ttl:
+            return
+        async with self._lock:
+            if self._built_at is not None and time.monotonic() - self._built_at < self.ttl:
+                return
+            async with self.session_factory() as db:
+                tools = (await db.execute(select(models.Tool).where(models.Tool.is_active == 1))).scalars().all()
+            self.build(tools)
+
+    def _idf(self, term: str) -> float:
+        # A term no tool contains weighs like one that a single tool contains; with only a few
+        # tools, unseen terms would otherwise outweigh everything that matched
+        df = max(self._df[term], 1)
+        return math.log(1 + (len(self._tools) - df + 0.5) / (df + 0.5))
+
+    def rank(self, query: str, limit: int = 3) -> List[ToolMatch]:
+        """Tools by normalized BM25 score, best first (no threshold applied)."""
+        query_terms = list(dict.fromkeys(terms(query)))
+        if not query_terms or not self._tools:
+            return []
+        idf = {term: self._idf(term) for term in query_terms}
+        # An ideal document contains each query term once and has average length
+        ideal = sum(idf.values())
+        scores = []
+        for tool, frequencies, length in zip(self._tools, self._frequencies, self._lengths):
+            norm = K1 * (1 - B + B * length / self._avg_length)
+            # Each term counts at most as much as in the ideal document, so repeating a few
+            # shared words cannot make up for query terms the tool lacks
+            score = sum(
+                idf[term] * min(frequencies[term] * (K1 + 1) / (frequencies[term] + norm), 1.0)
+                for term in query_terms if term in frequencies
+            )
+            if score > 0:
+                scores.append(ToolMatch(tool, score / ideal))
+        scores.sort(key=lambda match: match.score, reverse=True)
+        return scores[:limit]
+
+    async def search(self, query: str) -> Optional[ToolMatch]:
+        """The best tool for `query` if it scores at least the threshold, else None."""
+        await self.refresh()
+        self.searches += 1
+        ranked = self.rank(query, limit=1)
+        if ranked and ranked[0].score >= self.threshold:
+            self.matches += 1
+            return ranked[0]
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "tools": len(self._tools),
+            "rebuilds": self.rebuilds,
+            "build_ms": round(self.build_ms, 2),
+            "searches": self.searches,
+            "matches": self.matches,
+            "match_rate": self.matches / self.searches if self.searches else 0.0,
+            "threshold": self.threshold,
+        }
+
+tool_index = ToolIndex(session_factory=AsyncSessionLocal)
@@ -0,0 +1,49 @@
+"""
+Short-TTL cache of User rows for auth.get_current_user, so an authenticated request does not
+need a users-table round-trip. Entries are detached instances and must be treated as read-only.
+
+crud.update_user invalidates the user's entry. Other workers keep their copy until the TTL
+runs out, which bounds how stale a profile (e.g. role) can be.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from backend.models import User
+
+class UserCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def get(self, user_id: str) -> Optional[User]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return user
+
+    def set(self, user: User):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        self._entries[user.id] = (time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(user.id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str):
+        self._entries.pop(user_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+user_cache = UserCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "30")),
+)
@@ -0,0 +1,90 @@
+"""
+Background deletion of all data belonging to a user (DELETE /users/me/data).
+
+The job runs in stages and reports progress through `DeletionJob`:
+1. SQL: expenses (with their rollup buckets), tools the user created and their categories,
+   in batches committed one at a time (crud.delete_user_data).
+2. Chats, through the configured chat store: in Firestore every document under
+   users/{uid}/chats/{chat}/<subcollection> with batched writes, then the chat documents
+   themselves; in SQL the user's chat_messages rows in batches.
+
+Jobs live in process memory: progress is only visible on the worker that started the job,
+and an interrupted job is resumed by simply starting it again (every stage is idempotent).
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+from uuid import uuid4
+
+from backend import crud
+from backend.services.chat_service import chat_service
+from backend.services.context_builder import context_builder
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("expenses", "tools", "categories", "chats")
+
+class DeletionJob:
+    def __init__(self, user_id: str):
+        self.id = uuid4().hex
+        self.user_id = user_id
+        self.status = "pending" # pending, running, completed, failed
+        self.stage: Optional[str] = None
+        self.deleted: Dict[str, int] = {stage: 0 for stage in STAGES}
+        self.error: Optional[str] = None
+        self.started_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def record(self, stage: str, count: int):
+        self.stage = stage
+        self.deleted[stage] += count
+
+_jobs: Dict[str, DeletionJob] = {}
+
+def clear():
+    _jobs.clear()
+
+def get_job(user_id: str) -> Optional[DeletionJob]:
+    """Latest deletion job of the user, if any ran in this process."""
+    return _jobs.get(user_id)
+
+def start(user_id: str, session_factory, batch_size: Optional[int] = None) -> DeletionJob:
+    """
+    Starts a deletion job for the user, or returns the one already in progress.
+    """
+    job = _jobs.get(user_id)
+    if job and not job.done:
+        return job
+    job = DeletionJob(user_id)
+    _jobs[user_id] = job
+    job.task = asyncio.create_task(run(job, session_factory, batch_size or crud.DELETE_BATCH_SIZE))
+    return job
+
+async def run(job: DeletionJob, session_factory, batch_size: int = crud.DELETE_BATCH_SIZE):
+    job.status = "running"
+    try:
+        async with session_factory() as db:
+            await crud.delete_user_data(db, job.user_id, batch_size=batch_size, on_batch=job.record)
+
+        job.stage = "chats"
+        context_builder.invalidate_user(job.user_id)
+        if chat_service.store is None:
+            logger.warning(f"Chat store is not initialized; chats of user {job.user_id} were not deleted.")
+        else:
+            await chat_service.discard(job.user_id)
+            await chat_service.store.delete_user(job.user_id, lambda count: job.record("chats", count))
+
+        job.status = "completed"
+        logger.info(f"Deleted data of user {job.user_id}: {job.deleted}")
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+        logger.error(f"Deleting data of user {job.user_id} failed in stage {job.stage}: {e}")
+    finally:
+        job.finished_at = datetime.utcnow()
@@ -40,8 +40,8 @@ async def test_chat_write():
     print(f"Attempting to write message for user {user_id}...")
     
     try:
-        if not chat_service.db:
-             print("ERROR: ChatService.db is None!")
+        if not chat_service.store:
+             print("ERROR: ChatService.store is None!")
              return
 
         await chat_service.add_message(user_id, chat_id, "user", "Debug message test")
@@ -65,7 +65,7 @@ export default function SettingsPage() {
                 })
 
                 if (res.ok) {
-                    alert("All data cleared.")
+                    alert("Your data is being deleted. This can take a moment for large accounts.")
                     // Optional: refresh data or redirect
                 } else {
                     alert("Failed to clear data.")
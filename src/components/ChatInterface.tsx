@@ -120,6 +120,16 @@ export function ChatInterface({ initialInput }: ChatInterfaceProps) {
             const decoder = new TextDecoder()
             let buffer = ""
 
+            // The answer streams in as 'delta' events; 'response' carries the final text.
+            // It is shown as a pending message until the saved copy arrives via history.
+            let answer = ""
+            let answerShown = false
+            const showAnswer = (content: string) => {
+                const replaceLast = answerShown
+                answerShown = true
+                setPendingMessages(prev => [...(replaceLast ? prev.slice(0, -1) : prev), { role: 'agent', content }])
+            }
+
             // Keep loading TRUE until stream ends to prevent input from re-enabling too early.
             // The status log will be cleared when we finish or when a new message arrives.
             while (true) {
@@ -136,7 +146,13 @@ export function ChatInterface({ initialInput }: ChatInterfaceProps) {
                         const data = JSON.parse(line)
                         if (data.type === 'log') {
                             setStatusLog(data.content)
-                        } 
+                        } else if (data.type === 'delta') {
+                            answer += data.content
+                            showAnswer(answer)
+                        } else if (data.type === 'response') {
+                            answer = data.content
+                            showAnswer(answer)
+                        }
                     } catch (e) {
                         console.error("Error parsing NDJSON:", e)
                     }
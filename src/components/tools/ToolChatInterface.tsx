@@ -93,6 +93,16 @@ export function ToolChatInterface({ initialPrompt }: ToolChatInterfaceProps) {
             const decoder = new TextDecoder()
             let buffer = ""
 
+            // The answer streams in as 'delta' events; 'response' carries the final text.
+            // It is shown as a pending message until the saved copy arrives via history.
+            let answer = ""
+            let answerShown = false
+            const showAnswer = (content: string) => {
+                const replaceLast = answerShown
+                answerShown = true
+                setPendingMessages(prev => [...(replaceLast ? prev.slice(0, -1) : prev), { role: 'agent', content }])
+            }
+
             while (true) {
                 const { done, value } = await reader.read()
                 if (done) break
@@ -107,7 +117,13 @@ export function ToolChatInterface({ initialPrompt }: ToolChatInterfaceProps) {
                         const data = JSON.parse(line)
                         if (data.type === 'log') {
                             setStatusLog(data.content)
-                        } 
+                        } else if (data.type === 'delta') {
+                            answer += data.content
+                            showAnswer(answer)
+                        } else if (data.type === 'response') {
+                            answer = data.content
+                            showAnswer(answer)
+                        }
                     } catch (e) {
                         console.error("Error parsing NDJSON:", e)
                     }
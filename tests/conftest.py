@@ -0,0 +1,140 @@
+import itertools
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from backend.main import app
+from backend.database import Base, create_engine_for, get_db, get_read_db, get_session_factory
+from backend.auth import token_cache, verify_token
+from backend.routers.analytics import analytics_cache
+from backend.services import user_deletion
+from backend.services.user_cache import user_cache
+from backend.services.llm_cache import llm_cache
+
+# Use in-memory SQLite for testing
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///"
+
+engine = create_engine_for(SQLALCHEMY_DATABASE_URL, "test")
+TestingSessionLocal = sessionmaker(
+    engine, class_=AsyncSession, expire_on_commit=False
+)
+
+async def override_get_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+async def override_verify_token():
+    return {"uid": "test_user_123", "email": "test@example.com"}
+
+app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
+app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
+app.dependency_overrides[verify_token] = override_verify_token
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    analytics_cache.clear()
+    token_cache.clear()
+    user_cache.clear()
+    user_deletion.clear()
+    llm_cache.clear()
+    yield
+
+@pytest.fixture(scope="function")
+async def init_db():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+
+@pytest.fixture(scope="function")
+async def db_session(init_db):
+    async with TestingSessionLocal() as session:
+        yield session
+
+@pytest.fixture(scope="function")
+async def client():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+class FakeFirestore:
+    """
+    In-memory stand-in for the parts of firestore.AsyncClient ChatService uses.
+    `commits` counts batch commits and `queries` counts message queries; set `fail_commits`
+    to make the next commits raise.
+    """
+
+    class Document:
+        def __init__(self, store, path):
+            self._store, self.path = store, path
+            self.id = path.rsplit("/", 1)[-1]
+
+        def collection(self, name):
+            return FakeFirestore.Collection(self._store, f"{self.path}/{name}")
+
+    class Collection:
+        def __init__(self, store, path):
+            self._store, self.path = store, path
+            self._descending = False
+            self._limit = None
+
+        def document(self, doc_id=None):
+            return FakeFirestore.Document(self._store, f"{self.path}/{doc_id or next(self._store._ids)}")
+
+        def order_by(self, field, direction=None):
+            self._field, self._descending = field, direction == "DESCENDING"
+            return self
+
+        def limit(self, n):
+            self._limit = n
+            return self
+
+        async def stream(self):
+            self._store.queries += 1
+            docs = [(path, data) for path, data in self._store.docs.items() if path.rsplit("/", 1)[0] == self.path]
+            docs.sort(key=lambda d: d[1][self._field], reverse=self._descending)
+            for path, data in docs[:self._limit]:
+                yield FakeFirestore.Snapshot(path, data)
+
+    class Snapshot:
+        def __init__(self, path, data):
+            self.id = path.rsplit("/", 1)[-1]
+            self._data = data
+
+        def to_dict(self):
+            return dict(self._data)
+
+    class Batch:
+        def __init__(self, store):
+            self._store, self._writes = store, []
+
+        def set(self, ref, data):
+            self._writes.append((ref.path, data))
+
+        async def commit(self):
+            if self._store.fail_commits:
+                self._store.fail_commits -= 1
+                raise RuntimeError("commit failed")
+            self._store.commits += 1
+            self._store.docs.update(self._writes)
+
+    def __init__(self):
+        self.docs = {}
+        self.commits = 0
+        self.queries = 0
+        self.fail_commits = 0
+        self._ids = (f"doc{i:06d}" for i in itertools.count())
+
+    def collection(self, name):
+        return FakeFirestore.Collection(self, name)
+
+    def batch(self):
+        return FakeFirestore.Batch(self)
+
+@pytest.fixture
+def fake_firestore():
+    return FakeFirestore()
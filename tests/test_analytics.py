@@ -1,60 +1,11 @@
 import pytest
-import asyncio
-from httpx import AsyncClient
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
 from sqlalchemy import text
 
-from backend.main import app
-from backend.database import Base, get_db
-from backend.auth import verify_token
 from backend.models import User, Expense
+from backend.routers.analytics import analytics_cache
+from backend.services import data_version, user_deletion
 from datetime import datetime, timedelta
 
-# Use in-memory SQLite for testing
-SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///"
-
-engine = create_async_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool
-)
-TestingSessionLocal = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
-)
-
-async def override_get_db():
-    async with TestingSessionLocal() as db:
-        yield db
-
-async def override_verify_token():
-    return {"uid": "test_user_123", "email": "test@example.com"}
-
-app.dependency_overrides[get_db] = override_get_db
-app.dependency_overrides[verify_token] = override_verify_token
-
-@pytest.fixture(scope="function")
-async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    yield
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
-
-@pytest.fixture(scope="function")
-async def db_session(init_db):
-    async with TestingSessionLocal() as session:
-        yield session
-
-from httpx import AsyncClient, ASGITransport
-
-@pytest.fixture(scope="function")
-async def client():
-    transport = ASGITransport(app=app)
-    async with AsyncClient(transport=transport, base_url="http://test") as c:
-        yield c
-
 @pytest.mark.asyncio
 async def test_analytics_allocation(client, db_session):
     # Seed data
@@ -112,3 +63,45 @@ async def test_analytics_cashflow(client, db_session):
     
     assert entry is not None
     assert entry["value"] >= 300.0
+
+@pytest.mark.asyncio
+async def test_analytics_cache_invalidated_by_writes(client, db_session):
+    headers = {"Authorization": "Bearer mock_token"}
+    response = await client.post("/expenses/", json={"amount": 40.0, "category": "Food"}, headers=headers)
+    assert response.status_code == 200
+
+    first = await client.get("/analytics/allocation", headers=headers)
+    second = await client.get("/analytics/allocation", headers=headers)
+    assert first.json() == second.json() == [{"name": "Food", "value": 40.0}]
+
+    stats = analytics_cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+    # A committed write bumps the user's data version, so the cached entry is not served again
+    await client.post("/expenses/", json={"amount": 2.0, "category": "Food"}, headers=headers)
+    third = await client.get("/analytics/allocation", headers=headers)
+    assert third.json() == [{"name": "Food", "value": 42.0}]
+
+    await client.delete("/users/me/data", headers=headers)
+    # Deletion runs in the background; wait for it before reading again
+    await user_deletion.get_job("test_user_123").task
+    fourth = await client.get("/analytics/allocation", headers=headers)
+    assert fourth.json() == []
+
+def test_data_versions_are_dropped_after_retention(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(data_version.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(data_version, "DATA_VERSION_RETENTION", 60)
+    monkeypatch.setattr(data_version, "_versions", type(data_version._versions)())
+
+    data_version.bump("old_user")
+    old_version = data_version.current("old_user")
+    now[0] += 61
+    data_version.bump("new_user")
+
+    assert data_version.tracked_users() == 1
+    assert data_version.current("old_user") == 0
+    # A later write never reuses a version an evicted user already had
+    data_version.bump("old_user")
+    assert data_version.current("old_user") > old_version
@@ -0,0 +1,66 @@
+import time
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import event
+
+from backend import auth
+
+def bearer(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+@pytest.mark.asyncio
+async def test_verified_tokens_are_cached_until_exp(monkeypatch):
+    calls = []
+
+    def fake_verify(token):
+        calls.append(token)
+        if token == "bad":
+            raise ValueError("invalid signature")
+        exp = time.time() + (3600 if token == "good" else -1)
+        return {"uid": f"uid-{token}", "exp": exp}
+
+    monkeypatch.setattr(auth.auth, "verify_id_token", fake_verify)
+
+    assert (await auth.verify_token(bearer("good")))["uid"] == "uid-good"
+    assert (await auth.verify_token(bearer("good")))["uid"] == "uid-good"
+    assert calls == ["good"]
+    assert auth.token_cache.hits == 1
+
+    # An already expired entry is never served
+    await auth.verify_token(bearer("expired"))
+    await auth.verify_token(bearer("expired"))
+    assert calls.count("expired") == 2
+
+    # Failures are not cached
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc:
+            await auth.verify_token(bearer("bad"))
+        assert exc.value.status_code == 401
+    assert calls.count("bad") == 2
+
+@pytest.mark.asyncio
+async def test_current_user_is_cached_and_invalidated_on_update(client, db_session):
+    headers = {"Authorization": "Bearer mock_token"}
+    statements = []
+    engine = db_session.bind
+
+    def count_user_queries(conn, cursor, statement, parameters, context, executemany):
+        if "users" in statement:
+            statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_user_queries)
+    try:
+        # First login creates the user once via the upsert; later requests hit the cache
+        assert (await client.get("/users/me", headers=headers)).json()["id"] == "test_user_123"
+        first_login = len(statements)
+        assert any("ON CONFLICT" in s.upper() for s in statements)
+        await client.get("/users/me", headers=headers)
+        assert len(statements) == first_login
+
+        response = await client.put("/users/me", json={"full_name": "Ada"}, headers=headers)
+        assert response.json()["full_name"] == "Ada"
+        # The update invalidated the entry, so the next read sees the new name
+        assert (await client.get("/users/me", headers=headers)).json()["full_name"] == "Ada"
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count_user_queries)
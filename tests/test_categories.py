@@ -0,0 +1,52 @@
+import io
+import pytest
+from sqlalchemy import func, select
+
+from backend.agents.finance import add_expense_tool, get_expenses_tool
+from backend.models import Category, CategoryAlias
+from backend.services import categories, expense_import
+
+HEADERS = {"Authorization": "Bearer mock_token"}
+
+def test_normalize():
+    assert categories.normalize("  Coffee   Shops ") == "coffee shop"
+    assert categories.normalize("Groceries") == "grocery"
+    assert categories.normalize("Bus") == "bus"
+    assert categories.normalize("Taxes") == "tax"
+    assert categories.normalize("") == ""
+
+@pytest.mark.asyncio
+async def test_category_spellings_share_one_id(client, db_session):
+    for name in ("Drinks", "drink", " DRINKS "):
+        response = await client.post("/expenses/", json={"amount": 2.0, "category": name}, headers=HEADERS)
+        assert response.status_code == 200
+        # The API keeps returning names: the one the category was first created with
+        assert response.json()["category"] == "Drinks"
+
+    csv_data = "amount,category\n1,drink\n1,Rent\n"
+    await expense_import.import_expenses(db_session, "test_user_123", io.BytesIO(csv_data.encode("utf-8")), "csv")
+
+    names = (await db_session.execute(select(Category.name).order_by(Category.name))).scalars().all()
+    assert names == ["Drinks", "Rent"]
+    assert (await db_session.execute(select(func.count()).select_from(CategoryAlias))).scalar() == 2
+
+    response = await client.get("/analytics/allocation", headers=HEADERS)
+    assert sorted((row["name"], row["value"]) for row in response.json()) == [("Drinks", 7.0), ("Rent", 1.0)]
+
+    # The category filter matches substrings of the name and the normalised alias
+    assert len(await get_expenses_tool(db_session, "test_user_123", category="drinks")) == 4
+    assert len(await get_expenses_tool(db_session, "test_user_123", category="ren")) == 1
+    # Search covers the category name too
+    response = await client.get("/expenses/search?q=drink", headers=HEADERS)
+    assert len(response.json()) == 4
+
+@pytest.mark.asyncio
+async def test_blank_categories_are_listed_as_uncategorised(client, db_session):
+    response = await client.post("/expenses/", json={"amount": 1.0, "category": "  "}, headers=HEADERS)
+    assert response.status_code == 200
+    await expense_import.import_expenses(db_session, "test_user_123", io.BytesIO(b"amount,category\n3,\n"), "csv")
+    await add_expense_tool(db_session, "test_user_123", 4.0, "")
+
+    response = await client.get("/expenses/", headers=HEADERS)
+    assert response.status_code == 200
+    assert [row["category"] for row in response.json()] == ["", "", ""]
@@ -0,0 +1,57 @@
+import pytest
+
+from backend.services.chat_history_cache import ChatHistoryCache, message_size
+from backend.services.chat_service import ChatService
+from backend.services.chat_store import FirestoreChatStore
+
+@pytest.mark.asyncio
+async def test_steady_state_history_needs_no_queries(fake_firestore):
+    service = ChatService(store=FirestoreChatStore(fake_firestore), history=ChatHistoryCache(depth=4, max_bytes=1_000_000, ttl=60))
+    for i in range(3):
+        await service.add_message("u1", "c1", "user", f"old {i}")
+
+    # First read seeds the buffer from Firestore
+    assert [m["content"] for m in await service.get_recent_messages("u1", "c1", limit=2)] == ["old 1", "old 2"]
+    assert fake_firestore.queries == 1
+
+    for i in range(3):
+        await service.add_message("u1", "c1", "user", f"new {i}")
+        history = await service.get_recent_messages("u1", "c1", limit=3)
+        assert history[-1]["content"] == f"new {i}"
+    assert fake_firestore.queries == 1
+    assert service.history.stats()["hits"] == 3
+
+    # More than the ring buffer holds falls back to Firestore
+    history = await service.get_recent_messages("u1", "c1", limit=10)
+    assert len(history) == 6
+    assert fake_firestore.queries == 2
+
+@pytest.mark.asyncio
+async def test_short_chats_are_served_whole(fake_firestore):
+    service = ChatService(store=FirestoreChatStore(fake_firestore), history=ChatHistoryCache(depth=10, max_bytes=1_000_000, ttl=60))
+    assert await service.get_recent_messages("u1", "new", limit=10) == []
+    await service.add_message("u1", "new", "user", "hello")
+    assert [m["content"] for m in await service.get_recent_messages("u1", "new", limit=10)] == ["hello"]
+    assert fake_firestore.queries == 1
+
+def test_lru_eviction_keeps_bytes_under_cap():
+    message = {"role": "user", "content": "x" * 100, "component": None}
+    cache = ChatHistoryCache(depth=5, max_bytes=3 * message_size(message), ttl=60)
+    for chat in ("a", "b", "c"):
+        cache.begin_load("u1", chat)
+        cache.load("u1", chat, [message], complete=True)
+    assert cache.get("u1", "a", 1) is not None
+
+    # "b" is the least recently used chat now
+    cache.append("u1", "c", message)
+    assert cache.bytes <= cache.max_bytes
+    assert cache.get("u1", "b", 1) is None
+    assert cache.get("u1", "a", 1) is not None
+
+def test_messages_appended_during_load_are_not_lost():
+    cache = ChatHistoryCache(depth=5, max_bytes=1_000_000, ttl=60)
+    cache.begin_load("u1", "c1")
+    cache.append("u1", "c1", {"role": "user", "content": "racing", "component": None})
+    cache.load("u1", "c1", [], complete=True)
+    # The loaded result may predate the append, so it is not cached
+    assert cache.get("u1", "c1", 1) is None
@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+
+from backend.services.chat_service import ChatService
+from backend.services.chat_store import ChatStore, FirestoreChatStore
+
+@pytest.mark.asyncio
+async def test_messages_are_flushed_in_batches_and_readable_before(fake_firestore):
+    service = ChatService(store=FirestoreChatStore(fake_firestore), flush_size=3, flush_interval=60)
+    service.start()
+    try:
+        await service.add_message("u1", "c1", "user", "hello")
+        await service.add_message("u1", "c1", "assistant", "hi")
+        # Nothing written yet, but this worker already sees both messages in order
+        assert fake_firestore.commits == 0
+        assert service.stats()["queued"] == 2
+        history = await service.get_recent_messages("u1", "c1")
+        assert [m["content"] for m in history] == ["hello", "hi"]
+
+        # Reaching flush_size wakes the flusher
+        await service.add_message("u1", "c2", "user", "other chat")
+        await asyncio.sleep(0.01)
+        assert fake_firestore.commits == 1
+        assert len(fake_firestore.docs) == 3
+        assert service.stats()["queued"] == 0
+
+        await service.add_message("u1", "c1", "user", "next")
+        history = await service.get_recent_messages("u1", "c1", limit=2)
+        assert [m["content"] for m in history] == ["hi", "next"]
+    finally:
+        await service.stop()
+
+    # Shutdown writes out what is left
+    assert fake_firestore.commits == 2
+    assert service.stats()["flushed"] == 4
+
+@pytest.mark.asyncio
+async def test_flush_interval_and_failed_batches_are_retried(fake_firestore):
+    service = ChatService(store=FirestoreChatStore(fake_firestore), flush_size=100, flush_interval=0.01)
+    fake_firestore.fail_commits = 1
+    service.start()
+    try:
+        await service.add_message("u1", "c1", "user", "hello")
+        for _ in range(50):
+            await asyncio.sleep(0.01)
+            if fake_firestore.commits:
+                break
+    finally:
+        await service.stop()
+
+    stats = service.stats()
+    assert stats["failed_flushes"] == 1
+    assert stats["flushed"] == 1
+    assert [d["content"] for d in fake_firestore.docs.values()] == ["hello"]
+
+@pytest.mark.asyncio
+async def test_queue_drops_oldest_when_full(fake_firestore):
+    service = ChatService(store=FirestoreChatStore(fake_firestore), flush_size=100, flush_interval=60, max_queue=2)
+    service.start()
+    for content in ("a", "b", "c"):
+        await service.add_message("u1", "c1", "user", content)
+    assert service.stats()["dropped"] == 1
+    await service.stop()
+    assert sorted(d["content"] for d in fake_firestore.docs.values()) == ["b", "c"]
+
+@pytest.mark.asyncio
+async def test_without_flusher_messages_are_written_through(fake_firestore):
+    service = ChatService(store=FirestoreChatStore(fake_firestore))
+    await service.add_message("u1", "c1", "user", "hello")
+    assert fake_firestore.commits == 1
+
+class SlowStore(ChatStore):
+    name = "slow"
+    max_batch_size = 100
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.written = []
+
+    async def write(self, messages):
+        await self.release.wait()
+        self.written.extend(messages)
+
+    async def recent(self, user_id, chat_id, limit):
+        return []
+
+    async def delete_user(self, user_id, on_batch):
+        self.written = [m for m in self.written if m.user_id != user_id]
+
+@pytest.mark.asyncio
+async def test_discard_waits_for_the_batch_being_written():
+    store = SlowStore()
+    service = ChatService(store=store, flush_size=100, flush_interval=0.01)
+    service.start()
+    try:
+        await service.add_message("u1", "c1", "user", "being written")
+        await asyncio.sleep(0.05)
+        assert service.stats()["in_flight"] == 1
+        await service.add_message("u1", "c1", "user", "still queued")
+
+        discard = asyncio.create_task(service.discard("u1"))
+        await asyncio.sleep(0.01)
+        assert not discard.done()
+        store.release.set()
+        assert await discard == 1
+
+        # Deleting now removes everything that was written; nothing lands afterwards
+        await store.delete_user("u1", lambda count: None)
+    finally:
+        await service.stop()
+    assert store.written == []
@@ -0,0 +1,70 @@
+"""
+Runs against the Firestore emulator, e.g.:
+    gcloud emulators firestore start --host-port=localhost:8080
+    FIRESTORE_EMULATOR_HOST=localhost:8080 pytest tests/test_chat_service_emulator.py
+"""
+import asyncio
+import os
+import time
+import pytest
+from uuid import uuid4
+
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import firestore
+
+from backend.services.chat_service import ChatService
+from backend.services.chat_store import FirestoreChatStore
+
+pytestmark = pytest.mark.skipif(
+    not os.getenv("FIRESTORE_EMULATOR_HOST"),
+    reason="FIRESTORE_EMULATOR_HOST is not set",
+)
+
+@pytest.fixture
+def service():
+    db = firestore.AsyncClient(project="demo-finance-tracker", credentials=AnonymousCredentials())
+    return ChatService(store=FirestoreChatStore(db))
+
+@pytest.mark.asyncio
+async def test_messages_round_trip(service):
+    user_id, chat_id = f"user_{uuid4().hex}", "chat"
+    for i in range(3):
+        await service.add_message(user_id, chat_id, "user", f"message {i}")
+
+    messages = await service.get_recent_messages(user_id, chat_id, limit=2)
+    assert [m["content"] for m in messages] == ["message 1", "message 2"]
+
+@pytest.mark.asyncio
+async def test_requests_are_served_while_messages_persist(client, db_session, service):
+    user_id = f"user_{uuid4().hex}"
+
+    async def persist():
+        for i in range(50):
+            await service.add_message(user_id, "chat", "assistant", f"reply {i}")
+
+    # Longest gap between ticks of a 5ms heartbeat; a blocking Firestore call would stall it
+    # for a whole round-trip
+    max_gap = 0.0
+
+    async def heartbeat():
+        nonlocal max_gap
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.005)
+            now = time.perf_counter()
+            max_gap = max(max_gap, now - last)
+            last = now
+
+    ticker = asyncio.create_task(heartbeat())
+    writes = asyncio.create_task(persist())
+    served_during_writes = 0
+    while not writes.done():
+        response = await client.get("/users/me", headers={"Authorization": "Bearer mock_token"})
+        assert response.status_code == 200
+        served_during_writes += not writes.done()
+    ticker.cancel()
+    await writes
+
+    assert served_during_writes > 0
+    assert max_gap < 0.1
+    assert len(await service.get_recent_messages(user_id, "chat", limit=50)) == 50
@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from backend.models import ChatMessage, User
+from backend.services import user_deletion
+from backend.services.chat_history_cache import ChatHistoryCache
+from backend.services.chat_service import ChatService
+from backend.services.chat_store import SQLChatStore
+
+@pytest.fixture
+async def sql_chat_service(db_session):
+    db_session.add_all([User(id="test_user_123", email="test@example.com"), User(id="other_user", email="other@example.com")])
+    await db_session.commit()
+    session_factory = sessionmaker(db_session.bind, class_=AsyncSession, expire_on_commit=False)
+    # A depth-0 history cache sends every read to the store
+    return ChatService(store=SQLChatStore(session_factory), history=ChatHistoryCache(depth=0, max_bytes=0, ttl=0))
+
+@pytest.mark.asyncio
+async def test_sql_store_round_trip(sql_chat_service, db_session):
+    service = sql_chat_service
+    await service.add_message("test_user_123", "c1", "user", "How much on food?")
+    await service.add_message("test_user_123", "c1", "assistant", "You spent $40.", component={"type": "chart"})
+    await service.add_message("test_user_123", "c2", "user", "Other chat")
+    await service.add_message("other_user", "c1", "user", "Other user")
+
+    history = await service.get_recent_messages("test_user_123", "c1", limit=10)
+    assert history == [
+        {"role": "user", "content": "How much on food?", "component": None},
+        {"role": "assistant", "content": "You spent $40.", "component": {"type": "chart"}},
+    ]
+    assert [m["content"] for m in await service.get_recent_messages("test_user_123", "c1", limit=1)] == ["You spent $40."]
+    assert (await db_session.execute(select(func.count()).select_from(ChatMessage))).scalar() == 4
+
+@pytest.mark.asyncio
+async def test_user_deletion_removes_sql_chats(client, sql_chat_service, db_session, monkeypatch):
+    service = sql_chat_service
+    monkeypatch.setattr(user_deletion, "chat_service", service)
+    for i in range(3):
+        await service.add_message("test_user_123", f"c{i}", "user", "hello")
+    await service.add_message("other_user", "c1", "user", "keep me")
+
+    await client.delete("/users/me/data", headers={"Authorization": "Bearer mock_token"})
+    job = user_deletion.get_job("test_user_123")
+    await asyncio.wait_for(job.task, timeout=5)
+
+    assert job.status == "completed"
+    assert job.deleted["chats"] == 3
+    assert (await db_session.execute(select(ChatMessage.content))).scalars().all() == ["keep me"]
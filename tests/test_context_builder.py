@@ -0,0 +1,46 @@
+import json
+
+from backend.services.context_builder import ContextBuilder, estimate_tokens
+
+REPORT = "## Spending analysis\n" + "Your food spending rose 12% compared to last month. " * 200
+
+def history_of(*contents):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": c, "component": None} for i, c in enumerate(contents)]
+
+def test_estimate_tokens_is_close_to_bpe_counts():
+    # Reference counts from cl100k_base
+    assert 8 <= estimate_tokens("How much did I spend on coffee last month?") <= 12
+    assert estimate_tokens("") == 0
+    assert estimate_tokens(json.dumps({"amount": 12.5})) >= 6
+
+def test_long_reports_are_truncated_and_history_fits_budget():
+    builder = ContextBuilder({"finance": 400}, summary_tokens=80)
+    history = history_of("Analyze my spending", REPORT, "And in EUR?", "It is 120 EUR.")
+
+    context = builder.build("u1", "c1", history, "finance")
+
+    assert estimate_tokens(json.dumps(context)) <= 450
+    assert [m["content"] for m in context[-2:]] == ["And in EUR?", "It is 120 EUR."]
+    assert any("…[truncated]" in m["content"] or m["role"] == "system" for m in context)
+    stats = builder.stats()
+    assert stats["requests"] == 1
+    assert stats["tokens_saved"] > 2000
+    assert stats["agents"]["finance"]["tokens_saved"] == stats["tokens_saved"]
+
+def test_summary_rolls_over_messages_that_left_the_window():
+    builder = ContextBuilder({"classifier": 120}, summary_tokens=30)
+    builder.build("u1", "c1", history_of("What did I spend on rent in March?", "You spent $1200 on rent."), "classifier")
+
+    # The next request's window no longer includes the first exchange
+    later = history_of(*["Convert 10 USD to EUR please", "10 USD is 9.20 EUR."] * 3)
+    context = builder.build("u1", "c1", later, "classifier")
+
+    assert context[0]["role"] == "system"
+    assert "rent" in context[0]["content"]
+    assert context[-1]["content"] == "10 USD is 9.20 EUR."
+
+def test_short_history_is_sent_unchanged():
+    builder = ContextBuilder({"currency": 600})
+    history = history_of("Convert 100 USD to EUR", "100 USD is 92 EUR.")
+    assert builder.build("u1", "c1", history, "currency") == [{"role": m["role"], "content": m["content"]} for m in history]
+    assert builder.build("u1", "c1", [], "currency") == []
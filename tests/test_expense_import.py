@@ -0,0 +1,70 @@
+import io
+import pytest
+from sqlalchemy import select, func
+
+from backend.models import Expense
+from backend.services import expense_import, rollup
+
+HEADERS = {"Authorization": "Bearer mock_token"}
+
+OFX_SGML = """OFXHEADER:100
+DATA:OFXSGML
+VERSION:102
+
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250114120000[-5:EST]<TRNAMT>-42.10<FITID>1<NAME>GROCERY STORE<MEMO>Weekly shop
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20250115<TRNAMT>2500.00<FITID>2<NAME>SALARY
+</STMTTRN>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250116<TRNAMT>-9.99<FITID>3<NAME>STREAMING
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+@pytest.mark.asyncio
+async def test_import_csv_reports_row_errors(client, db_session):
+    csv_data = "Amount,Category,Description,Date\n12.50,Food,Lunch,2025-01-03\nabc,Food,Broken,2025-01-04\n7,Transport,,2025-02-01T08:30:00\n3,,Missing category,2025-02-02\n"
+    response = await client.post(
+        "/expenses/import",
+        files={"file": ("bank.csv", csv_data.encode("utf-8"), "text/csv")},
+        headers=HEADERS,
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["imported"] == 3
+    assert result["failed"] == 1
+    assert result["errors"][0]["row"] == 3
+    assert "amount" in result["errors"][0]["error"]
+
+    count = (await db_session.execute(select(func.count()).select_from(Expense))).scalar()
+    assert count == 3
+    assert await rollup.check(db_session) == []
+
+@pytest.mark.asyncio
+async def test_import_ofx_in_small_batches(client, db_session):
+    await client.get("/users/me", headers=HEADERS)
+    result = await expense_import.import_expenses(db_session, "test_user_123", io.BytesIO(OFX_SGML.encode("utf-8")), "ofx", default_category="Bank", batch_size=1)
+
+    assert (result.imported, result.skipped, result.failed) == (2, 1, 0)
+    rows = (await db_session.execute(select(Expense).order_by(Expense.date))).scalars().all()
+    assert [(e.amount, e.category, e.description) for e in rows] == [
+        (42.10, "Bank", "GROCERY STORE - Weekly shop"),
+        (9.99, "Bank", "STREAMING"),
+    ]
+    assert rows[0].date.day == 14
+
+@pytest.mark.asyncio
+async def test_import_rejects_unreadable_files(client, db_session):
+    latin1 = "amount,category,description\n12,Food,Caf\u00e9\n".encode("latin-1")
+    oversized = b"amount,category,description\n1,Food," + b"x" * 200_000 + b"\n"
+    for content in (latin1, oversized):
+        response = await client.post("/expenses/import", files={"file": ("bank.csv", content, "text/csv")}, headers=HEADERS)
+        assert response.status_code == 400
+
+    count = (await db_session.execute(select(func.count()).select_from(Expense))).scalar()
+    assert count == 0
+
+def test_detect_format():
+    assert expense_import.detect_format("export.QFX") == "ofx"
+    assert expense_import.detect_format("data.txt", "csv") == "csv"
+    with pytest.raises(ValueError):
+        expense_import.detect_format("data.xlsx")
@@ -0,0 +1,95 @@
+import io
+import json
+import pytest
+
+from backend import crud
+from backend.models import User, Expense
+from datetime import datetime, timedelta
+
+HEADERS = {"Authorization": "Bearer mock_token"}
+
+async def seed_expenses(db_session, count):
+    db_session.add(User(id="test_user_123", email="test@example.com", role="pro"))
+    base = datetime(2025, 1, 1)
+    # Pairs of rows share a timestamp so the id tie-breaker is exercised
+    db_session.add_all([
+        Expense(user_id="test_user_123", amount=float(i), category="Food", description=f"Item {i}", date=base + timedelta(days=i // 2))
+        for i in range(count)
+    ])
+    await db_session.commit()
+
+@pytest.mark.asyncio
+async def test_expenses_cursor_pagination(client, db_session):
+    await seed_expenses(db_session, 25)
+
+    seen = []
+    response = await client.get("/expenses/?limit=10", headers=HEADERS)
+    while True:
+        assert response.status_code == 200
+        seen.extend(item["id"] for item in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        response = await client.get(f"/expenses/?limit=10&cursor={cursor}", headers=HEADERS)
+
+    offset_ids = []
+    for skip in range(0, 30, 10):
+        response = await client.get(f"/expenses/?skip={skip}&limit=10", headers=HEADERS)
+        offset_ids.extend(item["id"] for item in response.json())
+
+    assert len(seen) == 25
+    assert len(set(seen)) == 25
+    assert seen == offset_ids
+
+@pytest.mark.asyncio
+async def test_expenses_invalid_cursor(client, db_session):
+    await seed_expenses(db_session, 1)
+    response = await client.get("/expenses/?cursor=not-a-cursor", headers=HEADERS)
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_expenses_limit_bounds(client, db_session):
+    await seed_expenses(db_session, 3)
+    response = await client.get("/expenses/?limit=2", headers=HEADERS)
+    cursor = response.headers["X-Next-Cursor"]
+    for limit in (0, -1, 1001):
+        response = await client.get(f"/expenses/?limit={limit}&cursor={cursor}", headers=HEADERS)
+        assert response.status_code == 422
+    assert await crud.get_expenses_page(db_session, "test_user_123", cursor=cursor, limit=0) == ([], None)
+
+@pytest.mark.asyncio
+async def test_export_csv_and_ndjson_with_filters(client, db_session):
+    await seed_expenses(db_session, 10)
+    db_session.add(Expense(user_id="test_user_123", amount=4.5, category="Drinks", description="Coffee, large", date=datetime(2025, 1, 2)))
+    await db_session.commit()
+
+    response = await client.get("/expenses/export?format=csv", headers=HEADERS)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.strip().splitlines()
+    assert lines[0] == "id,date,amount,category,description"
+    assert len(lines) == 12
+    assert '"Coffee, large"' in response.text
+
+    response = await client.get("/expenses/export?format=ndjson&search=coffee", headers=HEADERS)
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["description"] for row in rows] == ["Coffee, large"]
+
+    response = await client.get("/expenses/export?format=ndjson&date=2025-01-03&end_date=2025-01-04", headers=HEADERS)
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 4
+    assert all(row["date"].startswith(("2025-01-03", "2025-01-04")) for row in rows)
+
+    response = await client.get("/expenses/export?format=xlsx", headers=HEADERS)
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_export_parquet(client, db_session):
+    pq = pytest.importorskip("pyarrow.parquet")
+    await seed_expenses(db_session, 5)
+
+    response = await client.get("/expenses/export?format=parquet", headers=HEADERS)
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.num_rows == 5
+    assert table.column("amount").to_pylist() == [0.0, 1.0, 2.0, 3.0, 4.0]
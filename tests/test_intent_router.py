@@ -0,0 +1,54 @@
+import pytest
+
+from backend.agents.intent_router import IntentRouter, load_examples, rule_intent
+
+@pytest.mark.parametrize("message, intent", [
+    ("Convert 100 USD to EUR", "currency"),
+    ("What is 50 GBP in yen?", "currency"),
+    ("Convert my food costs to EUR", "composite"),
+    ("How much is my rent in USD?", "composite"),
+    ("Add an expense of 12 dollars for lunch", "finance"),
+    ("How much did I spend on coffee this month?", "finance"),
+    ("Calculate my mortgage for 300k at 4%", "new_tool"),
+    # Tool keywords inside expense messages stay finance
+    ("Add expense 1200 for mortgage", "finance"),
+    ("How much did I spend on my mortgage last month?", "finance"),
+    ("I paid 1500 mortgage today", "finance"),
+    ("Log 300 income tax payment", "finance"),
+    ("Show me all my retirement expenses", "finance"),
+    # Currency words that are not a conversion target
+    ("I spent 20 dollars on pizza, want to try budgeting", "finance"),
+    ("how much did I spend in EUR last month", "finance"),
+])
+def test_rules(message, intent):
+    assert rule_intent(message).intent == intent
+
+def test_tool_keyword_with_personal_spending_defers_to_llm():
+    router = IntentRouter.train(load_examples(), threshold=0.8, log_path=None)
+    assert router.route("What are my mortgage costs?") is None
+
+def test_route_defers_to_llm_below_threshold_and_for_references():
+    router = IntentRouter.train(load_examples(), threshold=0.8, log_path=None)
+    assert router.route("Convert 100 USD to EUR").intent == "currency"
+    # Refers to the previous answer, which only the LLM classifier sees
+    assert router.route("What is that in euro?") is None
+    assert IntentRouter(None, threshold=0.8, log_path=None).route("Tell me something about budgeting") is None
+
+    stats = router.stats()
+    assert stats["rule"] == 1
+    assert stats["llm"] == 1
+
+def test_model_learns_from_logged_intents(tmp_path):
+    log = tmp_path / "intents.jsonl"
+    router = IntentRouter(None, log_path=str(log))
+    for _ in range(3):
+        router.log_intent("Show the burn rate of my startup runway", "new_tool")
+        router.log_intent("What did the household spend overall", "finance")
+    router.log_intent("ignored", "not_an_intent")
+
+    examples = load_examples([str(log)])
+    assert len(examples) == 6
+    trained = IntentRouter.train(examples, threshold=0.5, log_path=None)
+    routed = trained.route("burn rate of my startup runway")
+    assert routed.intent == "new_tool"
+    assert routed.source == "model"
@@ -0,0 +1,110 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend.services.llm_cache import LLMCache
+
+class FakeGateway:
+    model = "test-model"
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = []
+
+    async def complete(self, stage, messages, **kwargs):
+        self.calls.append((stage, kwargs))
+        await asyncio.sleep(self.latency)
+        content = f"answer {len(self.calls)}"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+def cache(gateway, **kwargs):
+    kwargs.setdefault("ttls", {"safety": 60, "classify": 60, "finance": 60})
+    kwargs.setdefault("bypass", ["finance"])
+    kwargs.setdefault("path", None)
+    return LLMCache(gateway=gateway, **kwargs)
+
+def user(content):
+    return [{"role": "system", "content": "Return SAFE or UNSAFE."}, {"role": "user", "content": content}]
+
+@pytest.mark.asyncio
+async def test_normalized_repeats_are_served_from_memory():
+    gateway = FakeGateway()
+    llm = cache(gateway)
+
+    first = await llm.complete("safety", user("How much did I spend this month?"))
+    again = await llm.complete("safety", user("  how much did i spend   this month? "))
+    other_params = await llm.complete("safety", user("How much did I spend this month?"), response_format={"type": "json_object"})
+    other_stage = await llm.complete("classify", user("How much did I spend this month?"))
+
+    assert first == again == "answer 1"
+    assert other_params == "answer 2" and other_stage == "answer 3"
+    stats = llm.stats()
+    assert stats["stages"]["safety"] == {"hits": 1, "disk_hits": 0, "misses": 2, "bypassed": 0, "hit_rate": pytest.approx(1 / 3)}
+    assert stats["hit_rate"] == pytest.approx(1 / 4)
+
+@pytest.mark.asyncio
+async def test_user_specific_and_unconfigured_stages_are_bypassed():
+    gateway = FakeGateway()
+    llm = cache(gateway)
+
+    for _ in range(2):
+        await llm.complete("finance", user("Show my expenses"))
+        await llm.complete("interpreter", user("Here is the financial data"))
+
+    assert len(gateway.calls) == 4
+    assert llm.stats()["stages"]["finance"]["bypassed"] == 2
+
+@pytest.mark.asyncio
+async def test_entries_expire_after_the_stage_ttl(monkeypatch):
+    gateway = FakeGateway()
+    llm = cache(gateway)
+    now = [1000.0]
+    monkeypatch.setattr("backend.services.llm_cache.time.time", lambda: now[0])
+
+    await llm.complete("safety", user("Convert 5 USD to EUR"))
+    now[0] += 59
+    await llm.complete("safety", user("Convert 5 USD to EUR"))
+    now[0] += 2
+    await llm.complete("safety", user("Convert 5 USD to EUR"))
+
+    assert len(gateway.calls) == 2
+
+@pytest.mark.asyncio
+async def test_disk_tier_outlives_the_memory_tier(tmp_path):
+    path = str(tmp_path / "llm_cache.db")
+    gateway = FakeGateway()
+    await cache(gateway, path=path).complete("safety", user("Estimate my income tax"))
+
+    restarted = cache(gateway, path=path)
+    assert await restarted.complete("safety", user("Estimate my income tax")) == "answer 1"
+    assert len(gateway.calls) == 1
+    assert restarted.stats()["stages"]["safety"]["disk_hits"] == 1
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_completion():
+    gateway = FakeGateway(latency=0.02)
+    llm = cache(gateway)
+
+    answers = await asyncio.gather(*(llm.complete("safety", user("Forecast my savings")) for _ in range(5)))
+
+    assert answers == ["answer 1"] * 5
+    assert len(gateway.calls) == 1
+
+@pytest.mark.asyncio
+async def test_waiters_recover_when_the_shared_completion_is_cancelled():
+    gateway = FakeGateway(latency=0.02)
+    llm = cache(gateway)
+
+    owner = asyncio.create_task(llm.complete("safety", user("Forecast my savings")))
+    await asyncio.sleep(0)
+    waiters = [asyncio.create_task(llm.complete("safety", user("Forecast my savings"))) for _ in range(2)]
+    await asyncio.sleep(0)
+    owner.cancel()
+
+    answers = await asyncio.gather(*waiters, return_exceptions=True)
+
+    # One waiter makes the completion again and the other shares it
+    assert answers == ["answer 2", "answer 2"]
+    assert len(gateway.calls) == 2
+    assert llm._pending == {}
@@ -0,0 +1,172 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from backend.agents.interpreter import InterpreterAgent
+from backend.services import llm_gateway as gateway_module
+from backend.services.llm_gateway import LLMGateway
+
+def completion(content="ok"):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=10, completion_tokens=2),
+    )
+
+def chunk(content=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content is not None else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+class FakeStream:
+    def __init__(self, chunks, fail_after=None):
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.closed = False
+
+    async def __aiter__(self):
+        for i, c in enumerate(self.chunks):
+            if i == self.fail_after:
+                raise server_error()
+            yield c
+
+    async def close(self):
+        self.closed = True
+
+class FakeCompletions:
+    def __init__(self, outcomes=(), latency=0.0):
+        self.outcomes = list(outcomes)
+        self.latency = latency
+        self.calls = []
+        self.active = self.max_active = 0
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.latency)
+            outcome = self.outcomes.pop(0) if self.outcomes else completion()
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        finally:
+            self.active -= 1
+
+def gateway(completions, **kwargs):
+    kwargs.setdefault("retry_base", 0.001)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return LLMGateway(client=client, model="test-model", **kwargs)
+
+def server_error():
+    request = httpx.Request("POST", "https://llm.test/chat/completions")
+    return openai.InternalServerError("overloaded", response=httpx.Response(503, request=request), body=None)
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried_and_reported_to_hooks():
+    completions = FakeCompletions([server_error(), openai.APITimeoutError(request=httpx.Request("POST", "https://llm.test")), completion("SAFE")])
+    llm = gateway(completions, max_retries=2)
+    records = []
+    llm.add_hook(records.append)
+
+    response = await llm.complete("safety", [{"role": "user", "content": "hi"}])
+
+    assert response.choices[0].message.content == "SAFE"
+    assert completions.calls[0]["model"] == "test-model"
+    assert len(records) == 1 and records[0].ok and records[0].attempts == 3
+    stats = llm.stats()["stages"]["safety"]
+    assert stats["calls"] == 1 and stats["retries"] == 2 and stats["errors"] == 0
+    assert stats["prompt_tokens"] == 10
+
+@pytest.mark.asyncio
+async def test_other_errors_are_not_retried():
+    request = httpx.Request("POST", "https://llm.test")
+    completions = FakeCompletions([openai.BadRequestError("bad", response=httpx.Response(400, request=request), body=None)])
+    llm = gateway(completions, max_retries=2)
+
+    with pytest.raises(openai.BadRequestError):
+        await llm.complete("finance", [])
+    assert len(completions.calls) == 1
+    assert llm.stats()["stages"]["finance"]["errors"] == 1
+
+@pytest.mark.asyncio
+async def test_stage_timeout_bounds_each_attempt():
+    llm = gateway(FakeCompletions(latency=1.0), timeouts={"classify": 0.02}, max_retries=1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await llm.complete("classify", [])
+    stats = llm.stats()
+    assert stats["stages"]["classify"]["retries"] == 1
+    assert stats["stages"]["classify"]["max_ms"] < 500
+    assert stats["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_concurrency_is_capped():
+    completions = FakeCompletions(latency=0.01)
+    llm = gateway(completions, max_concurrency=2)
+
+    await asyncio.gather(*(llm.complete("finance", []) for _ in range(10)))
+    assert completions.max_active == 2
+    assert llm.stats()["stages"]["finance"]["calls"] == 10
+    assert llm.stats()["waiting"] == 0
+
+def answer_stream(fail_after=None):
+    return FakeStream([chunk("The "), chunk("answer."), chunk(usage=SimpleNamespace(prompt_tokens=20, completion_tokens=3))], fail_after)
+
+@pytest.mark.asyncio
+async def test_stream_yields_deltas_and_records_usage():
+    stream = answer_stream()
+    llm = gateway(FakeCompletions([server_error(), stream]), max_retries=1)
+
+    deltas = [delta async for delta in llm.stream("interpreter", [])]
+
+    assert deltas == ["The ", "answer."]
+    assert stream.closed
+    stats = llm.stats()["stages"]["interpreter"]
+    assert stats["retries"] == 1 and stats["completion_tokens"] == 3
+    assert llm.stats()["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_stream_is_not_retried_after_the_first_delta():
+    completions = FakeCompletions([answer_stream(fail_after=1), answer_stream()])
+    llm = gateway(completions, max_retries=2)
+
+    deltas = []
+    with pytest.raises(openai.InternalServerError):
+        async for delta in llm.stream("finance", []):
+            deltas.append(delta)
+    assert deltas == ["The "]
+    assert len(completions.calls) == 1
+    assert llm.stats()["stages"]["finance"]["errors"] == 1
+
+@pytest.mark.asyncio
+async def test_agent_answer_is_streamed_as_delta_events(monkeypatch):
+    llm = gateway(FakeCompletions([answer_stream()]))
+    monkeypatch.setattr(gateway_module.llm_gateway, "_client", llm.client)
+    events = []
+
+    async def status_callback(log_type, content):
+        events.append((log_type, content))
+
+    answer = await InterpreterAgent().process_message("Here is the financial data: {}", status_callback=status_callback, stream=True)
+
+    assert answer == "The answer."
+    assert [content for log_type, content in events if log_type == "delta"] == ["The ", "answer."]
+
+@pytest.mark.asyncio
+async def test_agent_answer_releases_the_stream_when_the_consumer_fails(monkeypatch):
+    stream = answer_stream()
+    llm = gateway(FakeCompletions([stream]))
+    monkeypatch.setattr(gateway_module.llm_gateway, "_client", llm.client)
+
+    async def status_callback(log_type, content):
+        if log_type == "delta":
+            raise ConnectionResetError("client went away")
+
+    # The agent reports the failure instead of raising
+    answer = await InterpreterAgent().process_message("Here is the financial data: {}", status_callback=status_callback, stream=True)
+
+    assert "client went away" in answer
+    assert stream.closed
+    assert gateway_module.llm_gateway.in_flight == 0
@@ -0,0 +1,101 @@
+import asyncio
+import time
+import pytest
+
+from backend.agents import manager
+from backend.agents.manager import GatekeeperVerdict, manager_agent, parse_gatekeeper_verdict
+from backend.services.stage_timing import stage_stats
+
+LLM_LATENCY = 0.1
+
+@pytest.fixture
+def fake_llm_stages(monkeypatch):
+    calls = {"classified": False, "safety_checked": False, "gatekept": 0}
+
+    async def safety_check(message, status_callback=None):
+        calls["safety_checked"] = True
+        is_safe = "poem" not in message
+        # A rejection arrives while classification is still in flight
+        await asyncio.sleep(LLM_LATENCY if is_safe else LLM_LATENCY / 2)
+        return is_safe
+
+    async def classify_intent(message, history=[], status_callback=None):
+        await asyncio.sleep(LLM_LATENCY)
+        calls["classified"] = True
+        return "currency"
+
+    async def gatekeeper(message, history=[], status_callback=None):
+        await asyncio.sleep(LLM_LATENCY)
+        calls["gatekept"] += 1
+        return GatekeeperVerdict("poem" not in message, "currency", 0.9)
+
+    async def currency_agent(message, context=None, status_callback=None, stream=False):
+        return "100 USD is 92 EUR."
+
+    monkeypatch.setattr(manager, "INTENT_ROUTER_ENABLED", False)
+    monkeypatch.setattr(manager, "GATEKEEPER_MODE", "split")
+    monkeypatch.setattr(manager_agent, "_gatekeeper", gatekeeper)
+    monkeypatch.setattr(manager_agent, "_safety_check", safety_check)
+    monkeypatch.setattr(manager_agent, "_classify_intent", classify_intent)
+    monkeypatch.setattr(manager_agent.currency_agent, "process_message", currency_agent)
+    stage_stats.clear()
+    return calls
+
+@pytest.mark.asyncio
+async def test_safety_and_classification_run_concurrently(fake_llm_stages):
+    start = time.perf_counter()
+    response = await manager_agent.process_message("Convert 100 USD to EUR")
+    elapsed = time.perf_counter() - start
+
+    assert response == "100 USD is 92 EUR."
+    # About one LLM latency, not two
+    assert elapsed < 1.6 * LLM_LATENCY
+    stats = stage_stats.stats()
+    assert set(stats) >= {"safety", "history", "classify", "routing"}
+    assert stats["routing"]["avg_ms"] < 1.6 * LLM_LATENCY * 1000
+
+@pytest.mark.asyncio
+async def test_unsafe_message_cancels_classification(fake_llm_stages):
+    response = await manager_agent.process_message("Write a poem about cats")
+    await asyncio.sleep(LLM_LATENCY)
+
+    assert response.startswith("I cannot fulfill this request")
+    assert fake_llm_stages["classified"] is False
+    assert "classify" not in stage_stats.stats()
+
+@pytest.mark.asyncio
+async def test_obvious_intents_skip_the_classifier(fake_llm_stages, monkeypatch):
+    monkeypatch.setattr(manager, "INTENT_ROUTER_ENABLED", True)
+    response = await manager_agent.process_message("Convert 100 USD to EUR")
+
+    assert response == "100 USD is 92 EUR."
+    assert fake_llm_stages["classified"] is False
+
+@pytest.mark.asyncio
+async def test_merged_gatekeeper_replaces_safety_and_classification(fake_llm_stages, monkeypatch):
+    monkeypatch.setattr(manager, "GATEKEEPER_MODE", "merged")
+    response = await manager_agent.process_message("Convert 100 USD to EUR")
+
+    assert response == "100 USD is 92 EUR."
+    assert fake_llm_stages["gatekept"] == 1
+    assert fake_llm_stages["safety_checked"] is False
+    assert fake_llm_stages["classified"] is False
+    assert "gatekeeper" in stage_stats.stats()
+
+    response = await manager_agent.process_message("Write a poem about cats")
+    assert response.startswith("I cannot fulfill this request")
+
+@pytest.mark.asyncio
+async def test_merged_mode_still_checks_safety_for_locally_routed_intents(fake_llm_stages, monkeypatch):
+    monkeypatch.setattr(manager, "GATEKEEPER_MODE", "merged")
+    monkeypatch.setattr(manager, "INTENT_ROUTER_ENABLED", True)
+    await manager_agent.process_message("Convert 100 USD to EUR")
+
+    assert fake_llm_stages["gatekept"] == 0
+    assert fake_llm_stages["safety_checked"] is True
+
+def test_parse_gatekeeper_verdict():
+    assert parse_gatekeeper_verdict('{"safe": false, "intent": "finance", "confidence": 0.97}') == GatekeeperVerdict(False, "finance", 0.97)
+    assert parse_gatekeeper_verdict('{"safe": "true", "intent": "New_Tool", "confidence": "0.8"}') == GatekeeperVerdict(True, "new_tool", 0.8)
+    # Unknown intents and missing fields fall back like the two-call mode
+    assert parse_gatekeeper_verdict('{"intent": "weather", "confidence": 7}') == GatekeeperVerdict(True, "finance", 1.0)
@@ -0,0 +1,68 @@
+"""
+Guards the expenses hot path: if the planner stops using the composite
+(user_id, date) index for these queries, deep pages and date-range
+aggregates silently fall back to full scans.
+"""
+import pytest
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import event
+
+from backend import crud
+from backend.agents.finance import get_expenses_tool
+from backend.models import User, Expense
+
+INDEX_NAME = "ix_expenses_user_id_date"
+
+@asynccontextmanager
+async def capture_expense_queries(db_session):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if "FROM expenses" in statement and not statement.startswith("EXPLAIN"):
+            statements.append((statement, parameters))
+
+    sync_engine = db_session.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
+
+async def explain(db_session, statement, parameters):
+    conn = await db_session.connection()
+    result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    return " | ".join(row[-1] for row in result.all())
+
+@pytest.fixture
+async def seeded(db_session):
+    db_session.add(User(id="test_user_123", email="test@example.com"))
+    db_session.add(User(id="other_user", email="other@example.com"))
+    base = datetime(2025, 1, 1)
+    db_session.add_all([
+        Expense(user_id="test_user_123" if i % 2 else "other_user", amount=10.0, category="Food", description="Lunch", date=base + timedelta(days=i))
+        for i in range(50)
+    ])
+    await db_session.commit()
+    return db_session
+
+@pytest.mark.asyncio
+async def test_expense_listing_uses_composite_index(seeded):
+    async with capture_expense_queries(seeded) as statements:
+        expenses = await crud.get_expenses(seeded, "test_user_123", skip=5, limit=10)
+        await crud.get_expenses_page(seeded, "test_user_123", cursor=crud.encode_expense_cursor(expenses[-1]), limit=10)
+
+    assert len(statements) == 2
+    for statement, parameters in statements:
+        plan = await explain(seeded, statement, parameters)
+        assert INDEX_NAME in plan, plan
+        assert "TEMP B-TREE" not in plan, plan
+
+@pytest.mark.asyncio
+async def test_expense_date_range_uses_composite_index(seeded):
+    async with capture_expense_queries(seeded) as statements:
+        await get_expenses_tool(seeded, "test_user_123", date="2025-01-10", end_date="2025-01-20")
+
+    assert len(statements) == 1
+    plan = await explain(seeded, *statements[0])
+    assert INDEX_NAME in plan, plan
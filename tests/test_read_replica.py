@@ -0,0 +1,73 @@
+import pytest
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import database
+from backend.agents.finance import get_expenses_tool
+from backend.database import Base, get_db, get_read_db, make_read_session_class
+from backend.main import app
+from backend.models import Expense, User
+from backend.routers.analytics import analytics_cache
+
+HEADERS = {"Authorization": "Bearer mock_token"}
+
+@pytest.fixture
+async def replica_setup(tmp_path):
+    """Primary and 'replica' as two SQLite files; the replica never receives the primary's writes."""
+    primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    for engine in (primary, replica):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    PrimarySession = sessionmaker(primary, class_=AsyncSession, expire_on_commit=False)
+    ReadSession = sessionmaker(primary, class_=AsyncSession, sync_session_class=make_read_session_class(primary, replica), expire_on_commit=False)
+
+    async def override_db():
+        async with PrimarySession() as db:
+            yield db
+
+    async def override_read_db():
+        async with ReadSession() as db:
+            yield db
+
+    previous = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_read_db] = override_read_db
+
+    # Stale replica content, so reads that hit it are recognisable. Core inserts, because an
+    # ORM write would count as this user's own recent write.
+    async with replica.begin() as conn:
+        await conn.execute(User.__table__.insert().values(id="replica_user", email="replica@example.com"))
+        await conn.execute(Expense.__table__.insert().values(user_id="replica_user", amount=10.0, date=datetime(2025, 1, 1)))
+
+    yield ReadSession
+    app.dependency_overrides.clear()
+    app.dependency_overrides.update(previous)
+    await primary.dispose()
+    await replica.dispose()
+
+@pytest.mark.asyncio
+async def test_reads_use_replica_except_right_after_own_write(client, replica_setup, monkeypatch):
+    ReadSession = replica_setup
+
+    # Agent reads go to the replica
+    async with ReadSession(info={"user_id": "replica_user"}) as db:
+        assert len(await get_expenses_tool(db, "replica_user")) == 1
+
+    response = await client.get("/analytics/allocation", headers=HEADERS)
+    assert response.json() == []  # test_user_123 has no rows on the replica
+
+    response = await client.post("/expenses/", json={"amount": 5.0, "category": "Rent"}, headers=HEADERS)
+    assert response.status_code == 200
+
+    # Read-your-writes: within the window the user's reads go to the primary
+    response = await client.get("/analytics/allocation", headers=HEADERS)
+    assert response.json() == [{"name": "Rent", "value": 5.0}]
+
+    # Once the window has passed, reads go back to the (lagging) replica
+    monkeypatch.setattr(database, "READ_YOUR_WRITES_SECONDS", 0)
+    analytics_cache.clear()
+    response = await client.get("/analytics/allocation", headers=HEADERS)
+    assert response.json() == []
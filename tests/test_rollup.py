@@ -0,0 +1,62 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import select
+
+from backend import crud, schemas
+from backend.agents.finance import add_expense_tool
+from backend.models import Category, User, Expense, ExpenseMonthlyRollup
+from backend.services import rollup
+
+HEADERS = {"Authorization": "Bearer mock_token"}
+
+async def rollup_rows(db_session, user_id="test_user_123"):
+    result = await db_session.execute(
+        select(ExpenseMonthlyRollup.year_month, Category.name, ExpenseMonthlyRollup.total, ExpenseMonthlyRollup.count)
+        .outerjoin(Category, Category.id == ExpenseMonthlyRollup.category_id)
+        .where(ExpenseMonthlyRollup.user_id == user_id)
+        .order_by(ExpenseMonthlyRollup.year_month, ExpenseMonthlyRollup.category_id)
+    )
+    return [(ym, name or "", total, count) for ym, name, total, count in result.all()]
+
+@pytest.mark.asyncio
+async def test_rollup_follows_expense_writes(client, db_session):
+    response = await client.post("/expenses/", json={"amount": 12.5, "category": "Food", "date": "2025-03-04T12:00:00"}, headers=HEADERS)
+    assert response.status_code == 200
+    await crud.create_expense(db_session, schemas.ExpenseCreate(amount=7.5, category="Food", date=datetime(2025, 3, 20)), user_id="test_user_123")
+    await add_expense_tool(db_session, user_id="test_user_123", amount=3.0, category="Transport")
+
+    rows = await rollup_rows(db_session)
+    assert ("2025-03", "Food", 20.0, 2) in rows
+    assert any(category == "Transport" and total == 3.0 for _, category, total, _ in rows)
+    assert await rollup.check(db_session) == []
+
+    # ORM updates and deletes move amounts between buckets
+    expense = (await db_session.execute(select(Expense).where(Expense.amount == 7.5))).scalars().one()
+    expense.category = "Groceries"
+    await db_session.commit()
+    await db_session.delete(expense)
+    await db_session.commit()
+    assert ("2025-03", "Food", 12.5, 1) in await rollup_rows(db_session)
+    assert await rollup.check(db_session) == []
+
+    await crud.delete_user_data(db_session, "test_user_123")
+    assert await rollup_rows(db_session) == []
+
+@pytest.mark.asyncio
+async def test_rollup_rebuild_and_check(db_session):
+    rent = Category(user_id="test_user_123", name="Rent")
+    db_session.add_all([User(id="test_user_123", email="test@example.com"), rent])
+    await db_session.commit()
+    await db_session.execute(Expense.__table__.insert(), [
+        {"user_id": "test_user_123", "amount": 10.0, "category_id": rent.id, "date": datetime(2025, 1, 1)},
+        {"user_id": "test_user_123", "amount": 5.0, "category_id": None, "date": datetime(2025, 2, 1)},
+    ])
+    await db_session.commit()
+
+    # Core inserts bypass the flush hook, so the checker must notice the drift
+    assert len(await rollup.check(db_session)) == 2
+
+    await rollup.rebuild(db_session)
+    await db_session.commit()
+    assert await rollup.check(db_session) == []
+    assert await rollup_rows(db_session) == [("2025-01", "Rent", 10.0, 1), ("2025-02", "", 5.0, 1)]
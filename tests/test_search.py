@@ -0,0 +1,55 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import select
+
+from backend.agents.finance import get_expenses_tool
+from backend.models import User, Expense
+
+HEADERS = {"Authorization": "Bearer mock_token"}
+
+@pytest.fixture
+async def seeded(db_session):
+    db_session.add(User(id="test_user_123", email="test@example.com"))
+    db_session.add(User(id="other_user", email="other@example.com"))
+    db_session.add_all([
+        Expense(user_id="test_user_123", amount=4.0, category="Drinks", description="Coffee at Starbucks", date=datetime(2025, 1, 1)),
+        Expense(user_id="test_user_123", amount=12.0, category="Coffee", description="Coffee beans for coffee machine", date=datetime(2025, 1, 2)),
+        Expense(user_id="test_user_123", amount=30.0, category="Transport", description="Uber ride", date=datetime(2025, 1, 3)),
+        Expense(user_id="other_user", amount=5.0, category="Drinks", description="Coffee", date=datetime(2025, 1, 4)),
+    ])
+    await db_session.commit()
+    return db_session
+
+@pytest.mark.asyncio
+async def test_search_endpoint_ranks_and_scopes_to_user(client, seeded):
+    response = await client.get("/expenses/search?q=coffee", headers=HEADERS)
+    assert response.status_code == 200
+    results = response.json()
+    # The row mentioning coffee three times ranks first; the other user's row is never returned
+    assert [r["amount"] for r in results] == [12.0, 4.0]
+
+    response = await client.get("/expenses/search?q=coff%20star", headers=HEADERS)
+    assert [r["amount"] for r in response.json()] == [4.0]
+
+    response = await client.get("/expenses/search?q=coffee&limit=1&offset=1", headers=HEADERS)
+    assert [r["amount"] for r in response.json()] == [4.0]
+
+    response = await client.get('/expenses/search?q="*', headers=HEADERS)
+    assert response.json() == []
+
+    for params in ("limit=0", "limit=-1", "limit=101", "offset=-1"):
+        response = await client.get(f"/expenses/search?q=coffee&{params}", headers=HEADERS)
+        assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_search_index_follows_writes(seeded):
+    uber = (await seeded.execute(select(Expense).where(Expense.description == "Uber ride"))).scalars().one()
+    uber.description = "Taxi ride"
+    await seeded.commit()
+
+    assert await get_expenses_tool(seeded, "test_user_123", search="uber") == "No expenses found matching criteria."
+    assert len(await get_expenses_tool(seeded, "test_user_123", search="taxi")) == 1
+
+    await seeded.delete(uber)
+    await seeded.commit()
+    assert await get_expenses_tool(seeded, "test_user_123", search="taxi") == "No expenses found matching criteria."
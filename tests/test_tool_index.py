@@ -0,0 +1,128 @@
+import json
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud, models
+from backend.agents import manager
+from backend.agents.manager import manager_agent
+from backend.services.tool_index import ToolIndex, terms
+
+def tool(name, title, description, properties):
+    schema = {"type": "object", "properties": {p: {"type": "number", "description": d} for p, d in properties.items()}}
+    return models.Tool(name=name, title=title, description=description, json_schema=json.dumps(schema), python_code="def run(**kwargs):\n    return {}", dependencies="[]")
+
+LOAN = tool("loan_calculator", "Loan Calculator", "Calculates the monthly payment and total interest of an amortizing loan.",
+            {"principal": "Loan amount", "annual_interest_rate": "Annual interest rate in percent", "years": "Loan term in years"})
+COMPOUND = tool("compound_interest_calculator", "Compound Interest Calculator", "Projects the future value of savings with compound interest and monthly contributions.",
+                {"initial_amount": "Starting balance", "monthly_contribution": "Monthly deposit", "annual_rate": "Annual return", "years": "Years to grow"})
+TAX = tool("income_tax_estimator", "Income Tax Estimator", "Estimates federal income tax and effective tax rate for a salary.",
+           {"salary": "Gross annual salary", "filing_status": "single or married"})
+
+def test_terms_split_identifiers_and_drop_stopwords():
+    assert terms("Calculate my annualInterestRate for monthly_payments") == ["annual", "interest", "rate", "monthly", "payment"]
+
+def test_rank_prefers_the_matching_tool_and_rejects_partial_overlap():
+    index = ToolIndex(threshold=0.7)
+    index.build([LOAN, COMPOUND, TAX])
+
+    best = index.rank("Calculate my monthly loan payment for 20k over 5 years at 6%")[0]
+    assert best.tool is LOAN and best.score >= 0.7
+    assert index.rank("Estimate income tax on a 65k salary")[0].tool is TAX
+
+    # Shares "interest", "monthly" and "years" with the loan calculator, but not what it is about
+    index.build([LOAN, TAX])
+    ranked = index.rank("Compound interest on 10k at 5% for 10 years with monthly contributions")
+    assert ranked[0].tool is LOAN and ranked[0].score < 0.7
+    assert index.rank("What is the IRR of these cash flows") == []
+
+@pytest.mark.asyncio
+async def test_index_is_rebuilt_after_tools_change(db_session):
+    session_factory = sessionmaker(db_session.bind, class_=AsyncSession, expire_on_commit=False)
+    index = ToolIndex(session_factory=session_factory, threshold=0.7, ttl=3600)
+    await crud.create_tool(db_session, {"name": "income_tax_estimator", "title": "Income Tax Estimator", "description": TAX.description, "json_schema": TAX.json_schema})
+
+    assert (await index.search("Estimate income tax on a 65k salary")).tool.name == "income_tax_estimator"
+    assert await index.search("Calculate my monthly loan payment") is None
+
+    await crud.create_tool(db_session, {"name": "loan_calculator", "title": "Loan Calculator", "description": LOAN.description, "json_schema": LOAN.json_schema})
+    # crud.create_tool invalidates the app-wide index; this one is private to the test
+    index.invalidate()
+    assert (await index.search("Calculate my monthly loan payment")).tool.name == "loan_calculator"
+    assert index.stats()["rebuilds"] == 2
+
+@pytest.mark.asyncio
+async def test_manager_reuses_a_matching_tool_instead_of_generating_one(monkeypatch):
+    index = ToolIndex(threshold=0.7)
+    index.build([LOAN, TAX])
+    monkeypatch.setattr(manager, "tool_index", index)
+    monkeypatch.setattr(manager, "INTENT_ROUTER_ENABLED", True)
+    executed = {}
+
+    async def safety_check(message, status_callback=None):
+        return True
+
+    async def generate_tool(requirement):
+        raise AssertionError("the Architect should not be called")
+
+    async def extract_args(stage, messages, **kwargs):
+        return json.dumps({"principal": 20000, "annual_interest_rate": 6, "years": 5})
+
+    async def execute_tool_logic(code, args, dependencies, status_callback=None):
+        executed.update(args)
+        return {"output": "Monthly payment: 386.66", "visualization": None, "error": None}
+
+    async def interpret(message, context=None, status_callback=None, stream=False):
+        return "Your monthly payment is **$386.66**."
+
+    monkeypatch.setattr(manager_agent, "_safety_check", safety_check)
+    monkeypatch.setattr(manager_agent.architect_agent, "generate_tool", generate_tool)
+    monkeypatch.setattr(manager.llm_cache, "complete", extract_args)
+    monkeypatch.setattr("backend.services.tool_execution.execute_tool_logic", execute_tool_logic)
+    monkeypatch.setattr(manager_agent.interpreter_agent, "process_message", interpret)
+
+    response = await manager_agent.process_message("Calculate my monthly loan payment for 20k over 5 years at 6%")
+
+    assert executed == {"principal": 20000, "annual_interest_rate": 6, "years": 5}
+    assert response.startswith("Your monthly payment is **$386.66**.")
+    assert "/tools/loan_calculator" in response
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("args, result, expected", [
+    ({}, None, "I found the existing tool **Loan Calculator**, but I need more information"),
+    ({"principal": 20000, "annual_interest_rate": 6, "years": 5}, {"output": None, "visualization": None, "error": "division by zero"},
+     "Found an existing tool, but execution failed: division by zero"),
+])
+async def test_reused_tool_replies_do_not_claim_a_new_build(monkeypatch, args, result, expected):
+    schema = dict(json.loads(LOAN.json_schema), required=["principal", "annual_interest_rate", "years"])
+    loan = models.Tool(name=LOAN.name, title=LOAN.title, description=LOAN.description, json_schema=json.dumps(schema),
+                       python_code=LOAN.python_code, dependencies=LOAN.dependencies)
+    index = ToolIndex(threshold=0.7)
+    index.build([loan, TAX])
+    monkeypatch.setattr(manager, "tool_index", index)
+    monkeypatch.setattr(manager, "INTENT_ROUTER_ENABLED", True)
+    architect_calls = []
+
+    async def safety_check(message, status_callback=None):
+        return True
+
+    async def generate_tool(requirement):
+        architect_calls.append(requirement)
+
+    async def extract_args(stage, messages, **kwargs):
+        return json.dumps(args)
+
+    async def execute_tool_logic(code, args, dependencies, status_callback=None):
+        return result
+
+    monkeypatch.setattr(manager_agent, "_safety_check", safety_check)
+    monkeypatch.setattr(manager_agent.architect_agent, "generate_tool", generate_tool)
+    monkeypatch.setattr(manager.llm_cache, "complete", extract_args)
+    monkeypatch.setattr("backend.services.tool_execution.execute_tool_logic", execute_tool_logic)
+
+    response = await manager_agent.process_message("Calculate my monthly loan payment for 20k over 5 years at 6%")
+
+    assert architect_calls == []
+    assert response.startswith(expected)
+    assert "built" not in response and "created" not in response
@@ -0,0 +1,48 @@
+import asyncio
+import pytest
+from datetime import datetime
+from sqlalchemy import func, select
+
+from backend.models import Category, Expense, ExpenseMonthlyRollup, Tool, User
+from backend.services import rollup, user_deletion
+
+HEADERS = {"Authorization": "Bearer mock_token"}
+
+@pytest.mark.asyncio
+async def test_delete_user_data_runs_in_batches(client, db_session, monkeypatch):
+    monkeypatch.setattr(user_deletion.crud, "DELETE_BATCH_SIZE", 10)
+    db_session.add_all([User(id="test_user_123", email="test@example.com"), User(id="other_user", email="other@example.com")])
+    db_session.add_all([
+        Expense(user_id="test_user_123", amount=1.0, category=f"Cat {i % 3}", date=datetime(2025, 1 + i % 12, 1))
+        for i in range(25)
+    ])
+    db_session.add(Expense(user_id="other_user", amount=9.0, category="Rent", date=datetime(2025, 1, 1)))
+    db_session.add_all([
+        Tool(name="mine", creator_id="test_user_123"),
+        Tool(name="theirs", creator_id="other_user"),
+    ])
+    await db_session.commit()
+
+    response = await client.get("/users/me/data/deletion", headers=HEADERS)
+    assert response.status_code == 404
+
+    response = await client.delete("/users/me/data", headers=HEADERS)
+    assert response.status_code == 202
+    await asyncio.wait_for(user_deletion.get_job("test_user_123").task, timeout=5)
+
+    job = (await client.get("/users/me/data/deletion", headers=HEADERS)).json()
+    assert job["status"] == "completed"
+    assert job["deleted"]["expenses"] == 25
+    assert job["deleted"]["tools"] == 1
+    assert job["deleted"]["categories"] == 3
+
+    async def count(model, *where):
+        return (await db_session.execute(select(func.count()).select_from(model).where(*where))).scalar()
+
+    assert await count(Expense, Expense.user_id == "test_user_123") == 0
+    assert await count(ExpenseMonthlyRollup, ExpenseMonthlyRollup.user_id == "test_user_123") == 0
+    assert await count(Category, Category.user_id == "test_user_123") == 0
+    # Other users keep their data
+    assert await count(Expense) == 1
+    assert (await db_session.execute(select(Tool.name))).scalars().all() == ["theirs"]
+    assert await rollup.check(db_session) == []